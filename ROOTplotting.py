@@ -6,8 +6,6 @@ import logging.config
 from array import array
 from glob import glob
 
-from ConfigParser import SafeConfigParser
-
 def setup_logging( default_path='configs/logging.json', default_level=logging.INFO,
                    logname = "output", errname = "error", loglevel = 20):
     """
@@ -56,27 +54,21 @@ def cmstext(AdditionalText):
 
 
 def makeArraysFromCfg(config, value):
+    """
+    Returns the section names (axis labels), the section indices and the values of the key value
+    for all sections of the config file config
+    """
+    import modules.cfgOutput
 
-    x, y = array('f'), array('f')
-
-    axislabels = []
-
-    #TODO: Test for values not in config
-
-    for isection, section in enumerate(config.sections()):
-        logging.debug("Making x,y axis for {0} - {1}".format(section, config.getfloat(section, value)))
-        axislabels.append(section)
-        x.append(isection)
-        y.append(config.getfloat(section, value))
-
+    axislabels, values = modules.cfgOutput.readCFGColumn(config, value)
+    logging.debug("Making x,y axis for {0} sections with values {1}".format(len(axislabels), values))
+    x = array('f', range(len(axislabels)))
+    y = array('f', values.tolist())
 
     return axislabels, x, y
 
 def makeGraph(plotvalues, ytitle, legendnames, cmslabel):
-    styleconfig = SafeConfigParser()
-    logging.debug("Loading style config")
-    styleconfig.read("configs/style.cfg")
-
+    import modules.settings
     import ROOT
 
     color = [ROOT.kRed, ROOT.kBlue, ROOT.kGreen+2, ROOT.kViolet]
@@ -120,8 +112,7 @@ def makeGraph(plotvalues, ytitle, legendnames, cmslabel):
             graph.GetXaxis().SetLabelOffset(0.04)
             graph.GetXaxis().SetNdivisions(-(npoints+1))
             graph.SetTitle("")
-            if styleconfig.has_option("Renaming", ytitle):
-                ytitle = styleconfig.get("Renaming", ytitle)
+            ytitle = modules.settings.getSettings().rename(ytitle)
             graph.GetYaxis().SetTitle(ytitle)
             graph.GetYaxis().SetTitleOffset(graph.GetYaxis().GetTitleOffset() * 2)
             xax = graph.GetXaxis()
@@ -173,11 +164,7 @@ def main(args):
     plotvalues = []
     for conf in args.config:
         logging.info("Setting values for config: {0}".format(conf))
-        cfg = SafeConfigParser()
-        cfg.read( conf )
-
-        plotvalues.append(makeArraysFromCfg(cfg, args.parameter))
-        del cfg
+        plotvalues.append(makeArraysFromCfg(conf, args.parameter))
 
     makeGraph(plotvalues, args.parameter, args.names, args.cmslabel)
 
@@ -0,0 +1,82 @@
+"""
+Script for converting the preprocessed ROOT files to numpy files (.npz or folder with .npy files)
+that can be used as inputfiles for measureOccupancy.py without ROOT.
+
+K. Schweiger, 2017
+"""
+import os
+import logging
+
+from measureOccupancy import setup_logging
+
+def main(args):
+    import modules.histograms
+
+    setup_logging(logname = "convertHistograms_output", errname = "convertHistograms_error", loglevel = args.logging)
+
+    logger = logging.getLogger(__name__)
+
+    modules.histograms.silenceROOT = args.logging > 0
+
+    for inputfile in args.inputfiles:
+        if not os.path.exists(os.path.expanduser(inputfile)):
+            logger.error("File {0} does not exist. Will be skipped".format(inputfile))
+            continue
+        outputname = os.path.basename(inputfile)
+        if outputname.endswith(".root"):
+            outputname = outputname[:-len(".root")]
+        if args.format == "npz":
+            outputname += ".npz"
+        outputfolder = args.outputfolder
+        if outputfolder is None:
+            outputfolder = os.path.dirname(inputfile)
+        elif not os.path.exists(outputfolder):
+            logger.info("Creating folder: {0}".format(outputfolder))
+            os.makedirs(outputfolder)
+        modules.histograms.convertToNumpy(inputfile, os.path.join(outputfolder, outputname))
+
+    logger.info("Finished script")
+
+if __name__ == "__main__":
+    import argparse
+
+    # Argument parser definitions:
+    argumentparser = argparse.ArgumentParser(
+        description='Convert ROOT inputfiles for measureOccupancy.py to numpy files'
+    )
+
+    argumentparser.add_argument(
+        "--logging",
+        action = "store",
+        help = "Define logging level: CRITICAL - 50, ERROR - 40, WARNING - 30, INFO - 20, DEBUG - 10, NOTSET - 0 \nSet to 0 to activate ROOT root messages",
+        type=int,
+        default=20
+    )
+
+    argumentparser.add_argument(
+        "--inputfiles",
+        nargs='+',
+        action = "store",
+        help = "ROOT files to convert",
+        type=str,
+        required = True,
+    )
+
+    argumentparser.add_argument(
+        "--outputfolder",
+        action = "store",
+        help = "Folder for the converted files. If not set, the folder of the inputfile is used",
+        type=str,
+        default = None,
+    )
+
+    argumentparser.add_argument(
+        "--format",
+        action = "store",
+        help = "npz: one .npz file per inputfile, npy: one folder with .npy files per inputfile",
+        choices = ["npz", "npy"],
+        default = "npz",
+        type=str,
+    )
+
+    main(argumentparser.parse_args())
@@ -30,9 +30,8 @@ def setup_logging( default_path='configs/logging.json', default_level=logging.IN
         logging.basicConfig(level=default_level)
 
 def main(args):
-    import ROOT
-
     import modules.measurement
+    import modules.histograms
 
     setup_logging(logname = args.outlog, errname = args.errlog, loglevel = args.logging)
 
@@ -41,17 +40,33 @@ def main(args):
     logger.info("Starting occupancy measurement")
     logger.debug("Logging level set to: "+str(args.logging))
 
-    if args.logging > 0:
-        ROOT.gErrorIgnoreLevel = ROOT.kError# kPrint, kInfo, kWarning, kError, kBreak, kSysError, kFatal;
+    # ROOT is only imported if a ROOT file is read. Messages below kError are suppressed then
+    modules.histograms.silenceROOT = args.logging > 0
+
+    if args.nocache:
+        cache = None
+    else:
+        import modules.histocache
+        logger.debug("Using histogram cache in {0}".format(args.cachedir))
+        cache = modules.histocache.histocache(args.cachedir, args.cachesize*1024**2, refresh = args.refreshcache)
 
 
     if args.config is not None:
         logger.info("Using config set in arguments: {0}".format(args.config))
-        modules.measurement.occupancyFromConfig(args.config, args.skipplots)
-
-    elif args.inputfile is not None and args.collBunch is not None and args.instLumi is not None and args.nFiles is not None:
+        rundb = None
+        if args.rundb is not None:
+            import modules.rundb
+            rundb = modules.rundb.rundb(args.rundb)
+        if not args.skipplots and args.report == "static":
+            import modules.plotting
+            modules.plotting.setPlotMode(args.plotmode)
+        modules.measurement.occupancyFromConfig(args.config, args.skipplots, cache, args.jobs, rundb, args.report)
+        if rundb is not None:
+            rundb.close()
+
+    elif args.inputfile is not None and args.collBunch is not None and args.instLumi is not None:
         logger.info("Using file {0} and number of colliding bunches {1}".format(args.inputfile, args.collBunch))
-        modules.measurement.occupancyFromFile(args.inputfile, args.collBunch, args.instLumi, args.nFiles)
+        modules.measurement.occupancyFromFile(args.inputfile, args.collBunch, args.instLumi, args.nFiles, cache)
     else:
         pass
     logging.info("Finished script")
@@ -99,7 +114,7 @@ if __name__ == "__main__":
     argumentparser.add_argument(
         "--inputfile",
         action = "store",
-        help = "Input file",
+        help = "Input file. Can be a glob pattern (in quotes) or folder with the ROOT files of all jobs.",
         type=str,
         default = None,
     )
@@ -123,7 +138,7 @@ if __name__ == "__main__":
     argumentparser.add_argument(
         "--nFiles",
         action = "store",
-        help = "Number of files (or jobs) while prepocessing. Only need if preprocessing is done on some kind of batch-system.",
+        help = "Number of files (or jobs) while prepocessing. Only need if preprocessing is done on some kind of batch-system and the files are merged with hadd. Not needed if inputfile is a glob pattern or folder with the files of all jobs.",
         type=int,
         default = None,
     )
@@ -134,6 +149,68 @@ if __name__ == "__main__":
         help = "Call without argument! If called the plotting will be skipped in config mode.",
     )
 
+    argumentparser.add_argument(
+        "--plotmode",
+        action = "store",
+        help = "draft: Fast plotting without LaTeX, lower dpi and no pdf files. publication: Text rendered with LaTeX (output cached in the texcache folder set in configs/style.cfg, relative to the repository)",
+        choices = ["draft", "publication"],
+        default = "publication",
+    )
+
+    argumentparser.add_argument(
+        "--report",
+        action = "store",
+        help = "static: Plots are rendered as png files. interactive: Only the plotted values are saved and the plots are drawn in the browser",
+        choices = ["static", "interactive"],
+        default = "static",
+    )
+
+    argumentparser.add_argument(
+        "--jobs",
+        action = "store",
+        help = "Number of processes used to process the runs and render the plots in config mode",
+        type=int,
+        default = 1,
+    )
+
+    argumentparser.add_argument(
+        "--rundb",
+        action = "store",
+        help = "SQLite file used to save the values of processed runs in config mode. Runs with unchanged inputfile and parameters are not processed again.",
+        type=str,
+        default = None,
+    )
+
+    argumentparser.add_argument(
+        "--no-cache",
+        action = "store_true",
+        dest = "nocache",
+        help = "Call without argument! If called the histograms are always read from the inputfiles and not cached.",
+    )
+
+    argumentparser.add_argument(
+        "--refresh-cache",
+        action = "store_true",
+        dest = "refreshcache",
+        help = "Call without argument! If called the histograms are read from the inputfiles and the cache is updated.",
+    )
+
+    argumentparser.add_argument(
+        "--cachedir",
+        action = "store",
+        help = "Folder for the histogram cache",
+        type=str,
+        default = ".histocache",
+    )
+
+    argumentparser.add_argument(
+        "--cachesize",
+        action = "store",
+        help = "Maximum size of the histogram cache in MB. Least recently used files are removed.",
+        type=int,
+        default = 2000,
+    )
+
 
 
     arguments = argumentparser.parse_args()
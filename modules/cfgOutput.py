@@ -0,0 +1,77 @@
+"""
+Module for writing DataFrames as config files (same layout as written by SafeConfigParser: one
+section per row, lowercase keys) and reading these files column wise.
+
+K. Schweiger, 2017
+"""
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+def getCFGString(df):
+    """
+    Returns the DataFrame df as config string with the index as sections and the columns as keys.
+    The values are formatted with str() like SafeConfigParser does, but column wise.
+    """
+    # SafeConfigParser lowercases the keys. For keys that are equal after that the last value is kept
+    keys = OrderedDict()
+    for icolumn, column in enumerate(df.columns):
+        keys[str(column).lower()] = icolumn
+    if len(df.index) == 0:
+        return ""
+    # Same values (and types) as returned by df.iterrows()
+    cells = df.values[:, keys.values()].astype(str)
+    cells = np.char.replace(cells, "\n", "\n\t")
+    lines = np.empty((len(df.index), len(keys)+2), dtype = object)
+    lines[:, 0] = ["[{0}]\n".format(section) for section in df.index]
+    lines[:, 1:-1] = np.char.add(np.char.add(np.array([key+" = " for key in keys]), cells), "\n")
+    lines[:, -1] = "\n"
+    return "".join(lines.ravel().tolist())
+
+def writeCFG(df, filename):
+    logging.debug("Writing config file: {0}".format(filename))
+    with open(filename, "w") as configfile:
+        configfile.write(getCFGString(df))
+
+def readCFG(filename):
+    """
+    Returns the sections and a OrderedDict with the values (strings) for each key of a config file
+    written by getCFGString or SafeConfigParser. Missing keys in a section are None.
+    """
+    sections = []
+    columns = OrderedDict()
+    with open(filename, "r") as configfile:
+        for line in configfile:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line[0] in "#;":
+                continue
+            if line[0] == "[":
+                sections.append(line[1:line.index("]")])
+                for key in columns:
+                    columns[key].append(None)
+                continue
+            if line[0] in " \t":
+                # Continuation of a multiline value
+                columns[lastkey][-1] += "\n"+line.strip()
+                continue
+            separator = min(index for index in [line.find("="), line.find(":")] if index >= 0)
+            lastkey = line[:separator].strip().lower()
+            if lastkey not in columns:
+                columns[lastkey] = [None]*len(sections)
+            columns[lastkey][-1] = line[separator+1:].strip()
+    return sections, columns
+
+def readCFGColumn(filename, key):
+    """
+    Returns the sections and a float64 array with the values of key in all sections of the config file.
+    Sections without the key are NaN.
+    """
+    sections, columns = readCFG(filename)
+    key = key.lower()
+    if key not in columns:
+        logging.error("Key {0} not in file {1}".format(key, filename))
+        return sections, np.full(len(sections), np.nan)
+    values = np.array(columns[key], dtype = object)
+    values[values == None] = "nan"
+    return sections, values.astype(np.float64)
@@ -4,23 +4,82 @@ Classes for occupancy measurement
 K. Schweiger, 2017
 """
 import logging
-import ROOT
-from copy import copy
-import os.path
 
+import numpy as np
 
 from modules.modulecounter import modulecounter
-from modules.tests import isHistoinFile
+from modules.histograms import loadHistograms, inputExists
 import modules.measurement
 import modules.zdep
 import modules.ladder
 
-class container:
+class container(object):
     """
     Container initialized for a run containing all claculations for the occupancy
     and related values.
+
+    All values are saved in the float64 array values with the axes (region, layer, group, metric)
+    (see regionNames, layerNames, groupNames and metricNames). Values not defined for a group
+    (e.g. the occupancy for clusters) are NaN. The number of working modules is saved in
+    nModules with the axes (region, layer). The old attributes (hitPix, occupanciesZ, ...) are
+    still available as dicts build from the arrays.
+
+    The values are grouped in the valuetypes fullDetector, partialDetectorZ and
+    partialDetectorInnerOuterLadders. Each group is calculated on first access of one of its
+    values. Pass a list of valuetypes as regions to calculate them on initialization.
+    The DataFrames returned by getpdDataFrame are saved per valuetype until invalidateDataFrames
+    is called or the values are changed.
+    If storedvalues (tuple of values, nModules and nFiles from modules.rundb) is passed, the
+    inputfile is not read.
     """
-    def __init__(self, name, inputfile, collBunches, instLumi, comments = ["","","",""], nFiles = 1, fill = 0):
+    __slots__ = ["LayerNames", "zpositions", "instLumi", "comments", "name", "nFiles", "invalidFile",
+                 "histos", "evaluated", "collBunches", "fill", "values", "nModules",
+                 "nWorkingModulesLadder", "ladderpositions", "_dataframes"]
+
+    layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
+    regionNames = ["full", "-4", "-3", "-2", "-1", "1", "2", "3", "4", "inner", "outer"]
+    groupNames = ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]
+    # Ordered so the columns of the DataFrames (see getpdDataFrame) are the first metrics
+    metricNames = ["nhit", "perMod", "perArea", "perAreaNorm", "perAreaSec", "occupancy", "perAreaSecNorm"]
+    tableMetrics = {"Pix/Lay" : 6, "Pix/Det" : 6, "Clus/Lay" : 5, "Clus/Det" : 5}
+
+    valuetypes = ["fullDetector", "partialDetectorZ", "partialDetectorInnerOuterLadders"]
+    valueSetters = {"fullDetector" : "setBaseValuesForallLayer",
+                    "partialDetectorZ" : "setzDependency",
+                    "partialDetectorInnerOuterLadders" : "setInnerOuterLadderDependency"}
+    valueRegions = {"fullDetector" : ["full"],
+                    "partialDetectorZ" : ["-4", "-3", "-2", "-1", "1", "2", "3", "4"],
+                    "partialDetectorInnerOuterLadders" : ["inner", "outer"]}
+    valueSlices = {"fullDetector" : slice(0, 1),
+                   "partialDetectorZ" : slice(1, 9),
+                   "partialDetectorInnerOuterLadders" : slice(9, 11)}
+
+    # Old attribute names -> (valuetype, group, metric)
+    legacyAttributes = {}
+    for _attribute, _group, _metric in [("hitPix", "Pix/Lay", "nhit"), ("occupancies", "Pix/Lay", "occupancy"),
+                                        ("hitPixPerModule", "Pix/Lay", "perMod"), ("hitPixPerArea", "Pix/Lay", "perArea"),
+                                        ("hitPixPerAreaSec", "Pix/Lay", "perAreaSec"), ("hitPixPerAreaNorm", "Pix/Lay", "perAreaNorm"),
+                                        ("hitPixPerAreaSecNorm", "Pix/Lay", "perAreaSecNorm")]:
+        legacyAttributes[_attribute] = ("fullDetector", _group, _metric)
+        legacyAttributes[_attribute+"Z"] = ("partialDetectorZ", _group, _metric)
+        legacyAttributes[_attribute+"InOut"] = ("partialDetectorInnerOuterLadders", _group, _metric)
+    for _attribute, _group, _metric in [("Detoccupancies", "Pix/Det", "occupancy"), ("hitPixPerDet", "Pix/Det", "perMod"),
+                                        ("hitPixPerDetArea", "Pix/Det", "perArea"), ("hitPixPerDetAreaSec", "Pix/Det", "perAreaSec"),
+                                        ("hitPixPerDetAreaNorm", "Pix/Det", "perAreaNorm"), ("hitPixPerDetAreaSecNorm", "Pix/Det", "perAreaSecNorm"),
+                                        ("hitClusters", "Clus/Lay", "nhit"), ("hitClustersPerModule", "Clus/Lay", "perMod"),
+                                        ("hitClustersPerArea", "Clus/Lay", "perArea"), ("hitClustersPerAreaSec", "Clus/Lay", "perAreaSec"),
+                                        ("hitClustersPerAreaNorm", "Clus/Lay", "perAreaNorm"), ("hitClustersPerAreaSecNorm", "Clus/Lay", "perAreaSecNorm"),
+                                        ("hitClustersPerDet", "Clus/Det", "perMod"), ("hitClustersPerDetArea", "Clus/Det", "perArea"),
+                                        ("hitClustersPerDetAreaSec", "Clus/Det", "perAreaSec"), ("hitClustersPerDetAreaNorm", "Clus/Det", "perAreaNorm"),
+                                        ("hitClustersPerDetAreaSecNorm", "Clus/Det", "perAreaSecNorm")]:
+        legacyAttributes[_attribute] = ("fullDetector", _group, _metric)
+    del _attribute, _group, _metric
+    legacyModuleAttributes = {"nWorkingModules" : None,
+                              "nWorkingModulesZ" : "partialDetectorZ",
+                              "nWorkingModulesInOut" : "partialDetectorInnerOuterLadders"}
+
+    def __init__(self, name, inputfile, collBunches, instLumi, comments = ["","","",""], nFiles = None, fill = 0, cache = None, regions = None,
+                 storedvalues = None):
         logging.debug("Initializing container for {0} with inputfile {1} and colliding bunches {2}".format(name, inputfile, collBunches))
         self.LayerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
         self.zpositions = ["-4", "-3", "-2", "-1", "1", "2", "3", "4"]
@@ -29,78 +88,33 @@ class container:
         self.name = name
         self.nFiles = nFiles
         self.invalidFile = False
-        if not os.path.exists(inputfile.replace("~",os.path.expanduser("~"))):
+        self.histos = None
+        self.evaluated = []
+        self._dataframes = {}
+        self.collBunches = collBunches
+        self.fill = fill
+        if storedvalues is not None:
+            # Values from modules.rundb -> inputfile is not read
+            self.values, self.nModules, self.nFiles = storedvalues
+            self.evaluated = list(container.valuetypes)
+            return
+        self.values = np.full((len(container.regionNames), len(container.layerNames),
+                               len(container.groupNames), len(container.metricNames)), np.nan, dtype = np.float64)
+        self.nModules = np.zeros((len(container.regionNames), len(container.layerNames)), dtype = np.int64)
+        if not inputExists(inputfile):
             logging.error("File {0} does not exist. Run will be ignored".format(inputfile))
             self.invalidFile = True
         else:
-            self.file = ROOT.TFile.Open(inputfile)
-        self.collBunches = collBunches
-        self.fill = fill
+            self.histos = loadHistograms(inputfile, cache)
+            self.setnFiles(nFiles)
         # Varaiable for full layer
         if not self.invalidFile:
-            self.nWorkingModules = modulecounter(self.file)
-        #Pixels
-        self.hitPix = {}
-        self.occupancies = {}
-        self.hitPixPerModule = {}
-        self.hitPixPerArea = {}
-        self.hitPixPerAreaSec = {}
-        self.hitPixPerAreaNorm = {}
-        self.hitPixPerAreaSecNorm = {}
-
-        self.Detoccupancies = {}
-        self.hitPixPerDet = {}
-        self.hitPixPerDetArea = {}
-        self.hitPixPerDetAreaSec = {}
-        self.hitPixPerDetAreaNorm = {}
-        self.hitPixPerDetAreaSecNorm = {}
-        # Clusters
-        self.hitClusters = {}
-        self.hitClustersPerModule = {}
-        self.hitClustersPerArea = {}
-        self.hitClustersPerAreaSec = {}
-        self.hitClustersPerAreaNorm = {}
-        self.hitClustersPerAreaSecNorm = {}
-
-        self.hitClustersPerDet = {}
-        self.hitClustersPerDetArea = {}
-        self.hitClustersPerDetAreaSec = {}
-        self.hitClustersPerDetAreaNorm = {}
-        self.hitClustersPerDetAreaSecNorm = {}
-
-        # Set general values
-        if not self.invalidFile:
-            self.setBaseValuesForallLayer()
+            nWorkingModules = modulecounter(self.histos)
+            for ilayer, layer in enumerate(container.layerNames):
+                self.nModules[0, ilayer] = nWorkingModules[layer]
 
-        #Variables for z-dependency
-        self.nWorkingModulesZ = {}
-        #Pixels
-        self.hitPixZ = {}
-        self.occupanciesZ = {}
-        self.hitPixPerModuleZ = {}
-        self.hitPixPerAreaZ = {}
-        self.hitPixPerAreaSecZ = {}
-        self.hitPixPerAreaNormZ = {}
-        self.hitPixPerAreaSecNormZ = {}
-
-        # Set z-dependent values
-        if not self.invalidFile:
-            self.setzDependency()
-
-        #Variable for inner/outer ladder dependency
-        self.nWorkingModulesInOut = {}
-        #Pixels
-        self.hitPixInOut = {}
-        self.occupanciesInOut = {}
-        self.hitPixPerModuleInOut = {}
-        self.hitPixPerAreaInOut = {}
-        self.hitPixPerAreaSecInOut = {}
-        self.hitPixPerAreaNormInOut = {}
-        self.hitPixPerAreaSecNormInOut = {}
-
-        # Set inner/outer ladder dependency values
-        if not self.invalidFile:
-            self.setInnerOuterLadderDependency()
+        if regions is not None:
+            self.evaluate(regions)
 
         #TODO Implement: variables will have to be ordered differently because not all layer have the same
         #     number of ladder positions. Maybe fill with NaN or something. Will be added later.
@@ -121,6 +135,116 @@ class container:
             self.setLadderDependency()
         """
 
+    def setnFiles(self, nFiles):
+        """
+        For merged inputfiles (glob or folder) the number of merged files is used as nFiles.
+        A different nFiles passed to the container is ignored.
+        """
+        if self.histos.nJobs is None:
+            self.nFiles = 1 if nFiles is None else nFiles
+            return
+        if nFiles is not None and nFiles != self.histos.nJobs:
+            logging.warning("nFiles = {0} set for {1} but {2} files are merged. Using {2}".format(nFiles, self.name, self.histos.nJobs))
+        self.nFiles = self.histos.nJobs
+
+    def __getstate__(self):
+        # Saved DataFrames are not pickled
+        return dict((attribute, getattr(self, attribute)) for attribute in container.__slots__
+                    if attribute != "_dataframes" and hasattr(self, attribute))
+
+    def __setstate__(self, state):
+        self._dataframes = {}
+        for attribute in state:
+            setattr(self, attribute, state[attribute])
+
+    def __getattr__(self, name):
+        # Only called for attributes not in __slots__ -> Old dict attributes build from the arrays
+        if name in container.legacyAttributes:
+            valuetype, group, metric = container.legacyAttributes[name]
+            self.evaluate([valuetype])
+            return self.getValueDict(valuetype, group, metric)
+        if name in container.legacyModuleAttributes:
+            valuetype = container.legacyModuleAttributes[name]
+            if valuetype is not None:
+                self.evaluate([valuetype])
+            return self.getModuleDict(valuetype)
+        raise AttributeError(name)
+
+    def evaluate(self, valuetypes = None):
+        """
+        Calculate the values for the passed valuetypes (all if None). Valuetypes that are
+        already calculated are skipped.
+        """
+        if valuetypes is None:
+            valuetypes = container.valuetypes
+        for valuetype in valuetypes:
+            if valuetype not in container.valuetypes:
+                logging.warning("Valuetype {0} in no valid argument. Use one of {1}".format(valuetype, container.valuetypes))
+                continue
+            if valuetype in self.evaluated:
+                continue
+            if not self.invalidFile:
+                if self.histos is None:
+                    raise RuntimeError("Histograms of {0} are released. {1} can not be calculated".format(self.name, valuetype))
+                getattr(self, container.valueSetters[valuetype])()
+            self.evaluated.append(valuetype)
+
+    def releaseHistograms(self):
+        """
+        Calculate all values not calculated yet and remove the reference to the histograms.
+        The container can be pickled afterwards.
+        """
+        self.evaluate()
+        self.histos = None
+
+    def setValues(self, valuetype, group, nhit, values):
+        """
+        Save nhit and the values returned by getValuesPerLayerArray/getValuesPerDetArray (arrays
+        with the shape (region, layer)) for the regions of valuetype in the array. nhit can be None.
+        """
+        self.invalidateDataFrames()
+        cells = self.values[container.valueSlices[valuetype], :, container.groupNames.index(group)]
+        cells[..., 0] = np.nan if nhit is None else nhit
+        for imetric, metric in enumerate(container.metricNames[1:], 1):
+            cells[..., imetric] = values["Occ" if metric == "occupancy" else metric]
+
+    def getValues(self, region, group):
+        """
+        Returns view on the values of region and group with the axes (layer, metric)
+        """
+        self.evaluate([valuetype for valuetype in container.valuetypes if region in container.valueRegions[valuetype]])
+        return self.values[container.regionNames.index(region), :, container.groupNames.index(group)]
+
+    def getValue(self, region, layer, group, metric):
+        return float(self.getValues(region, group)[container.layerNames.index(layer), container.metricNames.index(metric)])
+
+    def getValueDict(self, valuetype, group, metric):
+        """
+        Returns the values of group and metric as dict like the old attributes: {layer : value} for the
+        full detector and {region : {layer : value}} for the partial detector
+        """
+        igroup, imetric = container.groupNames.index(group), container.metricNames.index(metric)
+        regiondict = {}
+        for region in container.valueRegions[valuetype]:
+            regiondict[region] = dict(zip(container.layerNames, self.values[container.regionNames.index(region), :, igroup, imetric].tolist()))
+        if valuetype == "fullDetector":
+            return regiondict["full"]
+        return regiondict
+
+    def getModuleDict(self, valuetype = None):
+        """
+        Returns the number of working modules as dict like the old attributes: {layer : nModules} for the
+        full detector and {layer : {region : nModules}} for the partial detector
+        """
+        if valuetype is None:
+            return dict(zip(container.layerNames, self.nModules[0].tolist()))
+        moduledict = {}
+        for ilayer, layer in enumerate(container.layerNames):
+            moduledict[layer] = {}
+            for region in container.valueRegions[valuetype]:
+                moduledict[layer][region] = int(self.nModules[container.regionNames.index(region), ilayer])
+        return moduledict
+
     def setBaseValuesForallLayer(self):
         """
         Calculate for each layer:
@@ -130,120 +254,58 @@ class container:
             * Pixel/Cluster hit per cm^2 per sec
         """
         logging.info("Setting base values")
-        for ilayer, layer in enumerate(self.LayerNames):
-            logging.debug("Setting base values for {0}".format(layer))
-            ############################################################################################
-            # Pixels per Layer
-            currentmean = getHistoMean(self.file, "d/hpixPerLay"+str(ilayer+1))
-            self.hitPix[layer] = currentmean
-            values = modules.measurement.getValuesPerLayer(currentmean, self.nWorkingModules[layer], self.collBunches, self.instLumi)
-            self.occupancies[layer] = values["Occ"]
-            self.hitPixPerModule[layer] = values["perMod"]
-            self.hitPixPerArea[layer] = values["perArea"]
-            self.hitPixPerAreaSec[layer] = values["perAreaSec"]
-            self.hitPixPerAreaNorm[layer] = values["perAreaNorm"]
-            self.hitPixPerAreaSecNorm[layer] = values["perAreaSecNorm"]
-            # Pixels per Det
-            currentmean = getHistoMean(self.file, "d/hpixPerDet"+str(ilayer+1))
-            values = modules.measurement.getValuesPerDet(currentmean, self.collBunches, self.instLumi)
-            self.Detoccupancies[layer] = values["Occ"]
-            self.hitPixPerDet[layer] = values["perMod"]
-            self.hitPixPerDetArea[layer] = values["perArea"]
-            self.hitPixPerDetAreaSec[layer] = values["perAreaSec"]
-            self.hitPixPerDetAreaNorm[layer] = values["perAreaNorm"]
-            self.hitPixPerDetAreaSecNorm[layer] = values["perAreaSecNorm"]
-            ############################################################################################
-            # Clusters per Layer
-            currentmean = getHistoMean(self.file, "d/hclusPerLay"+str(ilayer+1))
-            values = modules.measurement.getValuesPerLayer(currentmean, self.nWorkingModules[layer],self.collBunches, self.instLumi,  True)
-            self.hitClusters[layer] = currentmean
-            self.hitClustersPerModule[layer] = values["perMod"]
-            self.hitClustersPerArea[layer] = values["perArea"]
-            self.hitClustersPerAreaSec[layer] = values["perAreaSec"]
-            self.hitClustersPerAreaNorm[layer] = values["perAreaNorm"]
-            self.hitClustersPerAreaSecNorm[layer] = values["perAreaSecNorm"]
-            # CLusters per Det
-            currentmean = getHistoMean(self.file, "d/hclusPerDet"+str(ilayer+1))
-            values = modules.measurement.getValuesPerDet(currentmean, self.collBunches, self.instLumi, True)
-            self.hitClustersPerDet[layer] = values["perMod"] #In this case: The mean given to the function
-            self.hitClustersPerDetArea[layer] = values["perArea"]
-            self.hitClustersPerDetAreaSec[layer] = values["perAreaSec"]
-            self.hitClustersPerDetAreaNorm[layer] = values["perAreaNorm"]
-            self.hitClustersPerDetAreaSecNorm[layer] = values["perAreaSecNorm"]
+        histonames = {"Pix/Lay" : "d/hpixPerLay", "Pix/Det" : "d/hpixPerDet",
+                      "Clus/Lay" : "d/hclusPerLay", "Clus/Det" : "d/hclusPerDet"}
+        for group in container.groupNames:
+            currentmeans = np.array([[self.histos.getMean(histonames[group]+str(ilayer+1)) for ilayer in range(len(self.LayerNames))]])
+            if group.endswith("Lay"):
+                self.setValues("fullDetector", group, currentmeans, self.getLayerValues(currentmeans, self.nModules[0:1], group.startswith("Clus")))
+            else:
+                # For Det the mean given to the function is saved as perMod
+                self.setValues("fullDetector", group, None, self.getDetValues(currentmeans, group.startswith("Clus")))
 
     def setzDependency(self):
         logging.info("Setting z-dependent values")
-        nhitpixelsperZ, nworkingModulesperZ = modules.zdep.npixZdependency(self.file, self.nFiles)
-        self.nWorkingModulesZ = nworkingModulesperZ
-
-        for pos in self.zpositions:
-            self.hitPixZ[pos] = {}
-            self.occupanciesZ[pos] = {}
-            self.hitPixPerModuleZ[pos] = {}
-            self.hitPixPerAreaZ[pos] = {}
-            self.hitPixPerAreaSecZ[pos] = {}
-            self.hitPixPerAreaNormZ[pos] = {}
-            self.hitPixPerAreaSecNormZ[pos] = {}
-            for layer in self.LayerNames:
-                logging.debug("{0} - position {1}".format(layer, pos))
-                values = modules.measurement.getValuesPerLayer(nhitpixelsperZ[layer][pos], nworkingModulesperZ[layer][pos], self.collBunches, self.instLumi)
-                self.hitPixZ[pos][layer] = nhitpixelsperZ[layer][pos]
-                self.occupanciesZ[pos][layer] = values["Occ"]
-                self.hitPixPerModuleZ[pos][layer] = values["perMod"]
-                self.hitPixPerAreaZ[pos][layer] = values["perArea"]
-                self.hitPixPerAreaSecZ[pos][layer] = values["perAreaSec"]
-                self.hitPixPerAreaNormZ[pos][layer]= values["perAreaNorm"]
-                self.hitPixPerAreaSecNormZ[pos][layer]= values["perAreaSecNorm"]
+        nhitpixelsperZ, nworkingModulesperZ = modules.zdep.npixZdependency(self.histos, self.nFiles)
 
-        """
-        Inverse structure. Maybe needed later at some point
-        for layer in self.LayerNames:
-            logging.debug("z-dependent values for {0}".format(layer))
-            self.hitPixZ[layer] = {}
-            self.occupanciesZ[layer] = {}
-            self.hitPixPerModuleZ[layer] = {}
-            self.hitPixPerAreaZ[layer] = {}
-            self.hitPixPerAreaSecZ[layer] = {}
-            self.hitPixPerAreaSecNormZ[layer] = {}
-            for pos in self.zpositions:
-                logging.debug("{0} - position {1}".format(layer, pos))
-                values = modules.measurement.getValuesPerLayer(nhitpixelsperZ[layer][pos], nworkingModulesperZ[layer][pos], self.collBunches)
-                self.hitPixZ[layer][pos] = nhitpixelsperZ[layer][pos]
-                self.occupanciesZ[layer][pos] = values["Occ"]
-                self.hitPixPerModuleZ[layer][pos] = values["perMod"]
-                self.hitPixPerAreaZ[layer][pos] = values["perArea"]
-                self.hitPixPerAreaSecZ[layer][pos] = values["perAreaSec"]
-                self.hitPixPerAreaSecNormZ[layer][pos] = values["perAreaSecNorm"]
-        """
+        regions = container.valueRegions["partialDetectorZ"]
+        nhit = np.array([[nhitpixelsperZ[layer][pos] for layer in self.LayerNames] for pos in regions], dtype = np.float64)
+        self.nModules[container.valueSlices["partialDetectorZ"]] = [[nworkingModulesperZ[layer][pos] for layer in self.LayerNames] for pos in regions]
+        self.setValues("partialDetectorZ", "Pix/Lay", nhit, self.getLayerValues(nhit, self.nModules[container.valueSlices["partialDetectorZ"]]))
 
     def setInnerOuterLadderDependency(self):
         logging.info("Setting innner/outer ladder dependent values")
-        HitPixInOut = modules.ladder.getPixelHitsInOutladderModules(self.file, self.nFiles)
-        self.nWorkingModulesInOut = modules.ladder.getworkingInOutladderModules(self.file)
-
-        for ladder in ["inner","outer"]:
-            self.hitPixInOut[ladder] = {}
-            self.occupanciesInOut[ladder] = {}
-            self.hitPixPerModuleInOut[ladder] = {}
-            self.hitPixPerAreaInOut[ladder] = {}
-            self.hitPixPerAreaSecInOut[ladder] = {}
-            self.hitPixPerAreaNormInOut[ladder] = {}
-            self.hitPixPerAreaSecNormInOut[ladder] = {}
-            for layer in self.LayerNames:
-                logging.debug("{0} - {1} ladder".format(layer, ladder))
-                values = modules.measurement.getValuesPerLayer(HitPixInOut[layer][ladder], self.nWorkingModulesInOut[layer][ladder], self.collBunches, self.instLumi)
-                self.hitPixInOut[ladder][layer] = HitPixInOut[layer][ladder]
-                self.occupanciesInOut[ladder][layer] = values["Occ"]
-                self.hitPixPerModuleInOut[ladder][layer] = values["perMod"]
-                self.hitPixPerAreaInOut[ladder][layer] = values["perArea"]
-                self.hitPixPerAreaSecInOut[ladder][layer] = values["perAreaSec"]
-                self.hitPixPerAreaNormInOut[ladder][layer] = values["perAreaNorm"]
-                self.hitPixPerAreaSecNormInOut[ladder][layer] = values["perAreaNorm"]
+        HitPixInOut = modules.ladder.getPixelHitsInOutladderModules(self.histos, self.nFiles)
+        nWorkingModulesInOut = modules.ladder.getworkingInOutladderModules(self.histos)
+
+        regions = container.valueRegions["partialDetectorInnerOuterLadders"]
+        nhit = np.array([[HitPixInOut[layer][ladder] for layer in self.LayerNames] for ladder in regions], dtype = np.float64)
+        self.nModules[container.valueSlices["partialDetectorInnerOuterLadders"]] = [[nWorkingModulesInOut[layer][ladder] for layer in self.LayerNames] for ladder in regions]
+        self.setValues("partialDetectorInnerOuterLadders", "Pix/Lay", nhit,
+                       self.getLayerValues(nhit, self.nModules[container.valueSlices["partialDetectorInnerOuterLadders"]]))
+
+    def getLayerValues(self, nhit, nModules, isCluster = False):
+        """
+        Calculate the values for the hits and working modules with the shape (region, layer)
+        """
+        return modules.measurement.getValuesPerLayerArray(nhit, nModules, self.collBunches, self.instLumi, isCluster,
+                                                          modules.measurement.layerRevFrequ,
+                                                          modules.measurement.layerActiveModArea,
+                                                          modules.measurement.layerPixperMod)
+
+    def getDetValues(self, nperDet, isCluster = False):
+        """
+        Calculate the values for the mean hits per Det with the shape (region, layer)
+        """
+        return modules.measurement.getValuesPerDetArray(nperDet, self.collBunches, self.instLumi, isCluster,
+                                                        modules.measurement.layerRevFrequ,
+                                                        modules.measurement.layerActiveModArea,
+                                                        modules.measurement.layerPixperMod)
 
     def setLadderDependency(self):
         logging.info("Setting ladder dependent values")
-        HitPixLadder = modules.ladder.getPixelHitsladderModules(self.file, self.nFiles)
-        self.nWorkingModulesLadder = modules.ladder.getworkingladderModules(self.file)
+        HitPixLadder = modules.ladder.getPixelHitsladderModules(self.histos, self.nFiles)
+        self.nWorkingModulesLadder = modules.ladder.getworkingladderModules(self.histos)
 
         for layer in self.LayerNames:
             innerpositions = modules.ladder.getLadderidList(layer, "inner")
@@ -382,49 +444,50 @@ class container:
                                     "perAreaNorm" : self.hitClustersPerDetAreaNorm[layer]}
         return retdict
 
+    def invalidateDataFrames(self):
+        """
+        Remove the DataFrames saved by getpdDataFrame
+        """
+        self._dataframes = {}
+
     def getpdDataFrame(self, valuetype):
+        """
+        Returns dict with a DataFrame (layers as index) for each group. For the fullDetector the
+        DataFrames are views on the values array, for the partial detector the columns have the
+        levels position and value. The dict is calculated once per valuetype.
+        """
+        if valuetype not in self._dataframes:
+            self._dataframes[valuetype] = self.makepdDataFrame(valuetype)
+        return self._dataframes[valuetype]
+
+    def makepdDataFrame(self, valuetype):
         logging.debug("Generating pandas DF with valuetype: {0}".format(valuetype))
         import pandas as pd
-        import numpy as np
 
         groups = ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]
-        subgroups = {"Pix/Lay" : ["nhit","perMod", "perArea", "perAreaNorm", "perAreaSec", "occupancy"],
-                     "Pix/Det" : ["nhit","perMod", "perArea", "perAreaNorm", "perAreaSec", "occupancy"],
-                     "Clus/Lay" : ["nhit","perMod", "perArea", "perAreaNorm", "perAreaSec"],
-                     "Clus/Det" : ["nhit","perMod", "perArea", "perAreaNorm", "perAreaSec"]}
-        layerlist = self.LayerNames
+        returndict = {}
         if valuetype == "fullDetector":
-            returndict = {}
-            valuedict = self.getValuesasDetailDict2(valuetype)
             for group in groups:
-                if valuetype == "fullDetector":
-                    a = pd.DataFrame(valuedict[group], index = layerlist)
-                    a = a[subgroups[group]] #Sort columns by subgroup order
-                    a.fillna(value=np.nan, inplace=True)
-                    returndict[group] = copy(a)
-
-        elif valuetype.startswith("partialDetectorZ"):
-            returndict = {}
-            #for group in groups:
-            for group in ["Pix/Lay"]: #necessary fir current implementation of z-dependency
-                mulitcolumnstuples = [(x,y) for x in self.zpositions for y in subgroups[group]]
-                mulitcolumns = pd.MultiIndex.from_tuples(mulitcolumnstuples, names=['position', 'value'])
-                a = pd.DataFrame(index = self.LayerNames, columns = mulitcolumns)
-                for position in self.zpositions:
-                    valuedict = self.getValuesasDetailDict2(valuetype, position)
-                    a[position] = pd.DataFrame(valuedict[group], index = layerlist)
-                returndict[group] = copy(a)
-
-        elif valuetype.startswith("partialDetectorInnerOuterLadders"):
-            returndict = {}
-            for group in ["Pix/Lay"]:
-                mulitcolumnstuples = [(x,y) for x in ["inner","outer"] for y in subgroups[group]]
+                nmetrics = container.tableMetrics[group]
+                returndict[group] = pd.DataFrame(self.getValues("full", group)[:, :nmetrics], index = self.LayerNames,
+                                                 columns = container.metricNames[:nmetrics], copy = False)
+
+        elif valuetype.startswith("partialDetectorZ") or valuetype.startswith("partialDetectorInnerOuterLadders"):
+            if valuetype.startswith("partialDetectorZ"):
+                valuetype = "partialDetectorZ"
+            else:
+                valuetype = "partialDetectorInnerOuterLadders"
+            self.evaluate([valuetype])
+            positions = container.valueRegions[valuetype]
+            regionindices = [container.regionNames.index(position) for position in positions]
+            for group in ["Pix/Lay"]: #necessary for current implementation of z-dependency and ladders
+                nmetrics = container.tableMetrics[group]
+                mulitcolumnstuples = [(x,y) for x in positions for y in container.metricNames[:nmetrics]]
                 mulitcolumns = pd.MultiIndex.from_tuples(mulitcolumnstuples, names=['position', 'value'])
-                a = pd.DataFrame(index = self.LayerNames, columns = mulitcolumns)
-                for position in ["inner","outer"]:
-                    valuedict = self.getValuesasDetailDict2(valuetype, position)
-                    a[position] = pd.DataFrame(valuedict[group], index = layerlist)
-                returndict[group] = copy(a)
+                # (position, layer, metric) -> (layer, position*metric)
+                data = self.values[regionindices, :, container.groupNames.index(group), :nmetrics]
+                data = data.transpose(1, 0, 2).reshape(len(self.LayerNames), -1)
+                returndict[group] = pd.DataFrame(data, index = self.LayerNames, columns = mulitcolumns)
 
         return returndict
 
@@ -456,16 +519,3 @@ class container:
             print "  Clusters hit per Det: {0}".format(self.hitClustersPerDet[layer])
             print "  Clusters hit per DetArea: {0}".format(self.hitClustersPerDetArea[layer])
             print "  Clusters hit per DetArea per sec: {0}".format(self.hitClustersPerDetAreaSec[layer])
-
-def getHistoMean(inputfile, histoname):
-    logging.debug("Getting mean form histogram: {0}".format(histoname))
-    if isHistoinFile(inputfile, histoname):
-        h = inputfile.Get(histoname)
-        mean = h.GetMean()
-        logging.debug("Mean of histogram {0} --> {1}".format(histoname, mean))
-        if mean == 0:
-            logging.waring("Mean of histogram {0} in file {1} is Zero! Please Check.".format(histoname, inputfile))
-    else:
-        mean = 0
-        logging.error("Histogram not in file! Please check.")
-    return mean
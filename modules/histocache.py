@@ -0,0 +1,138 @@
+"""
+Persistent on-disk cache for the histogram arrays extracted from the inputfiles.
+
+Entries are keyed by path, size and modification time of the inputfile and the histogram name.
+Every histogram is saved as .npy file (loaded memory-mapped) and a manifest (.json) per
+inputfile holds mean and entries of the histograms. If the size of the cache exceeds the set
+limit, the least recently used inputfiles are removed.
+
+K. Schweiger, 2017
+"""
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+
+from modules.histograms import histosource, getFileIdentity
+
+class cachedsource(histosource):
+    """
+    Histogram source reading the memory-mapped arrays of one inputfile from the cache
+    """
+    def __init__(self, inputfile, cache, manifest):
+        histosource.__init__(self, inputfile)
+        self._cache = cache
+        self._manifest = manifest
+
+    def read(self, name):
+        if name not in self._manifest["histos"]:
+            return None
+        key, mean, entries = self._manifest["histos"][name]
+        return np.load(self._cache.getPath(key+".npy"), mmap_mode = "r"), mean, entries
+
+class histocache:
+    """
+    Cache in folder with a size limit of maxsize bytes. If refresh is True, existing entries
+    are not used but overwritten.
+    """
+    def __init__(self, folder, maxsize = 2*1024**3, refresh = False):
+        self.folder = os.path.expanduser(folder)
+        self.maxsize = maxsize
+        self.refresh = refresh
+        if not os.path.exists(self.folder):
+            logging.info("Creating folder: {0}".format(self.folder))
+            os.makedirs(self.folder)
+
+    def getPath(self, filename):
+        return os.path.join(self.folder, filename)
+
+    def getFileKey(self, inputfile):
+        return hashlib.sha1(getFileIdentity(inputfile).encode("utf-8")).hexdigest()
+
+    def getHistoKey(self, filekey, name):
+        return hashlib.sha1("{0}:{1}".format(filekey, name).encode("utf-8")).hexdigest()
+
+    def getSource(self, inputfile):
+        """
+        Returns a cachedsource for inputfile or None if inputfile is not in the cache
+        """
+        if self.refresh:
+            return None
+        manifestpath = self.getPath(self.getFileKey(inputfile)+".json")
+        if not os.path.exists(manifestpath):
+            logging.debug("File {0} not in cache".format(inputfile))
+            return None
+        with open(manifestpath, "r") as f:
+            manifest = json.load(f)
+        for key, mean, entries in manifest["histos"].values():
+            if not os.path.exists(self.getPath(key+".npy")):
+                logging.warning("Cache entry for file {0} is incomplete. Will be read again".format(inputfile))
+                return None
+        # Update modification time of the manifest for the LRU eviction
+        os.utime(manifestpath, None)
+        logging.info("Using cached histograms for file {0}".format(inputfile))
+        return cachedsource(inputfile, self, manifest)
+
+    def store(self, inputfile, histos):
+        """
+        Save the arrays of the histobundle histos for inputfile in the cache
+        """
+        logging.debug("Saving histograms of file {0} in cache".format(inputfile))
+        filekey = self.getFileKey(inputfile)
+        manifest = {"inputfile" : inputfile, "histos" : {}}
+        for name in histos.arrays:
+            key = self.getHistoKey(filekey, name)
+            self._writeAtomic(key+".npy", lambda f, array = histos.arrays[name]: np.save(f, array))
+            manifest["histos"][name] = [key, histos.means[name], histos.entries[name]]
+        # The manifest is written last so incomplete entries are never used
+        self._writeAtomic(filekey+".json", lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+        self.evict()
+
+    def _writeAtomic(self, filename, writefunction):
+        tmppath = self.getPath(filename+".tmp{0}".format(os.getpid()))
+        with open(tmppath, "wb") as f:
+            writefunction(f)
+        os.rename(tmppath, self.getPath(filename))
+
+    def evict(self):
+        """
+        Remove least recently used inputfiles until the cache size is below maxsize
+        """
+        manifests = []
+        totalsize = 0
+        for filename in os.listdir(self.folder):
+            try:
+                totalsize += os.path.getsize(self.getPath(filename))
+                if filename.endswith(".json"):
+                    manifests.append((os.path.getmtime(self.getPath(filename)), filename))
+            except OSError:
+                continue
+        for mtime, filename in sorted(manifests):
+            if totalsize <= self.maxsize:
+                break
+            logging.debug("Removing {0} from cache".format(filename))
+            manifestpath = self.getPath(filename)
+            try:
+                with open(manifestpath, "r") as f:
+                    manifest = json.load(f)
+                totalsize -= os.path.getsize(manifestpath)
+            except (IOError, OSError, ValueError):
+                continue
+            self._remove(manifestpath)
+            for key, mean, entries in manifest["histos"].values():
+                totalsize -= self._remove(self.getPath(key+".npy"))
+
+    def _remove(self, path):
+        """
+        Remove file and return its size. Other processes using the same cache can remove
+        the file at the same time.
+        """
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            logging.debug("File {0} already removed from cache".format(path))
+            size = 0
+        return size
@@ -0,0 +1,332 @@
+"""
+Module for loading all histograms needed for the occupancy measurement in a single pass.
+See HCheckList.md for the expected histograms. The histograms can be read from ROOT files or
+from numpy files (.npz or folder with .npy files) written with convertToNumpy. Inputfiles can also
+be a glob pattern or a folder with the ROOT files of the single jobs (e.g. CRAB output). Then the
+histograms of all jobs are merged (like hadd).
+
+K. Schweiger, 2017
+"""
+import logging
+import os
+import glob
+
+import numpy as np
+
+layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
+
+# Set to False to get all ROOT messages when reading ROOT files
+silenceROOT = True
+
+def getHistoNames():
+    """
+    Returns list of all histogram names read from the inputfiles. For the detector maps
+    the fallback names (d/hpixDets[X]) are included as well.
+    """
+    names = []
+    for i in range(1,5):
+        names += ["d/hpDetMap{0}".format(i), "d/hpixDets{0}".format(i),
+                  "d/hpladder{0}id".format(i),
+                  "d/hpixPerLay{0}".format(i), "d/hpixPerDet{0}".format(i),
+                  "d/hclusPerLay{0}".format(i), "d/hclusPerDet{0}".format(i)]
+    return names
+
+def getBinArray(histo):
+    """
+    Returns the bin contents (including under- and overflow) of a TH1 or TH2 as numpy array
+    without copying the bin buffer. For TH2 the array has the shape (nBinsY+2, nBinsX+2) so
+    h.GetBinContent(x, y) == array[y, x].
+    """
+    # The last character of the class name defines the type of the bin buffer (TH1F, TH2D, ...)
+    dtypes = {"F" : np.float32, "D" : np.float64, "I" : np.int32, "S" : np.int16, "C" : np.int8}
+    dtype = dtypes[histo.ClassName()[-1]]
+    nbins = histo.GetSize()
+    buf = histo.GetArray()
+    if hasattr(buf, "SetSize"):
+        buf.SetSize(nbins)
+    else:
+        buf.reshape((nbins,))
+    array = np.frombuffer(buf, dtype = dtype, count = nbins)
+    if histo.GetDimension() == 2:
+        array = array.reshape(histo.GetNbinsY()+2, histo.GetNbinsX()+2)
+    return array
+
+class histosource:
+    """
+    Base class for reading the histograms of one inputfile. Implementations return for a
+    histogram name a tuple (bin array, mean, entries) or None if the histogram is not available.
+    """
+    def __init__(self, inputfile):
+        self.inputfile = inputfile
+
+    def read(self, name):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class rootsource(histosource):
+    """
+    Histogram source for ROOT files (PyROOT). The histograms are detached from the file so the
+    bin arrays (views on the ROOT bin buffers) stay valid after the file is closed.
+    """
+    def __init__(self, inputfile):
+        import ROOT
+        if silenceROOT:
+            ROOT.gErrorIgnoreLevel = ROOT.kError
+
+        histosource.__init__(self, inputfile)
+        self._ROOT = ROOT
+        self._histos = {}
+        self._file = ROOT.TFile.Open(inputfile)
+
+    def read(self, name):
+        h = self._file.Get(name)
+        if h == None:
+            return None
+        h.SetDirectory(0)
+        # Histogram is deleted with the source (important if many files are merged)
+        self._ROOT.SetOwnership(h, True)
+        self._histos[name] = h
+        return getBinArray(h), h.GetMean(), h.GetEntries()
+
+    def close(self):
+        self._file.Close()
+
+class numpysource(histosource):
+    """
+    Histogram source for files written by convertToNumpy. Either a .npz file or a folder with
+    .npy files. The keys (relative paths without .npy) are the histogram names, the mean and
+    entries of the histogram are saved with the keys [name].mean and [name].entries.
+    """
+    def __init__(self, inputfile):
+        histosource.__init__(self, inputfile)
+        path = os.path.expanduser(inputfile)
+        if os.path.isdir(path):
+            self._folder = path
+            self._npz = None
+        else:
+            self._folder = None
+            self._npz = np.load(path)
+
+    def _load(self, key):
+        if self._npz is not None:
+            if key not in self._npz.files:
+                return None
+            return self._npz[key]
+        filename = os.path.join(self._folder, key+".npy")
+        if not os.path.exists(filename):
+            return None
+        return np.load(filename)
+
+    def read(self, name):
+        array = self._load(name)
+        if array is None:
+            return None
+        return array, float(self._load(name+".mean")), float(self._load(name+".entries"))
+
+    def close(self):
+        if self._npz is not None:
+            self._npz.close()
+
+class mergedsource(histosource):
+    """
+    Histogram source merging the histograms of several inputfiles (the outputs of the single jobs)
+    like hadd: The bin contents and entries are summed and the means are weighted with the entries.
+    The files are read one after another so only the merged arrays and the histograms of one file
+    are in memory. Files with a histogram binned differently than in the files before are skipped
+    completely. nJobs is the number of merged files.
+    """
+    def __init__(self, inputfile, jobfiles, cache = None):
+        histosource.__init__(self, inputfile)
+        self.nJobs = 0
+        self._arrays = {}
+        self._weightedmeans = {}
+        self._entries = {}
+        logging.info("Merging histograms of {0} files for {1}".format(len(jobfiles), inputfile))
+        for jobfile in jobfiles:
+            histos = loadHistograms(jobfile, cache)
+            mismatched = [name for name in histos.arrays
+                          if name in self._arrays and self._arrays[name].shape != histos.arrays[name].shape]
+            if mismatched:
+                logging.error("Histograms {0} in file {1} have a different binning. Skipping all histograms of this file".format(", ".join(mismatched), jobfile))
+                del histos
+                continue
+            self.nJobs += 1
+            for name in histos.arrays:
+                if name not in self._arrays:
+                    self._arrays[name] = np.array(histos.arrays[name], dtype = np.float64)
+                    self._weightedmeans[name] = 0.0
+                    self._entries[name] = 0.0
+                else:
+                    self._arrays[name] += histos.arrays[name]
+                self._weightedmeans[name] += histos.means[name] * histos.entries[name]
+                self._entries[name] += histos.entries[name]
+            del histos
+
+    def read(self, name):
+        if name not in self._arrays:
+            return None
+        mean = 0.0
+        if self._entries[name] > 0:
+            mean = self._weightedmeans[name] / self._entries[name]
+        return self._arrays[name], mean, self._entries[name]
+
+def getJobFiles(inputfile):
+    """
+    Returns the sorted list of ROOT files if inputfile is a glob pattern or a folder containing
+    ROOT files (searched recursively). For all other inputfiles None is returned.
+    """
+    path = os.path.expanduser(inputfile)
+    if glob.has_magic(path):
+        return sorted(glob.glob(path))
+    if os.path.isdir(path):
+        jobfiles = []
+        for dirpath, dirnames, filenames in os.walk(path):
+            jobfiles += [os.path.join(dirpath, filename) for filename in filenames if filename.endswith(".root")]
+        if jobfiles:
+            return sorted(jobfiles)
+    return None
+
+def getFileIdentity(inputfile):
+    """
+    Returns string identifying the content of inputfile by path, size and modification time.
+    For glob patterns and folders with ROOT files the identities of all files are joined.
+    None is returned if inputfile does not exist.
+    """
+    jobfiles = getJobFiles(inputfile)
+    if jobfiles is None:
+        jobfiles = [inputfile]
+    identities = []
+    for filename in jobfiles:
+        path = os.path.abspath(os.path.expanduser(filename))
+        if not os.path.exists(path):
+            return None
+        identities.append("{0}:{1}:{2!r}".format(path, os.path.getsize(path), os.path.getmtime(path)))
+    return ";".join(identities)
+
+def inputExists(inputfile):
+    """
+    Returns True if inputfile exists. For glob patterns at least one file has to match.
+    """
+    jobfiles = getJobFiles(inputfile)
+    if jobfiles is not None:
+        return len(jobfiles) > 0
+    return os.path.exists(os.path.expanduser(inputfile))
+
+def isNumpyInput(inputfile):
+    """
+    Returns True if inputfile is a .npz file or a folder with .npy files (written by convertToNumpy)
+    """
+    return inputfile.endswith(".npz") or (os.path.isdir(os.path.expanduser(inputfile)) and getJobFiles(inputfile) is None)
+
+def getSource(inputfile):
+    """
+    Returns the histogram source for the inputfile depending on the file type
+    """
+    if isNumpyInput(inputfile):
+        return numpysource(inputfile)
+    return rootsource(inputfile)
+
+def convertToNumpy(inputfile, outputfile):
+    """
+    Read all histograms in getHistoNames() from the ROOT file inputfile and save them with
+    mean and entries in outputfile. If outputfile ends with .npz a single file is written,
+    otherwise a folder with one .npy file per array.
+    """
+    logging.info("Converting {0} to {1}".format(inputfile, outputfile))
+    histos = histobundle(rootsource(inputfile))
+    arrays = {}
+    for name in histos.arrays:
+        arrays[name] = histos.arrays[name]
+        arrays[name+".mean"] = np.array(histos.means[name])
+        arrays[name+".entries"] = np.array(histos.entries[name])
+    if outputfile.endswith(".npz"):
+        np.savez(outputfile, **arrays)
+    else:
+        for key in arrays:
+            filename = os.path.join(outputfile, key+".npy")
+            if not os.path.exists(os.path.dirname(filename)):
+                os.makedirs(os.path.dirname(filename))
+            np.save(filename, arrays[key])
+
+def loadHistograms(inputfile, cache = None):
+    """
+    Returns the histobundle for inputfile. If a histocache is passed, the histograms are read
+    from the cache if possible and ROOT files not in the cache are added to it. For glob patterns
+    and folders with ROOT files the merged histograms of all files are returned (the single
+    files are cached).
+    """
+    jobfiles = getJobFiles(inputfile)
+    if jobfiles is not None:
+        return histobundle(mergedsource(inputfile, jobfiles, cache))
+    if cache is None or isNumpyInput(inputfile):
+        return histobundle(inputfile)
+    source = cache.getSource(inputfile)
+    if source is not None:
+        return histobundle(source)
+    histos = histobundle(inputfile)
+    cache.store(inputfile, histos)
+    return histos
+
+class histobundle:
+    """
+    Container for all histograms of one inputfile. The file is opened once and every histogram
+    in getHistoNames() is fetched once. inputfile can either be a file name (the source is
+    chosen by getSource) or a histosource. nJobs is the number of merged files for a mergedsource
+    and None otherwise.
+    """
+    def __init__(self, inputfile):
+        if isinstance(inputfile, histosource):
+            source = inputfile
+        else:
+            source = getSource(inputfile)
+        logging.debug("Loading histograms from file {0}".format(source.inputfile))
+        self.inputfile = source.inputfile
+        self.nJobs = getattr(source, "nJobs", None)
+        self.arrays = {}
+        self.means = {}
+        self.entries = {}
+        for name in getHistoNames():
+            histo = source.read(name)
+            if histo is None:
+                logging.debug("Histogram {0} not in file {1}".format(name, self.inputfile))
+                continue
+            self.arrays[name], self.means[name], self.entries[name] = histo
+        # Keep the source referenced: the arrays of the ROOT source are views on the histograms
+        self._source = source
+        source.close()
+
+    def has(self, name):
+        return name in self.arrays
+
+    def get(self, name):
+        """
+        Returns bin array for the histogram name or None if it was not in the inputfile
+        """
+        if name in self.arrays:
+            return self.arrays[name]
+        return None
+
+    def getDetMap(self, layerindex):
+        """
+        Returns the detector map (d/hpDetMap[X] or d/hpixDets[X] as fallback) for layer
+        index 1 to 4. None is returned if neither histogram was in the inputfile.
+        """
+        for name in ["d/hpDetMap{0}".format(layerindex), "d/hpixDets{0}".format(layerindex)]:
+            if name in self.arrays:
+                logging.debug("Using {0} for layer {1}".format(name, layerindex))
+                return self.arrays[name]
+        return None
+
+    def getMean(self, name):
+        logging.debug("Getting mean form histogram: {0}".format(name))
+        if name in self.means:
+            mean = self.means[name]
+            logging.debug("Mean of histogram {0} --> {1}".format(name, mean))
+            if mean == 0:
+                logging.warning("Mean of histogram {0} in file {1} is Zero! Please Check.".format(name, self.inputfile))
+        else:
+            mean = 0
+            logging.error("Histogram {0} not in file! Please check.".format(name))
+        return mean
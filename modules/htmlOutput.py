@@ -1,34 +1,95 @@
+"""
+Module for the HTML output. The pages are written while they are generated (see htmlpage) using
+the precompiled templates below, so at most one table is kept in memory.
+
+K. Schweiger, 2017
+"""
 import os
 import logging
 
 from datetime import datetime
-from collections import OrderedDict
+from string import Template
 
 import modules.pandasOutput
 import modules.output
+import modules.interactiveOutput
+import modules.settings
+
+pageHeader = "<!DOCTYPE html> \n <html> \n <body> \n"
+pageFooter = "</body> \n </html> \n"
+styleTemplate = Template("<style> \n table, th, td {\nborder: ${border} solid black;\n border-collapse: collapse;\n}\nth, td { padding: ${padding}; }\n</style>\n")
+footnoteTemplate = Template("<br><br><small>Generated: ${date} by K. Schweiger, korbinian.schweiger@cern.ch</small>\n")
+titleTemplate = Template("<h1>${title}</h1>${description}\n")
+runTemplate = Template("<hr>\n<h2 id=${run}>${run}</h2>\n${bunches} with average inst. luminosity: ${lumi} cm^-2 s^-1<br>\nDataset: ${dataset}<br>\n")
+linkTemplate = Template("<small><a href=${folder}/${name}.${extension}>${label}</a></small> ")
+imageTemplate = Template('<img src="${src}" alt="${src}" style="width:800px;height:600px;">\n')
+plotSectionTemplate = Template("<hr>\n<h3 id=${id}>${title}</h3>\n")
+
+class htmlpage:
+    """
+    HTML page that is written to filename while it is generated. Used as context manager: header
+    (and style, title, ...) are written on enter, footnote and footer on exit.
+    """
+    def __init__(self, filename, header, footnote = "", footer = pageFooter):
+        self.filename = filename
+        self.header = header
+        self.footnote = footnote
+        self.footer = footer
+
+    def __enter__(self):
+        logging.debug("Writing html file: {0}".format(self.filename))
+        self._file = open(self.filename, "w+")
+        self.write(*self.header)
+        return self
 
+    def write(self, *strings):
+        for string in strings:
+            self._file.write(string)
+
+    def writeTable(self, df):
+        df.to_html(buf = self._file)
+
+    def __exit__(self, *exception):
+        self.write(self.footnote, self.footer)
+        self._file.close()
+
+def getStyle(settings):
+    return styleTemplate.substitute(border = settings.bordersize, padding = settings.padding)
+
+def getFootnote():
+    return footnoteTemplate.substitute(date = datetime.now())
+
+def getRunDescription(run, container):
+    return runTemplate.substitute(run = run, bunches = container.comments[0], lumi = "{0}".format(container.instLumi),
+                                  dataset = container.comments[1])
+
+def getExportLinks(name, linkTeX, linkCSV, linkCFG):
+    """
+    Returns the links to the exported table name (see modules.output.exportTables)
+    """
+    links = ""
+    if linkTeX:
+        links += linkTemplate.substitute(folder = "tex", name = name, extension = "txt", label = "LaTeX")
+    if linkCSV:
+        links += linkTemplate.substitute(folder = "csv", name = name, extension = "csv", label = "CSV")
+    if linkCFG:
+        links += linkTemplate.substitute(folder = "cfg", name = name, extension = "txt", label = "CFG")
+    return links
 
 def makeFiles(titlestring, generaldescription, containerlist, runlist, foldername,
-              makeIndex = True, makeTables = True, makePlotOverview = True, plottuples = None,
+              makeIndex = True, makeTables = True, makePlotOverview = True, plots = None,
               fullperRunDF = None, fullRunCompDF = None, ZperRunDF = None, ZRunCompDF = None,
               LadderperRunDF = None, LadderRunCompDF = None, cfgname = None,
-              linkTeX = False, linkCSV = False, linkCFG = False):
+              linkTeX = False, linkCSV = False, linkCFG = False, interactive = False):
     """
-    Wrapper for other function defined in this module.
+    Wrapper for other function defined in this module. plots is the modules.plotting.plotregistry
+    with the plots for the overview pages. If interactive is True, they are drawn in the browser
+    (see modules.interactiveOutput).
     """
-    from ConfigParser import SafeConfigParser
     logging.info("Generating HTML files")
     ####################################################################
     # General HTML headers
-    styleconfig = SafeConfigParser()
-    logging.debug("Loading style config")
-    styleconfig.read("configs/style.cfg")
-
-    header = "<!DOCTYPE html> \n <html> \n <body> \n"
-    style = "<style> \n table, th, td {{\nborder: {0} solid black;\n border-collapse: collapse;\n}}\nth, td {{ padding: {1}; }}\n</style>\n".format(styleconfig.get("Tables","bordersize"),styleconfig.get("Tables","padding"))
-    footnote = "<br><br><small>Generated: {0} by K. Schweiger, korbinian.schweiger@cern.ch</small>\n".format(datetime.now())
-    footer = "</body> \n </html> \n"
-    htmltemplatetuple = (header, style, footnote, footer)
+    htmltemplatetuple = (pageHeader, getStyle(modules.settings.getSettings()), getFootnote(), pageFooter)
     ####################################################################
     if makeTables:
         #Check if DFs are passed -> Used to speed up the script
@@ -38,41 +99,37 @@ def makeFiles(titlestring, generaldescription, containerlist, runlist, foldernam
             DFstopass = (fullperRunDF, fullRunCompDF, ZperRunDF, ZRunCompDF, LadderperRunDF, LadderRunCompDF)
         makeComparisonFiles(titlestring, generaldescription, containerlist, runlist, foldername,
                             htmltemplates = htmltemplatetuple, DFs = DFstopass, linkTeX = linkTeX, linkCSV = linkCSV, linkCFG = linkCFG)
-    if makeIndex: #Make a landing page called index.html linking tables and plots (if passed as plottuples)
+    if makeIndex: #Make a landing page called index.html linking tables and plots (if passed as plots)
         commentsite = makeRunCommentPage(titlestring, runlist, foldername, htmltemplatetuple, containerlist)
         makeLandingPage(titlestring, runlist, foldername, htmltemplatetuple, makePlotOverview, cfgname, commentsite)
     if makePlotOverview:
-        if plottuples is None:
-            logging.error("No plotlists and names are given! No adding plots to index.")
+        if plots is None:
+            logging.error("No plots are given! No adding plots to index.")
         else:
-            for plottuple in plottuples: #Go through all groups
-                plotlist, group = plottuple
-                makePlotOverviewFile(titlestring, generaldescription, plotlist, runlist, foldername, group)
+            for group in plots.getValues("group"): #Go through all groups
+                makePlotOverviewFile(titlestring, generaldescription, plots, runlist, foldername, group, interactive)
 
 
 def makeComparisonFiles(titlestring, generaldescription, containerlist, runlist, foldername,
-                        singlerun = False, htmltemplates = None, DFs = None, linkTeX = False, linkCSV = False, linkCFG = False):
+                        singlerun = False, htmltemplates = None, DFs = None, linkTeX = False, linkCSV = False, linkCFG = False,
+                        tables = None):
     logging.info("Processing runs and generate HTML files")
-    from ConfigParser import SafeConfigParser
-    styleconfig = SafeConfigParser()
-    logging.debug("Loading style config")
-    styleconfig.read("configs/style.cfg")
+    settings = modules.settings.getSettings()
 
     layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
     groups = ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]
 
+    if DFs is None and tables is None:
+        tables = modules.pandasOutput.tablecache(containerlist, runlist)
     if DFs is None:
-        perRunTables, runcomparisonperLayer = modules.pandasOutput.makeFullDetectorTables(containerlist, runlist, singlerun)
+        perRunTables, runcomparisonperLayer = tables.getFullDetectorTables(singlerun)
     else:
         perRunTables, runcomparisonperLayer = DFs[0], DFs[1]
 
     if htmltemplates is None:
-        header = "<!DOCTYPE html> \n <html> \n <body> \n"
-        style = "<style> \n table, th, td {{\nborder: {0} solid black;\n border-collapse: collapse;\n}}\nth, td {{ padding: {1}; }}\n</style>\n".format(styleconfig.get("Tables","bordersize"),styleconfig.get("Tables","padding"))
-        footnote = ""
-        footer = "</body> \n </html> \n"
+        header, style, footnote, footer = pageHeader, getStyle(settings), "", pageFooter
     else:
-        header,style, footnote, footer = htmltemplates
+        header, style, footnote, footer = htmltemplates
     if foldername is not None:
         if not os.path.exists(foldername):
             logging.info("Creating folder: {0}".format(foldername))
@@ -81,111 +138,48 @@ def makeComparisonFiles(titlestring, generaldescription, containerlist, runlist,
     logging.info("Comparison HTML tables and files")
     #HTML file with "Pix/Lay", "Pix/Det", "Clus/Lay" and "Clus/Det" tables for all layer and all processed run
 
-    title = "<h1>{0}</h1>{1}\n".format(titlestring, generaldescription)
-    blocks = []
-    blocks.append(header)
-    blocks.append(style)
-    blocks.append(title)
+    title = titleTemplate.substitute(title = titlestring, description = generaldescription)
     PerRunDFs = modules.output.makePerRunDFs(perRunTables, runlist, groups)
-    for run in runlist:
-        block = "<hr>\n<h2 id={4}>{0}</h2>\n{1} with average inst. luminosity: {2} cm^-2 s^-1<br>\nDataset: {3}<br>\n".format(run, containerlist[run].comments[0], containerlist[run].instLumi, containerlist[run].comments[1],run)
-        block = block + "Working modules (from hpDetMap):<br>"
-        for layer in layerNames:
-            block = block + "{0}: {1} modules<br>".format(layer, containerlist[run].nWorkingModules[layer])
-        for group in groups:
-            block += "<h3>{0} ({1})    ".format(styleconfig.get("Renaming", group), group)
-            if linkTeX:
-                block += "<small><a href=tex/fullPerRun_{0}_{1}.txt>LaTeX</a></small> ".format(run, group.replace("/","per"))
-            if linkCSV:
-                block += "<small><a href=csv/fullPerRun_{0}_{1}.csv>CSV</a></small> ".format(run, group.replace("/","per"))
-            if linkCFG:
-                block += "<small><a href=cfg/fullPerRun_{0}_{1}.txt>CFG</a></small> ".format(run, group.replace("/","per"))
-            block += "</h3>\n{0}".format(PerRunDFs["{0}_{1}".format(run, group)].to_html())
-        blocks.append(block+"<br>\n")
-    blocks.append(footnote)
-    blocks.append(footer)
-    modules.pandasOutput.writeListToFile(blocks, "{0}/perRunTables.html".format(foldername))
+    with htmlpage("{0}/perRunTables.html".format(foldername), (header, style, title), footnote, footer) as page:
+        for run in runlist:
+            page.write(getRunDescription(run, containerlist[run]), "Working modules (from hpDetMap):<br>")
+            for layer in layerNames:
+                page.write("{0}: {1} modules<br>".format(layer, containerlist[run].nWorkingModules[layer]))
+            for group in groups:
+                page.write("<h3>{0} ({1})    ".format(settings.rename(group), group),
+                           getExportLinks("fullPerRun_{0}_{1}".format(run, group.replace("/","per")), linkTeX, linkCSV, linkCFG), "</h3>\n")
+                page.writeTable(PerRunDFs["{0}_{1}".format(run, group)])
+            page.write("<br>\n")
     #HTML file per Layer with comparisons for all processed runs for "Pix/Lay", "Pix/Det", "Clus/Lay" and "Clus/Det"
     if runcomparisonperLayer is not None:
         RunCompDFs = modules.output.makeRunCompDFs(runcomparisonperLayer, layerNames, groups)
         for layer in layerNames:
-            blocks = []
-            blocks.append(header)
-            blocks.append(style)
-            blocks.append(title)
-            block = "<h2>Run comparion for {0}</h2>\n".format(layer)
-            for group in groups:
-                block = block + "<hr>\n<h3>{0} ({1})   ".format(styleconfig.get("Renaming", group), group)
-                if linkTeX:
-                    block += "<small><a href=tex/fullRunComp_{0}_{1}.txt>LaTeX</a></small> ".format(layer, group.replace("/","per"))
-                if linkCSV:
-                    block += "<small><a href=csv/fullRunComp_{0}_{1}.csv>CSV</a></small> ".format(layer, group.replace("/","per"))
-                if linkCFG:
-                    block += "<small><a href=cfg/fullRunComp_{0}_{1}.txt>CFG</a></small> ".format(layer, group.replace("/","per"))
-                block += "</h3>\n{0}".format(RunCompDFs["{0}_{1}".format(layer, group)].to_html())
-            blocks.append(block+"<br>\n")
-            blocks.append(footnote)
-            blocks.append(footer)
-            modules.pandasOutput.writeListToFile(blocks, "{0}/runComparison{1}.html".format(foldername, layer))
+            with htmlpage("{0}/runComparison{1}.html".format(foldername, layer), (header, style, title), footnote, footer) as page:
+                page.write("<h2>Run comparion for {0}</h2>\n".format(layer))
+                for group in groups:
+                    page.write("<hr>\n<h3>{0} ({1})   ".format(settings.rename(group), group),
+                               getExportLinks("fullRunComp_{0}_{1}".format(layer, group.replace("/","per")), linkTeX, linkCSV, linkCFG), "</h3>\n")
+                    page.writeTable(RunCompDFs["{0}_{1}".format(layer, group)])
+                page.write("<br>\n")
     #HTML file per group with z-dependent values per layer
     #for group in groups = ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]:
     if DFs is None:
-        perRunTables = modules.pandasOutput.makeZdepDetectorTables(containerlist, runlist, singlerun)[0]
+        perRunTables = tables.getZdepDetectorTables(singlerun)[0]
     else:
         perRunTables = DFs[2]
-
-    perRunDFs = modules.output.makePerRunDFs(perRunTables, runlist, ["Pix/Lay"], layerNames)
-    for group in ["Pix/Lay"]:
-        blocks = []
-        blocks.append(header)
-        blocks.append(style)
-        blocks.append("<h1>{0} - z-dependency</h1>{1}\n<br><b>{2} ({3})</b>".format(titlestring, generaldescription, styleconfig.get("Renaming", group), group))
-        for run in runlist:
-            block = "<hr>\n<h2 id={4}>{0}</h2>\n{1} with average inst. luminosity: {2} cm^-2 s^-1<br>\nDataset: {3}<br>\n".format(run, containerlist[run].comments[0], containerlist[run].instLumi, containerlist[run].comments[1], run)
-            for layer in layerNames:
-                block = block + "<h3>{0}    ".format(layer)
-                if linkTeX:
-                    block += "<small><a href=tex/zPerRun_{0}_{1}_{2}.txt>LaTeX</a></small> ".format(run, group.replace("/","per"), layer)
-                if linkCSV:
-                    block += "<small><a href=csv/zPerRun_{0}_{1}_{2}.csv>CSV</a></small> ".format(run, group.replace("/","per"), layer)
-                if linkCFG:
-                    block += "<small><a href=cfg/zPerRun_{0}_{1}_{2}.txt>CFG</a></small> ".format(run, group.replace("/","per"), layer)
-                block += "</h3>\n{0}".format(perRunDFs["{0}_{1}_{2}".format(run, group, layer)].to_html())
-            blocks.append(block+"<br>\n")
-        blocks.append(footnote)
-        blocks.append(footer)
-        modules.pandasOutput.writeListToFile(blocks, "{0}/zDependency{1}.html".format(foldername, group.replace("/","per")))
+    makePartialDetectorFile(perRunTables, "z-dependency", "zDependency", "zPerRun", titlestring, generaldescription, containerlist, runlist,
+                            foldername, (header, style, footnote, footer), linkTeX, linkCSV, linkCFG)
 
     #HTML file per group for inner/outer ladder values per layer
     if DFs is None:
-        perRunTables = modules.pandasOutput.makeInnerOuterLadderDetectorTables(containerlist, runlist, singlerun)[0]
+        perRunTables = tables.getInnerOuterLadderDetectorTables(singlerun)[0]
     else:
         perRunTables = DFs[4]
-
-    perRunDFs = modules.output.makePerRunDFs(perRunTables, runlist, ["Pix/Lay"], layerNames)
-    for group in ["Pix/Lay"]:
-        blocks = []
-        blocks.append(header)
-        blocks.append(style)
-        blocks.append("<h1>{0} - Inner/Outer ladder dependency</h1>{1}\n<br><b>{2} ({3})</b>".format(titlestring, generaldescription, styleconfig.get("Renaming", group), group))
-        for run in runlist:
-            block = "<hr>\n<h2 id={4}>{0}</h2>\n{1} with average inst. luminosity: {2} cm^-2 s^-1<br>\nDataset: {3}<br>\n".format(run, containerlist[run].comments[0], containerlist[run].instLumi, containerlist[run].comments[1], run)
-            for layer in layerNames:
-                block = block + "<h3>{0}    ".format(layer)
-                if linkTeX:
-                    block += "<small><a href=tex/InOutPerRun_{0}_{1}_{2}.txt>LaTeX</a></small> ".format(run, group.replace("/","per"), layer)
-                if linkCSV:
-                    block += "<small><a href=csv/InOutPerRun_{0}_{1}_{2}.csv>CSV</a></small> ".format(run, group.replace("/","per"), layer)
-                if linkCFG:
-                    block += "<small><a href=cfg/InOutPerRun_{0}_{1}_{2}.txt>CFG</a></small> ".format(run, group.replace("/","per"), layer)
-                block += "</h3>\n{0}".format(perRunDFs["{0}_{1}_{2}".format(run, group, layer)].to_html())
-            blocks.append(block+"<br>\n")
-        blocks.append(footnote)
-        blocks.append(footer)
-        modules.pandasOutput.writeListToFile(blocks, "{0}/InnerOuterLadderDependency{1}.html".format(foldername, group.replace("/","per")))
+    makePartialDetectorFile(perRunTables, "Inner/Outer ladder dependency", "InnerOuterLadderDependency", "InOutPerRun", titlestring, generaldescription,
+                            containerlist, runlist, foldername, (header, style, footnote, footer), linkTeX, linkCSV, linkCFG)
 
     if DFs is None:
-        RunCompDFs = modules.pandasOutput.makeInnerOuterLadderDetectorTables(containerlist, runlist, singlerun)[1]
+        RunCompDFs = tables.getInnerOuterLadderDetectorTables(singlerun)[1]
     else:
         RunCompDFs = DFs[5]
 
@@ -194,189 +188,138 @@ def makeComparisonFiles(titlestring, generaldescription, containerlist, runlist,
 
         for layer in layerNames:
             for ladder in ["inner", "outer"]:
-                blocks = []
-                blocks.append(header)
-                blocks.append(style)
-                blocks.append("<h1>Run comparison for {0} modules on {1}</h1>".format(ladder, layer))
-                block = ""
-                for group in ["Pix/Lay"]:
-                    block += "<h2>{0} ({1})    ".format(styleconfig.get("Renaming", group), group)
-                    if linkTeX:
-                        block += "<small><a href=tex/partialRunComp_{0}_{1}_{2}.txt>LaTeX</a></small> ".format(layer, group.replace("/","per"), ladder)
-                    if linkCSV:
-                        block += "<small><a href=csv/partialRunComp_{0}_{1}_{2}.csv>CSV</a></small> ".format(layer, group.replace("/","per"), ladder)
-                    if linkCFG:
-                        block += "<small><a href=cfg/partialRunComp_{0}_{1}_{2}.txt>CFG</a></small> ".format(layer, group.replace("/","per"), ladder)
-                    block += "</h3>\n{0}\n".format(RunCompDFs["{0}_{1}_{2}".format(layer, group, ladder)].to_html())
-                blocks.append(block+"<br>\n")
-                blocks.append(footnote)
-                blocks.append(footer)
-                modules.pandasOutput.writeListToFile(blocks, "{0}/runComparison{1}_{2}.html".format(foldername, layer, ladder))
-
-
-
-def makePlotOverviewFile(titlestring, generaldescription, generatedplots, runlist, foldername, midfix = "Pix/Lay"):
+                with htmlpage("{0}/runComparison{1}_{2}.html".format(foldername, layer, ladder),
+                              (header, style, "<h1>Run comparison for {0} modules on {1}</h1>".format(ladder, layer)), footnote, footer) as page:
+                    for group in ["Pix/Lay"]:
+                        page.write("<h2>{0} ({1})    ".format(settings.rename(group), group),
+                                   getExportLinks("partialRunComp_{0}_{1}_{2}".format(layer, group.replace("/","per"), ladder), linkTeX, linkCSV, linkCFG), "</h3>\n")
+                        page.writeTable(RunCompDFs["{0}_{1}_{2}".format(layer, group, ladder)])
+                        page.write("\n")
+                    page.write("<br>\n")
+
+def makePartialDetectorFile(perRunTables, description, filename, exportname, titlestring, generaldescription, containerlist, runlist,
+                            foldername, htmltemplates, linkTeX = False, linkCSV = False, linkCFG = False):
+    """
+    HTML file per group with the partial detector tables (perRunTables from modules.pandasOutput) per run and layer
     """
-    Make overview page (subpages) for plot generated with modules.pandasOutput.makeRunComparisonPlots.
+    settings = modules.settings.getSettings()
+    layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
+    header, style, footnote, footer = htmltemplates
+    perRunDFs = modules.output.makePerRunDFs(perRunTables, runlist, ["Pix/Lay"], layerNames)
+    for group in ["Pix/Lay"]:
+        title = "<h1>{0} - {4}</h1>{1}\n<br><b>{2} ({3})</b>".format(titlestring, generaldescription, settings.rename(group), group, description)
+        with htmlpage("{0}/{1}{2}.html".format(foldername, filename, group.replace("/","per")), (header, style, title), footnote, footer) as page:
+            for run in runlist:
+                page.write(getRunDescription(run, containerlist[run]))
+                for layer in layerNames:
+                    page.write("<h3>{0}    ".format(layer),
+                               getExportLinks("{0}_{1}_{2}_{3}".format(exportname, run, group.replace("/","per"), layer), linkTeX, linkCSV, linkCFG), "</h3>\n")
+                    page.writeTable(perRunDFs["{0}_{1}_{2}".format(run, group, layer)])
+                page.write("<br>\n")
 
-    Uses keywords which are expected in the filename. Currently implemented 'RunComp' and [runnumbers].
-    For RunComp the keywords Layer[X] and allLayers are grouped.
+def getPlotElement(plot, foldername, interactive = False):
+    if interactive:
+        return modules.interactiveOutput.getPlotElement(plot)
+    return imageTemplate.substitute(src = plot[len(foldername)+1::])
+
+def makePlotOverviewFile(titlestring, generaldescription, plots, runlist, foldername, midfix = "Pix/Lay", interactive = False):
+    """
+    Make overview page (subpages) for the plots of group midfix in plots (modules.plotting.plotregistry).
+    If interactive is True, the plots are drawn in the browser (see modules.interactiveOutput).
+
+    Plots of single runs are grouped by run. Run comparison plots are grouped by layer (Layer[X] and
+    allLayers) and for Pix/Lay by inner/outer ladder region.
     """
     if not os.path.exists(foldername):
         logging.info("Creating folder: {0}".format(foldername))
         os.makedirs(foldername)
 
     logging.info("Generating HTML plot overview files")
-    header = "<!DOCTYPE html> \n <html> \n <body> \n"
-    title = "<h1>{0}</h1>{1}\n".format(titlestring, generaldescription)
-    footer = "</body> \n </html> \n"
-    footnote = "<br><br><small>Generated: {0} by K. Schweiger, korbinian.schweiger@cern.ch</small>\n".format(datetime.now())
+    header = pageHeader
+    if interactive:
+        header += modules.interactiveOutput.scripts
+    title = titleTemplate.substitute(title = titlestring, description = generaldescription)
+    footnote = getFootnote()
+    def writePlots(page, **tags):
+        for record in plots.get(group = midfix, **tags):
+            page.write(getPlotElement(record.filename, foldername, interactive))
     #Single Runs
-    blocks = []
-    blocks.append(header)
-    blocks.append(title)
-    blocks.append("<h2>Comparison of rate and occupancy of all layer for each processed run</h2>\n")
-    runsadded = 0
-    for run in runlist:
-        runblock = []
-        nfiles = 0
-        runblock.append("<hr>\n<h3 id={1}>{0}</h3>\n".format(run, run))
-        for plot in generatedplots:
-            filename = plot.split("/")[-1].split(".")[0]
-            if run in filename:
-                nfiles += 1
-                runblock.append('<img src="{0}" alt="{0}" style="width:800px;height:600px;">\n'.format(plot[len(foldername)+1::]))
-        if nfiles > 0:
-            blocks = blocks + runblock
-            runsadded += 1
-    blocks.append(footnote)
-    blocks.append(footer)
-    if runsadded > 0:
-        modules.pandasOutput.writeListToFile(blocks, "{0}/plots_{1}_perRun.html".format(foldername, midfix.replace("/","per")))
+    runswithplots = [run for run in runlist if len(plots.get(group = midfix, run = run)) > 0]
+    if len(runswithplots) > 0:
+        with htmlpage("{0}/plots_{1}_perRun.html".format(foldername, midfix.replace("/","per")), (header, title), footnote) as page:
+            page.write("<h2>Comparison of rate and occupancy of all layer for each processed run</h2>\n")
+            for run in runswithplots:
+                page.write(plotSectionTemplate.substitute(id = run, title = run))
+                writePlots(page, run = run)
     logging.info("Saved: {0}/plots_{1}_perRun.html".format(foldername, midfix.replace("/","per")))
 
-    blocks = []
-    blocks.append(header)
-    blocks.append(title)
-    blocks.append("<h2>Run comparison</h2>\n")
-    blocks.append("<hr>\n<h3 id=allLayers>Plots for all layers</h3>\n")
-    for plot in generatedplots:
-        filename = plot.split("/")[-1].split(".")[0]
-        if "allLayers" in filename and not("inner" in filename or "outer" in filename):
-            blocks.append('<img src="{0}" alt="{0}" style="width:800px;height:600px;">\n'.format(plot[len(foldername)+1::]))
-    for layer in ["Layer1", "Layer2", "Layer3", "Layer4"]:
-        blocks.append("<hr>\n<h3 id={0}>Plots for {0}</h3>\n".format(layer))
-        for plot in generatedplots:
-            filename = plot.split("/")[-1].split(".")[0]
-            if layer in filename and not "InnerVsOuter" in filename:
-                blocks.append('<img src="{0}" alt="{0}" style="width:800px;height:600px;">\n'.format(plot[len(foldername)+1::]))
-    blocks.append(footnote)
-    blocks.append(footer)
-    modules.pandasOutput.writeListToFile(blocks, "{0}/plots_{1}_runComp.html".format(foldername, midfix.replace("/","per")))
+    with htmlpage("{0}/plots_{1}_runComp.html".format(foldername, midfix.replace("/","per")), (header, title), footnote) as page:
+        page.write("<h2>Run comparison</h2>\n", plotSectionTemplate.substitute(id = "allLayers", title = "Plots for all layers"))
+        writePlots(page, run = None, layer = "allLayers", region = "full")
+        for layer in ["Layer1", "Layer2", "Layer3", "Layer4"]:
+            page.write(plotSectionTemplate.substitute(id = layer, title = "Plots for {0}".format(layer)))
+            writePlots(page, run = None, layer = layer, region = "full")
     logging.info("Saved: {0}/plots_{1}_runComp.html".format(foldername, midfix.replace("/","per")))
 
     if midfix == "Pix/Lay":
         #Inner/outer comparisons per layer
-        blocks = []
-        blocks.append(header)
-        blocks.append(title)
-        blocks.append("<h2>Run comparison - Inner/outer ladder dependency</h2>\n")
-        for layer in ["Layer1", "Layer2", "Layer3", "Layer4"]:
-            blocks.append("<hr>\n<h3 id={0}>Plots for {0}</h3>\n".format(layer))
-            for plot in generatedplots:
-                filename = plot.split("/")[-1].split(".")[0]
-                if "InnerVsOuter" in filename and layer in filename:
-                    blocks.append('<img src="{0}" alt="{0}" style="width:800px;height:600px;">\n'.format(plot[len(foldername)+1::]))
-        blocks.append(footnote)
-        blocks.append(footer)
-        modules.pandasOutput.writeListToFile(blocks, "{0}/plots_{1}_InnerVsOuterRunComp.html".format(foldername, midfix.replace("/","per")))
+        with htmlpage("{0}/plots_{1}_InnerVsOuterRunComp.html".format(foldername, midfix.replace("/","per")), (header, title), footnote) as page:
+            page.write("<h2>Run comparison - Inner/outer ladder dependency</h2>\n")
+            for layer in ["Layer1", "Layer2", "Layer3", "Layer4"]:
+                page.write(plotSectionTemplate.substitute(id = layer, title = "Plots for {0}".format(layer)))
+                writePlots(page, layer = layer, region = "innerVsOuter")
         logging.info("Saved: {0}/plots_{1}_InnerVsOuterRunComp.html".format(foldername, midfix.replace("/","per")))
 
         #Comparsion of layer for inner and outer modules
-        blocks = []
-        blocks.append(header)
-        blocks.append(title)
-        blocks.append("<h2>Run comparison - Inner/outer ladder dependency</h2>\n")
-        for ladder in ["inner","outer"]:
-            blocks.append("<hr>\n<h3 id={0}>Plots for {0} modules</h3>\n".format(ladder))
-            for plot in generatedplots:
-                filename = plot.split("/")[-1].split(".")[0]
-                if filename.startswith("{0}RunComp".format(ladder)):
-                    blocks.append('<img src="{0}" alt="{0}" style="width:800px;height:600px;">\n'.format(plot[len(foldername)+1::]))
-        blocks.append(footnote)
-        blocks.append(footer)
-        modules.pandasOutput.writeListToFile(blocks, "{0}/plots_{1}_InnerOuterLadderRunComp.html".format(foldername, midfix.replace("/","per")))
+        with htmlpage("{0}/plots_{1}_InnerOuterLadderRunComp.html".format(foldername, midfix.replace("/","per")), (header, title), footnote) as page:
+            page.write("<h2>Run comparison - Inner/outer ladder dependency</h2>\n")
+            for ladder in ["inner","outer"]:
+                page.write(plotSectionTemplate.substitute(id = ladder, title = "Plots for {0} modules".format(ladder)))
+                writePlots(page, region = ladder)
         logging.info("Saved: {0}/plots_{1}_InnerOuterLadderRunComp.html".format(foldername, midfix.replace("/","per")))
 
+def getLayerLinks(page, layers, anchor = "", separator = " "):
+    """
+    Returns the links to the pages (page.format(layer)) for layers. Used on the landing page.
+    """
+    labels = {"allLayers" : "all Layers", "Layer1" : "Layer 1", "Layer2" : "Layer 2", "Layer3" : "Layer 3", "Layer4" : "Layer 4"}
+    return separator.join("<a href={0}{1}>{2}</a>".format(page.format(layer), anchor.format(layer), labels[layer]) for layer in layers)
+
 def makeLandingPage(titlestring, runlist, foldername, htmltemplates, plotsgenerated = True, cfgname = None, commentfile = None):
 
     header, style, footnote, footer = htmltemplates
     title = "<h1>{0}</h1>\n Codebase and instructions on <a href=https://github.com/kschweiger/Occupancy>GitHub</a> <br> \nClick <a href={1}>here</a> to view the configuration file. <br><br>\nTo view comments for the different runs, click <a href={2}>here</a>.".format(titlestring, cfgname, commentfile)
-    blocks = []
-    blocks.append(header)
-    blocks.append(style)
-    blocks.append(title)
-    subheaderperRun = "<h2> Per run monitoring</h2>\n"
-    fullDettableref = "Full Detector: Tabels for runs: "
-    zDeptableref = "<br>Z-depencdency: Tabels for runs: "
-    InOutDeptableref = "<br>Inner/Outer ladder dependency: Tables for runs: "
-    zDepPlotref = "<br><br>Z-depencdency: Plots for runs: "
-    for run in runlist:
-        fullDettableref += "<a href=perRunTables.html#{0}>{1}</a> ".format(run, run)
-        zDeptableref += "<a href=zDependencyPixperLay.html#{0}>{1}</a> ".format(run, run)
-        InOutDeptableref += "<a href=InnerOuterLadderDependencyPixperLay.html#{0}>{1}</a> ".format(run, run)
+    layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
+    with htmlpage("{0}/index.html".format(foldername), (header, style, title), footnote, footer) as page:
+        page.write("<h2> Per run monitoring</h2>\n")
+        page.write("Full Detector: Tabels for runs: ", "".join("<a href=perRunTables.html#{0}>{0}</a> ".format(run) for run in runlist), "\n")
+        page.write("<br>Z-depencdency: Tabels for runs: ", "".join("<a href=zDependencyPixperLay.html#{0}>{0}</a> ".format(run) for run in runlist),
+                   "(calculated from pixels hit per layer)\n")
+        page.write("<br>Inner/Outer ladder dependency: Tables for runs: ",
+                   "".join("<a href=InnerOuterLadderDependencyPixperLay.html#{0}>{0}</a> ".format(run) for run in runlist))
+        if plotsgenerated:
+            page.write("<br><br>Z-depencdency: Plots for runs: ", "".join("<a href=plots_PixperLay_perRun.html#{0}>{0}</a> ".format(run) for run in runlist),
+                       "(calculated from pixels hit per layer)\n")
+
+        page.write("<h2>Run comparion</h2>\n")
+        page.write("Full detector: Tables for: ", getLayerLinks("runComparison{0}.html", layerNames), "<br> \n")
+        page.write("Modules on inner Ladder: Tables for ", getLayerLinks("runComparison{0}_inner.html", layerNames), "<br> \n")
+        page.write("Modules on outer Ladder: Tables for ", getLayerLinks("runComparison{0}_outer.html", layerNames), "<br> \n")
         if plotsgenerated:
-            zDepPlotref += "<a href=plots_PixperLay_perRun.html#{0}>{1}</a> ".format(run, run)
-    fullDettableref += "\n"
-    zDeptableref += "(calculated from pixels hit per layer)\n"
-    if plotsgenerated:
-        zDepPlotref += "(calculated from pixels hit per layer)\n"
-    blocks.append(subheaderperRun)
-    blocks.append(fullDettableref)
-    blocks.append(zDeptableref)
-    blocks.append(InOutDeptableref)
-    if plotsgenerated:
-        blocks.append(zDepPlotref)
-
-    subheaderRunComp = "<h2>Run comparion</h2>\n"
-    fullDettablerefcomp = "Full detector: Tables for: <a href=runComparisonLayer1.html>Layer 1</a> <a href=runComparisonLayer2.html>Layer 2</a> <a href=runComparisonLayer3.html>Layer 3</a> <a href=runComparisonLayer4.html>Layer 4</a><br> \n"
-    innerLaddertablerefcomp = "Modules on inner Ladder: Tables for <a href=runComparisonLayer1_inner.html>Layer 1</a> <a href=runComparisonLayer2_inner.html>Layer 2</a> <a href=runComparisonLayer3_inner.html>Layer 3</a> <a href=runComparisonLayer4_inner.html>Layer 4</a><br> \n"
-    outerLaddertablerefcomp = "Modules on outer Ladder: Tables for <a href=runComparisonLayer1_outer.html>Layer 1</a> <a href=runComparisonLayer2_outer.html>Layer 2</a> <a href=runComparisonLayer3_outer.html>Layer 3</a> <a href=runComparisonLayer4_outer.html>Layer 4</a><br> \n"
-    if plotsgenerated:
-        fullDetplotPixPerLayrefcomp = "<br>Full detector: Plots for <a href=plots_PixperLay_runComp.html#allLayers>all Layers</a>, <a href=plots_PixperLay_runComp.html#Layer1>Layer 1</a>, <a href=plots_PixperLay_runComp.html#Layer2>Layer 2</a>, <a href=plots_PixperLay_runComp.html#Layer3>Layer 3</a>, <a href=plots_PixperLay_runComp.html#Layer4>Layer 4</a> (calculated from <mark>pixels hit per layer</mark>)<br>\n"
-        fullDetplotPixPerDetrefcomp = "Full detector: Plots for <a href=plots_PixperDet_runComp.html#allLayers>all Layers</a>, <a href=plots_PixperDet_runComp.html#Layer1>Layer 1</a>, <a href=plots_PixperDet_runComp.html#Layer2>Layer 2</a>, <a href=plots_PixperDet_runComp.html#Layer3>Layer 3</a>, <a href=plots_PixperDet_runComp.html#Layer4>Layer 4</a> (calculated from <mark>pixels hit per det</mark>)<br>\n"
-        fullDetplotClusPerLayrefcomp = "Full detector: Plots for <a href=plots_ClusperLay_runComp.html#allLayers>all Layers</a>, <a href=plots_ClusperLay_runComp.html#Layer1>Layer 1</a>, <a href=plots_ClusperLay_runComp.html#Layer2>Layer 2</a>, <a href=plots_ClusperLay_runComp.html#Layer3>Layer 3</a>, <a href=plots_ClusperLay_runComp.html#Layer4>Layer 4</a> (calculated from <mark>clusters hit per layer</mark>)<br>\n"
-        fullDetplotClusPerDetrefcomp = "Full detector: Plots for <a href=plots_ClusperDet_runComp.html#allLayers>all Layers</a>, <a href=plots_ClusperDet_runComp.html#Layer1>Layer 1</a>, <a href=plots_ClusperDet_runComp.html#Layer2>Layer 2</a>, <a href=plots_ClusperDet_runComp.html#Layer3>Layer 3</a>, <a href=plots_ClusperDet_runComp.html#Layer4>Layer 4</a> (calculated from <mark>clusters hit per det</mark>)<br>\n"
-        Laddertablerefcompplots = "Comparison inner and outer ladder: Plots for <a href=plots_PixperLay_InnerVsOuterRunComp.html#Layer1>Layer 1</a>, <a href=plots_PixperLay_InnerVsOuterRunComp.html#Layer2>Layer 2</a>, <a href=plots_PixperLay_InnerVsOuterRunComp.html#Layer3>Layer 3</a>, <a href=plots_PixperLay_InnerVsOuterRunComp.html#Layer4>Layer 4</a> (calculated from <mark>pixels hit per layer</mark>)<br>\n"
-        Laddertablerefcompplots2 = "Comparison inner and outer ladder: Plots for <a href=plots_PixperLay_InnerOuterLadderRunComp.html#inner>Inner modules</a>, <a href=plots_PixperLay_InnerOuterLadderRunComp.html#outer>Outer modules</a>(calculated from <mark>pixels hit per layer</mark>)<br>\n"
-    toOverviewfooter = "<br><br><hr>\nFor different run compositions click <a href=https://test-occupancy.web.cern.ch/test-occupancy/DivOverviews.html>here</a>\n"
-    blocks.append(subheaderRunComp)
-    blocks.append(fullDettablerefcomp)
-    blocks.append(innerLaddertablerefcomp)
-    blocks.append(outerLaddertablerefcomp)
-    if plotsgenerated:
-        blocks.append(fullDetplotPixPerLayrefcomp)
-        blocks.append(fullDetplotPixPerDetrefcomp)
-        blocks.append(fullDetplotClusPerLayrefcomp)
-        blocks.append(fullDetplotClusPerDetrefcomp)
-        blocks.append(Laddertablerefcompplots)
-        blocks.append(Laddertablerefcompplots2)
-    blocks.append(toOverviewfooter)
-    blocks.append(footnote)
-    blocks.append(footer)
-    modules.pandasOutput.writeListToFile(blocks, "{0}/index.html".format(foldername))
+            for group, groupname, prefix in [("PixperLay", "pixels hit per layer", "<br>"), ("PixperDet", "pixels hit per det", ""),
+                                             ("ClusperLay", "clusters hit per layer", ""), ("ClusperDet", "clusters hit per det", "")]:
+                page.write(prefix, "Full detector: Plots for ",
+                           getLayerLinks("plots_{0}_runComp.html".format(group), ["allLayers"]+layerNames, "#{0}", ", "),
+                           " (calculated from <mark>{0}</mark>)<br>\n".format(groupname))
+            page.write("Comparison inner and outer ladder: Plots for ", getLayerLinks("plots_PixperLay_InnerVsOuterRunComp.html", layerNames, "#{0}", ", "),
+                       " (calculated from <mark>pixels hit per layer</mark>)<br>\n")
+            page.write("Comparison inner and outer ladder: Plots for <a href=plots_PixperLay_InnerOuterLadderRunComp.html#inner>Inner modules</a>, ",
+                       "<a href=plots_PixperLay_InnerOuterLadderRunComp.html#outer>Outer modules</a>(calculated from <mark>pixels hit per layer</mark>)<br>\n")
+        page.write("<br><br><hr>\nFor different run compositions click <a href=https://test-occupancy.web.cern.ch/test-occupancy/DivOverviews.html>here</a>\n")
 
 def makeRunCommentPage(titlestring, runlist, foldername, htmltemplates, containerlist):
     header, style, footnote, footer = htmltemplates
-    title = "<h1>{0}</h1>".format(titlestring)
-    blocks = []
-    blocks.append(header)
-    blocks.append(style)
-    blocks.append(title)
-    blocks.append("<h2> Run comments:</h2>\n")
-    commenttable = modules.pandasOutput.getcommentDF(containerlist, runlist).to_html()
-    blocks.append(commenttable)
-    blocks.append(footnote)
-    blocks.append(footer)
-    modules.pandasOutput.writeListToFile(blocks, "{0}/runcomments.html".format(foldername))
+    with htmlpage("{0}/runcomments.html".format(foldername), (header, style, "<h1>{0}</h1>".format(titlestring)), footnote, footer) as page:
+        page.write("<h2> Run comments:</h2>\n")
+        page.writeTable(modules.pandasOutput.getcommentDF(containerlist, runlist))
     return "runcomments.html"
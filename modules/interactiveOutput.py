@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Module for the interactive report. Instead of rendering the plot jobs of
+modules.pandasOutput.getRunComparisonPlotJobs with matplotlib, all plotted series are written once
+to reportdata.js and the plots are drawn in the browser (static/report.js) on the plot overview pages.
+
+K. Schweiger, 2017
+"""
+import os
+import re
+import json
+import inspect
+import logging
+from shutil import copy2
+
+import numpy as np
+
+superscripts = dict(zip(u"-0123456789", u"⁻⁰¹²³⁴⁵⁶⁷⁸⁹"))
+
+def getPlainLabel(label):
+    """
+    Returns the (mathtext) label as plain text for the browser, e.g. cm$^{-2}$ -> cm^-2 with superscripts
+    """
+    if label is None:
+        return None
+    label = re.sub(r"\^\{([-0-9]*)\}", lambda match: u"".join(superscripts[char] for char in match.group(1)), unicode(label))
+    return label.replace(u"$", u"")
+
+def getPlotName(callargs):
+    """
+    Returns the path of the plot as returned by the plotting functions in modules.plotting
+    (relative to the working directory) without the file extension
+    """
+    foldername = callargs["foldername"]
+    filename = callargs["filename"]
+    if filename is None:
+        filename = "plot_{0}_{1}".format(callargs["df1yTitle"], callargs["df2yTitle"])
+    if foldername is None:
+        return "plots/"+filename
+    return foldername+"/plots/"+filename
+
+class reportdata:
+    """
+    Series and plots of the interactive report. Each series (x labels and values) is only saved once.
+    """
+    def __init__(self):
+        self.series = []
+        self.plots = {}
+        self._seriesindex = {}
+
+    def addSeries(self, series):
+        values = [None if not np.isfinite(value) else float(value) for value in np.asarray(series.values, dtype = np.float64)]
+        entry = {"x" : ["{0}".format(label) for label in series.index], "y" : values}
+        key = json.dumps(entry, sort_keys = True)
+        if key not in self._seriesindex:
+            self._seriesindex[key] = len(self.series)
+            self.series.append(entry)
+        return self._seriesindex[key]
+
+    def addPlotJob(self, plotjob):
+        """
+        Add the plot of a modules.plotting.plotjobs entry. Returns the plot path like the plotting function.
+        """
+        import modules.plotting
+
+        function, args, kwargs = plotjob
+        callargs = inspect.getcallargs(getattr(modules.plotting, function), *args, **kwargs)
+        name = getPlotName(callargs)
+        plot = {"title" : getPlainLabel(callargs["plottitle"]), "rotateLabels" : callargs["isRunComp"]}
+        if function == "makeDiYAxisplot":
+            plot.update({"kind" : "diy", "series" : [self.addSeries(callargs["df1in"]), self.addSeries(callargs["df2in"])],
+                         "ytitles" : [getPlainLabel(callargs["df1yTitle"]), getPlainLabel(callargs["df2yTitle"])]})
+        elif function == "makecomparionPlot":
+            plot.update({"kind" : "comparison", "series" : [self.addSeries(df) for df in callargs["dfs"]],
+                         "labels" : [getPlainLabel(title) for title in callargs["titles"]],
+                         "ytitles" : [getPlainLabel(callargs["yTitle"])]})
+            if callargs["colors"][0] != "Default":
+                plot["colors"] = callargs["colors"]
+        else:
+            df = callargs["df"]
+            plot.update({"kind" : "comparison", "series" : [self.addSeries(df[column]) for column in df.columns],
+                         "labels" : ["{0}".format(column) for column in df.columns],
+                         "ytitles" : [getPlainLabel(callargs["ytitle"])], "xtitle" : getPlainLabel(callargs["xtitle"])})
+        self.plots[name.split("/")[-1]] = plot
+        return name+".png"
+
+    def write(self, foldername):
+        """
+        Write reportdata.js and copy static/report.js to foldername
+        """
+        if not os.path.exists(foldername):
+            logging.info("Creating folder: {0}".format(foldername))
+            os.makedirs(foldername)
+        filename = "{0}/reportdata.js".format(foldername)
+        logging.info("Writing {0} series of {1} plots to {2}".format(len(self.series), len(self.plots), filename))
+        with open(filename, "w") as datafile:
+            datafile.write("var reportData = ")
+            json.dump({"series" : self.series, "plots" : self.plots}, datafile, separators = (",", ":"), sort_keys = True)
+            datafile.write(";\n")
+        copy2(os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "report.js"), foldername)
+
+def makeInteractiveReport(plotjobs, foldername):
+    """
+    Write the data of all plotjobs for the interactive report. Returns the plot paths in the
+    order of the jobs (same as modules.plotting.renderPlots) for the plot overview pages.
+    """
+    data = reportdata()
+    plotnames = [data.addPlotJob(plotjob) for plotjob in plotjobs]
+    data.write(foldername)
+    return plotnames
+
+def getPlotElement(plot):
+    """
+    Returns the html element for the plot (path as returned by makeInteractiveReport)
+    """
+    return '<div class="plot" data-plot="{0}"></div>\n'.format(plot.split("/")[-1][:-len(".png")])
+
+scripts = '<script src="reportdata.js"></script>\n<script src="report.js"></script>\n'
@@ -3,136 +3,132 @@ Module for all function related to the per ladder values
 """
 import logging
 
-from modules.tests import isHistoinFile
+import numpy as np
+
+layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
+facets = [12, 28, 44, 64]
+zbinIndices = np.array([1, 2, 3, 4, 6, 7, 8, 9])
+
+ladderIds = {"Layer1" : {"inner" : ["-5","-3","-1",
+                                    "2","4","6"],
+                         "outer" : ["-6","-4","-2",
+                                    "1","3","5"]},
+             "Layer2" : {"inner" : ["-13","-11","-9","-7","-5","-3","-1",
+                                    "2","4","6","8","10","12","14"],
+                         "outer" : ["-14","-12","-10","-8","-6","-4","-2",
+                                    "1","3","5","7","9","11","13"]},
+             "Layer3" : {"inner" : ["-21","-19","-17","-15","-13","-11","-9","-7","-5","-3","-1",
+                                    "2","4","6","8","10","12","14","16","18","20","22"],
+                         "outer" : ["-22","-20","-18","-16","-14","-12","-10","-8","-6","-4","-2",
+                                    "1","3","5","7","9","11","13","15","17","19","21"]},
+             "Layer4" : {"inner" : ["-31","-29","-27","-25","-23","-21","-19","-17","-15","-13","-11","-9","-7","-5","-3","-1",
+                                    "2","4","6","8","10","12","14","16","18","20","22","24","26","28","30","32"],
+                         "outer" : ["-32","-30","-28","-26","-24","-22","-20","-18","-16","-14","-12","-10","-8","-6","-4","-2",
+                                    "1","3","5","7","9","11","13","15","17","19","21","23","25","27","29","31"]}}
+
+def makeLadderIndices():
+    """
+    Returns per layer the ladder IDs (inner followed by outer ladders), the corresponding bin
+    indices in the ladder histograms and detector maps and a mask selecting the inner ladders.
+    """
+    idlists, bins, innermasks = {}, {}, {}
+    for ilayer, layer in enumerate(layerNames):
+        ladderZero = facets[ilayer]//2 + 1
+        idlists[layer] = ladderIds[layer]["inner"] + ladderIds[layer]["outer"]
+        bins[layer] = ladderZero + np.array([int(module) for module in idlists[layer]])
+        innermasks[layer] = np.arange(len(idlists[layer])) < len(ladderIds[layer]["inner"])
+    return idlists, bins, innermasks
+
+ladderIdList, ladderBins, innerMasks = makeLadderIndices()
 
 def getLadderidList(layer, position = "inner"):
     """
     Function returns the ladder IDs for layer and position (inner or outer)
     """
-    ret = False
     if layer not in ["Layer1","Layer2","Layer3","Layer4"]:
         logging.error("Passed layer not in Layer1, Layer2, Layer3, Layer4")
-        ret = None
+        return None
     if position not in ["inner", "outer"]:
         logging.error("Passed position neither inner nor outer")
-        ret = None
-
-    if layer == "Layer1":
-        if position == "inner":
-            ret = ["-5","-3","-1",
-                   "2","4","6"]
-        else:
-            ret = ["-6","-4","-2",
-                   "1","3","5"]
-    elif layer == "Layer2":
-        if position == "inner":
-            ret = ["-13","-11","-9","-7","-5","-3","-1",
-                   "2","4","6","8","10","12","14"]
-        else:
-            ret = ["-14","-12","-10","-8","-6","-4","-2",
-                   "1","3","5","7","9","11","13"]
-    elif layer == "Layer3":
-        if position == "inner":
-            ret = ["-21","-19","-17","-15","-13","-11","-9","-7","-5","-3","-1",
-                   "2","4","6","8","10","12","14","16","18","20","22"]
-        else:
-            ret = ["-22","-20","-18","-16","-14","-12","-10","-8","-6","-4","-2",
-                   "1","3","5","7","9","11","13","15","17","19","21"]
-    elif layer == "Layer4":
-        if position == "inner":
-            ret = ["-31","-29","-27","-25","-23","-21","-19","-17","-15","-13","-11","-9","-7","-5","-3","-1",
-                   "2","4","6","8","10","12","14","16","18","20","22","24","26","28","30","32"]
-        else:
-            ret = ["-32","-30","-28","-26","-24","-22","-20","-18","-16","-14","-12","-10","-8","-6","-4","-2",
-                   "1","3","5","7","9","11","13","15","17","19","21","23","25","27","29","31"]
-    return ret
-
-def getworkingInOutladderModules(inputfile):
-    logging.info("Getting working modules for inner and outer ladder of all layers")
-    logging.debug("Using histograms from inputfile {0}".format(inputfile))
+        return None
 
-    workingmodulesperpositon =  getworkingladderModules(inputfile)
+    return list(ladderIds[layer][position])
 
-    workingmodules = {"Layer1": {}, "Layer2": {}, "Layer3": {}, "Layer4": {}}
+def getworkingModulesPerLadder(histos):
+    """
+    Returns per layer an array with the number of working modules for each ladder (ordered as ladderIdList)
+    """
+    Histos2D = []
+    for i in range(1,5):
+        h2D = histos.getDetMap(i)
+        if h2D is None:
+            logging.error("Histo for Layer{0} d/hpDetMap{0} or d/hpixDets{0} not found. Final Fix not ready. Remove run from config!".format(i))
+            exit()
+        Histos2D.append(h2D)
 
-    for ilayer, layer in enumerate(["Layer1","Layer2","Layer3","Layer4"]):
-        workingmodules[layer]["inner"] = 0
-        workingmodules[layer]["outer"] = 0
-        for ladder in ["inner","outer"]:
-            logging.debug("Getting number of working modules in {0}, {1} ladder".format(layer, ladder))
-            for module in getLadderidList(layer, ladder):
-                workingmodules[layer][ladder] += workingmodulesperpositon[layer][module]
+    workingmodules = {}
+    for ilayer, layer in enumerate(layerNames):
+        workingmodules[layer] = np.count_nonzero(Histos2D[ilayer][np.ix_(ladderBins[layer], zbinIndices)] > 0, axis = 1)
 
     return workingmodules
 
-def getworkingladderModules(inputfile):
-    logging.info("Getting working modules per ladder position")
-    logging.debug("Using histograms from inputfile {0}".format(inputfile))
-    facets = [12, 28, 44, 64]
-    zbins = [1,2,3,4,6,7,8,9]
+def getPixelHitsPerLadder(histos, nfiles):
+    """
+    Returns per layer an array with the pixel hits for each ladder (ordered as ladderIdList)
+    """
+    pixelHits = {}
+    for ilayer, layer in enumerate(layerNames):
+        histo = histos.get("d/hpladder{0}id".format(ilayer+1))
+        pixelHits[layer] = histo[ladderBins[layer]].astype(np.float64) / float(nfiles)
 
-    layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
-    Histos2D = []
-    for i in range(1,5):
-        if isHistoinFile(inputfile, "d/hpDetMap{0}".format(i)):
-            logging.debug("Using d/hpDetMap{0} for z dependent values".format(i))
-            Histos2D.append(inputfile.Get("d/hpDetMap{0}".format(i)))
-        elif isHistoinFile(inputfile, "d/hpixDets{0}".format(i)):
-            logging.debug("Using d/hpixDets{0} for z dependent values".format(i))
-            Histos2D.append(inputfile.Get("d/hpixDets{0}".format(i)))
-        else:
-            logging.error("Histo for Layer{0} d/hpDetMap{0} or d/hpixDets{0} not found. Final Fix not ready. Remove run from config!")
-            exit()
+    return pixelHits
 
-    workingmodules = {"Layer1": {}, "Layer2": {}, "Layer3": {}, "Layer4": {}}
+def getworkingInOutladderModules(histos):
+    logging.info("Getting working modules for inner and outer ladder of all layers")
+    logging.debug("Using histograms from inputfile {0}".format(histos.inputfile))
 
-    for ilayer, layer in enumerate(["Layer1","Layer2","Layer3","Layer4"]):
-        h2D = Histos2D[ilayer]
-        ladderZero = (facets[ilayer]/2)+1
-        for ladder in ["inner","outer"]:
-            for module in getLadderidList(layer, ladder):
-                workingmodules[layer][module] = 0
-                for z in zbins:
-                    if h2D.GetBinContent(z,ladderZero+int(module)) > 0:
-                        workingmodules[layer][module] += 1
+    workingmodulesperladder = getworkingModulesPerLadder(histos)
+
+    workingmodules = {}
+    for layer in layerNames:
+        working = workingmodulesperladder[layer]
+        workingmodules[layer] = {"inner" : int(working[innerMasks[layer]].sum()),
+                                 "outer" : int(working[~innerMasks[layer]].sum())}
 
     return workingmodules
 
-def getPixelHitsladderModules(inputfile, nfiles):
-    logging.debug("Getting pixel hits per ladder position")
-    facets = [12, 28, 44, 64]
+def getworkingladderModules(histos):
+    logging.info("Getting working modules per ladder position")
+    logging.debug("Using histograms from inputfile {0}".format(histos.inputfile))
 
-    hpladder1 = inputfile.Get("d/hpladder1id")
-    hpladder2 = inputfile.Get("d/hpladder2id")
-    hpladder3 = inputfile.Get("d/hpladder3id")
-    hpladder4 = inputfile.Get("d/hpladder4id")
+    workingmodulesperladder = getworkingModulesPerLadder(histos)
 
-    hPixHits = [hpladder1, hpladder2, hpladder3, hpladder4]
-    pixelHits = {"Layer1": {}, "Layer2": {}, "Layer3": {}, "Layer4": {}}
+    workingmodules = {}
+    for layer in layerNames:
+        workingmodules[layer] = dict(zip(ladderIdList[layer], workingmodulesperladder[layer].tolist()))
 
-    for ilayer, layer in enumerate(["Layer1","Layer2","Layer3","Layer4"]):
-        histo = hPixHits[ilayer]
-        #logging.debug("Using histo {0} with type {1}".format(histo, type(histo)))
-        ladderZero = (facets[ilayer]/2)+1
-        for ladder in ["inner","outer"]:
-            for module in getLadderidList(layer, ladder):
-                pixelHits[layer][module] = histo.GetBinContent(ladderZero+int(module)) / float(nfiles)
+    return workingmodules
+
+def getPixelHitsladderModules(histos, nfiles):
+    logging.debug("Getting pixel hits per ladder position")
+
+    pixelhitsperladder = getPixelHitsPerLadder(histos, nfiles)
+
+    pixelHits = {}
+    for layer in layerNames:
+        pixelHits[layer] = dict(zip(ladderIdList[layer], pixelhitsperladder[layer].tolist()))
 
     return pixelHits
 
-def getPixelHitsInOutladderModules(inputfile, nfiles):
+def getPixelHitsInOutladderModules(histos, nfiles):
     logging.debug("Getting pixel hits for inner and outer ladders")
 
-    pixelhitspermodule = getPixelHitsladderModules(inputfile, nfiles)
-
-    pixelHits = {"Layer1": {}, "Layer2": {}, "Layer3": {}, "Layer4": {}}
+    pixelhitsperladder = getPixelHitsPerLadder(histos, nfiles)
 
-    for ilayer, layer in enumerate(["Layer1","Layer2","Layer3","Layer4"]):
-        pixelHits[layer]["inner"] = 0
-        pixelHits[layer]["outer"] = 0
-        for ladder in ["inner","outer"]:
-            logging.debug("Getting pixel hits in {0}, {1} ladder".format(layer, ladder))
-            for module in getLadderidList(layer, ladder):
-                pixelHits[layer][ladder] += pixelhitspermodule[layer][module]
+    pixelHits = {}
+    for layer in layerNames:
+        hits = pixelhitsperladder[layer]
+        pixelHits[layer] = {"inner" : float(hits[innerMasks[layer]].sum()),
+                            "outer" : float(hits[~innerMasks[layer]].sum())}
 
     return pixelHits
@@ -7,10 +7,14 @@ K. Schweiger, 2017
 import logging
 from copy import copy
 
+import numpy as np
+
 import modules.classes as classes
-import modules.output
-import modules.pandasOutput
-import modules.htmlOutput
+
+# Per layer (Layer1 to Layer4) constants used by the container for the array versions
+layerRevFrequ = np.array([11245, 11245, 11245, 11245])
+layerActiveModArea = np.array([10.45, 10.45, 10.45, 10.45])
+layerPixperMod = np.array([66560, 66560, 66560, 66560])
 
 def getValuesPerLayer(n, nModules, collBunches, lumi = 1, isCluster = False,
                       RevFrequ = 11245, ActiveModArea = 10.45, PixperMod = 66560 ):
@@ -72,19 +76,94 @@ def getValuesPerDet(nperDet, collBunches, lumi = 1, isCluster = False,
     return {"perMod" : nperDet, "Occ" : occupancy,
             "perArea" : perArea, "perAreaSec" : perAreaSec, "perAreaSecNorm" : perAreaSecNorm, "perAreaNorm" : perAreaNorm}
 
+def getValuesPerLayerArray(n, nModules, collBunches, lumi = 1, isCluster = False,
+                           RevFrequ = 11245, ActiveModArea = 10.45, PixperMod = 66560):
+    """
+    Array version of getValuesPerLayer. All arguments are broadcast against each other, so
+    e.g. n and nModules with shape (nRuns, nPositions, nLayers), collBunches and lumi with shape
+    (nRuns, 1, 1) and RevFrequ, ActiveModArea and PixperMod per layer can be passed. Divisions by
+    zero modules result in inf/NaN instead of an exception.
+
+    returns dict with the same keys as getValuesPerLayer and float64 arrays as values. Occ is NaN
+    if isCluster is True.
+    """
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        n = np.asarray(n, dtype = np.float64)
+        perMod = n / np.asarray(nModules, dtype = np.float64)
+        values = calculateCommonValuesArray(perMod, collBunches, lumi, RevFrequ, ActiveModArea)
+        if isCluster:
+            values["Occ"] = np.full(values["perMod"].shape, np.nan)
+        else:
+            values["Occ"] = values["perMod"] / PixperMod
+    logging.debug("Calculated values per layer for arrays with shape {0}".format(values["perMod"].shape))
+    return values
+
+def getValuesPerDetArray(nperDet, collBunches, lumi = 1, isCluster = False,
+                         RevFrequ = 11245, ActiveModArea = 10.45, PixperMod = 66560):
+    """
+    Array version of getValuesPerDet. See getValuesPerLayerArray for the broadcasting of the
+    arguments.
+
+    returns dict with the same keys as getValuesPerDet and float64 arrays as values. Occ is NaN
+    if isCluster is True.
+    """
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        nperDet = np.asarray(nperDet, dtype = np.float64)
+        values = calculateCommonValuesArray(nperDet, collBunches, lumi, RevFrequ, ActiveModArea)
+        if isCluster:
+            values["Occ"] = np.full(values["perMod"].shape, np.nan)
+        else:
+            values["Occ"] = values["perMod"] / PixperMod
+    logging.debug("Calculated values per Det for arrays with shape {0}".format(values["perMod"].shape))
+    return values
+
+def calculateCommonValuesArray(perMod, collBunches, lumi, RevFrequ, ActiveModArea):
+    """
+    Same operations (and order) as getValuesPerLayer/getValuesPerDet so the results are identical
+    to the scalar versions.
+    """
+    perArea = perMod / np.asarray(ActiveModArea, dtype = np.float64)
+    perAreaSec = perArea * collBunches * RevFrequ
+    lumiPerBunch = np.asarray(lumi, dtype = np.float64) / collBunches
+    perMod, perArea, perAreaSec = np.broadcast_arrays(perMod, perArea, perAreaSec)
+    return {"perMod" : perMod, "perArea" : perArea, "perAreaSec" : perAreaSec,
+            "perAreaNorm" : perArea / lumiPerBunch, "perAreaSecNorm" : perAreaSec / lumiPerBunch}
+
 def calculateCommonValues(nPerModule, collBunches, RevFrequ, ActiveModArea, PixperMod):
     perArea = nPerModule / float(ActiveModArea)
     perAreaSec = perArea * collBunches * RevFrequ
 
     return perArea, perAreaSec
 
-def occupancyFromConfig(config, plotting = False):
+def makeContainer(containerargs):
+    """
+    Build the container for one run. Used for processing the runs in a process pool so
+    the histograms are released and only the calculated values are returned.
+    """
+    run, inputfile, collBunches, instLumi, comment, nFiles, fillnr, cache = containerargs
+    logging.info("Processing section {0}".format(run))
+    try:
+        container = classes.container(run, inputfile, collBunches, instLumi, comment, nFiles, fillnr, cache)
+        # The z and ladder values are calculated here and can also stop the processing
+        container.releaseHistograms()
+    except SystemExit:
+        raise RuntimeError("Processing of section {0} was stopped. See errors above.".format(run))
+    return container
+
+def occupancyFromConfig(config, plotting = False, cache = None, nJobs = 1, rundb = None, report = "static"):
     """
     Calculate occupancy and related values from a config defining files, nBunches,... . See README.md for detailed information.
+    If a modules.histocache.histocache is passed, the histograms are read from/saved to the cache.
+    If nJobs is larger than 1, the runs are processed and the plots are rendered in a pool with nJobs processes.
+    If a modules.rundb.rundb is passed, unchanged runs are loaded from it and processed runs are saved in it.
+    With report = interactive the plots are not rendered but drawn in the browser (see modules.interactiveOutput).
 
     Use https://github.com/cms-analysis/DPGAnalysis-SiPixelTools/tree/master/HitAnalyzer/test/PixClusterAna.* to preprocess the data samples.
     """
     from ConfigParser import SafeConfigParser
+    # pandas and matplotlib are only imported when needed (see README.md, Startup time)
+    import modules.output
+    import modules.pandasOutput
 
     logging.info("Processing config {0}".format(config))
 
@@ -100,9 +179,15 @@ def occupancyFromConfig(config, plotting = False):
     texexport = cfg.getboolean("General","latexexport")
     csvexport = cfg.getboolean("General","csvexport")
     cfgexport = cfg.getboolean("General","cfgexport")
+    columnarexport = None
+    if cfg.has_option("General","columnarexport") and cfg.get("General","columnarexport") not in [None, "", "False", "None"]:
+        columnarexport = cfg.get("General","columnarexport")
     invalidruns = []
+    containerargs = []
+    containers = {}
+    fingerprints = {}
     for run in runstoProcess:
-        logging.info("Processing section {1} from config {0}".format(config, run))
+        logging.debug("Reading section {1} from config {0}".format(config, run))
         if cfg.get(run, "file") is not None:
             inputfile = cfg.get(run, "file")
         else:
@@ -116,40 +201,85 @@ def occupancyFromConfig(config, plotting = False):
                    cfg.get(run, "comment"),
                    cfg.get(run, "scheme")]
 
-        nFiles = cfg.getint(run, "nFiles")
-
-        container = classes.container(run, inputfile, collBunches, instLumi, comment, nFiles, fillnr)
-        if not container.invalidFile:
-            Resultcontainers[run] = copy(container)
+        # nFiles is optional: Not needed for single jobs and set from the number of files for merged inputfiles
+        nFiles = None
+        if cfg.has_option(run, "nFiles") and cfg.get(run, "nFiles") is not None:
+            nFiles = cfg.getint(run, "nFiles")
+
+        if rundb is not None:
+            fingerprints[run] = rundb.getFingerprint(inputfile, collBunches, instLumi, fillnr, nFiles)
+            storedvalues = None
+            if fingerprints[run] is not None:
+                storedvalues = rundb.get(run, fingerprints[run])
+            if storedvalues is not None:
+                containers[run] = classes.container(run, inputfile, collBunches, instLumi, comment, nFiles, fillnr,
+                                                    storedvalues = storedvalues)
+                continue
+
+        containerargs.append((run, inputfile, collBunches, instLumi, comment, nFiles, fillnr, cache))
+
+    if nJobs > 1 and len(containerargs) > 1:
+        import multiprocessing
+        logging.info("Processing {0} sections with {1} processes".format(len(containerargs), nJobs))
+        pool = multiprocessing.Pool(nJobs)
+        processed = pool.map(makeContainer, containerargs, chunksize = 1)
+        pool.close()
+        pool.join()
+    else:
+        processed = map(makeContainer, containerargs)
+    for args, container in zip(containerargs, processed):
+        containers[args[0]] = container
+        if rundb is not None and fingerprints[args[0]] is not None and not container.invalidFile:
+            rundb.store(args[0], fingerprints[args[0]], container)
+
+    # Results are ordered as runstoProcess
+    for run in runstoProcess:
+        if not containers[run].invalidFile:
+            Resultcontainers[run] = copy(containers[run])
         else:
             invalidruns.append(run)
-        del container
 
     for run in invalidruns:
         runstoProcess.remove(run)
 
-    generatedplots = []
+    # Every table is calculated once and shared by the plots and the file export
+    tables = modules.pandasOutput.tablecache(Resultcontainers, runstoProcess)
+
+    plots = None
     makeplots = not plotting
     if makeplots:
-        for group in ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]:
-            generatedfiles = modules.pandasOutput.makeRunComparisonPlots(Resultcontainers, runstoProcess, foldername, group)
-            generatedplots.append((generatedfiles , group))
+        import modules.plotting
+        import modules.interactiveOutput
+        # The plots of all groups are rendered in one pool. File names are returned in the order of the jobs
+        plotjobs = [modules.pandasOutput.getRunComparisonPlotJobs(Resultcontainers, runstoProcess, foldername, group, tables = tables)
+                    for group in ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]]
+        if report == "interactive":
+            generatedfiles = modules.interactiveOutput.makeInteractiveReport([job for groupjobs in plotjobs for job in groupjobs], foldername)
+        else:
+            generatedfiles = modules.plotting.renderPlots([job for groupjobs in plotjobs for job in groupjobs], nJobs)
+        plots = modules.plotting.plotregistry()
+        for groupjobs in plotjobs:
+            plots.add(groupjobs.getRecords(generatedfiles[:len(groupjobs)]))
+            generatedfiles = generatedfiles[len(groupjobs):]
 
     modules.output.makeFiles(generaltitle, generaldesc, Resultcontainers, runstoProcess, foldername, config,
-                             makeIndex = True, makeTables = True, makePlotOverview = makeplots, plottuples = generatedplots,
-                             exportLaTex = texexport, exportCSV = csvexport, exportCFG = cfgexport)
+                             makeIndex = True, makeTables = True, makePlotOverview = makeplots, plots = plots,
+                             exportLaTex = texexport, exportCSV = csvexport, exportCFG = cfgexport, exportColumnar = columnarexport,
+                             tables = tables, interactive = report == "interactive")
 
-def occupancyFromFile(inputfile, collBunchesforRun, instLumi, nFiles):
+def occupancyFromFile(inputfile, collBunchesforRun, instLumi, nFiles, cache = None):
     """
     Calculate occupancy and related values from a preprocesst file containing
     the nescessary histograms
 
     Use https://github.com/cms-analysis/DPGAnalysis-SiPixelTools/tree/master/HitAnalyzer/test/PixClusterTest.* to preprocess the data samples.
     """
+    import modules.htmlOutput
+
     filename = inputfile.split("/")[-1].split(".")[0]
     logging.info("Processing file: {0}".format(filename))
     logging.debug("File location: {0}".format(inputfile))
-    Resultcontainer = classes.container(filename, inputfile, collBunchesforRun, instLumi, nFiles = nFiles)
+    Resultcontainer = classes.container(filename, inputfile, collBunchesforRun, instLumi, nFiles = nFiles, cache = cache)
 
     modules.htmlOutput.makeComparisonFiles("Occupancy monitoring for file {0}".format(filename.split("/")[-1]), "", {"Processed Run": Resultcontainer},
                                            ["Processed Run"], ".", singlerun = True)
@@ -1,23 +1,21 @@
 import logging
 
-from modules.tests import isHistoinFile
+import numpy as np
 
-def modulecounter(inputfile):
+def modulecounter(histos):
+    """
+    Count working modules per layer from the detector maps in the histobundle histos
+    """
     logging.info("Counting working modules")
     nmodules =  {"Layer1": 96, "Layer2": 224, "Layer3": 352, "Layer4": 512}
     workingmodules = {"Layer1": None, "Layer2": None, "Layer3": None, "Layer4": None}
     lnames = ["Layer1", "Layer2", "Layer3", "Layer4"]
     Histos2D = []
     for ilayer, layer in enumerate(lnames):
-        currenthName = "d/hpDetMap{0}".format(ilayer+1)
-        currenthName2 = "d/hpixDets{0}".format(ilayer+1)
-        if isHistoinFile(inputfile, currenthName):
-            Histos2D.append(inputfile.Get(currenthName))
-        elif isHistoinFile(inputfile, currenthName2):
-            Histos2D.append(inputfile.Get(currenthName2))
-        else:
-            logging.warning("Histo for {1} {0} or {2} not found. Will set modules to standard value!".format(currenthName,layer,currenthName2))
-            Histos2D.append(None)
+        h2D = histos.getDetMap(ilayer+1)
+        if h2D is None:
+            logging.warning("Histo for {1} d/hpDetMap{0} or d/hpixDets{0} not found. Will set modules to standard value!".format(ilayer+1,layer))
+        Histos2D.append(h2D)
 
     for ih2D, h2D in enumerate(Histos2D):
         if h2D is not None:
@@ -28,21 +26,17 @@ def modulecounter(inputfile):
 
 
 def getworkingmodulesfromHisto(hMap):
-    nworkingModules = 0
-
-    nbins = hMap.GetSize()
-    for i in range(nbins):
-        if hMap.GetBinContent(i) > 0:
-            nworkingModules += 1
-
-    return nworkingModules
+    """
+    Count all bins (including under- and overflow) of the bin array hMap with content > 0
+    """
+    return int(np.count_nonzero(hMap > 0))
 
 def main():
-    import ROOT
+    from modules.histograms import histobundle
 
-    tfile = ROOT.TFile.Open("~/Code/data/pixel/occupancy/Run298653_v3.root")
+    histos = histobundle("~/Code/data/pixel/occupancy/Run298653_v3.root")
 
-    print modulecounter(tfile)
+    print modulecounter(histos)
 
 if __name__ == "__main__":
     main()
@@ -6,17 +6,29 @@ K. Schweiger, 2017
 import logging
 import os
 from shutil import copy2
+from multiprocessing.pool import ThreadPool
 import pandas as pd
 
 from collections import OrderedDict
 
 import modules.htmlOutput
 import modules.pandasOutput
+import modules.cfgOutput
+import modules.settings
 
 
 def makeFiles(titlestring, generaldescription, containerlist, runlist, foldername, config,
-              makeIndex = True, makeTables = True, makePlotOverview = True, plottuples = None,
-              exportLaTex = False, exportCSV = False, exportCFG = False):
+              makeIndex = True, makeTables = True, makePlotOverview = True, plots = None,
+              exportLaTex = False, exportCSV = False, exportCFG = False, exportColumnar = None, nWriteThreads = 8,
+              tables = None, interactive = False):
+    """
+    Write html files and the table exports. exportColumnar can be parquet, feather or hdf5 to write
+    all tables in long format (see modules.pandasOutput.getLongDataFrame) in a single file.
+    plots is the modules.plotting.plotregistry with the plots for the overview pages.
+    The exported tables are written with nWriteThreads threads. Pass a modules.pandasOutput.tablecache
+    as tables to reuse the tables already calculated for the plots. If interactive is True, the
+    plots on the overview pages are drawn in the browser (see modules.interactiveOutput).
+    """
     logging.info("Starting file export")
 
     if not os.path.exists(foldername):
@@ -27,9 +39,11 @@ def makeFiles(titlestring, generaldescription, containerlist, runlist, foldernam
     groups = ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]
     ###############################################################
     # Getting dataframes
-    fullperRunDF, fullRunCompDF = modules.pandasOutput.makeFullDetectorTables(containerlist, runlist)
-    ZperRunDF, ZRunCompDF = modules.pandasOutput.makeZdepDetectorTables(containerlist, runlist)
-    InOutperRunDF, InOutRunCompDF = modules.pandasOutput.makeInnerOuterLadderDetectorTables(containerlist, runlist)
+    if tables is None:
+        tables = modules.pandasOutput.tablecache(containerlist, runlist)
+    fullperRunDF, fullRunCompDF = tables.getFullDetectorTables()
+    ZperRunDF, ZRunCompDF = tables.getZdepDetectorTables()
+    InOutperRunDF, InOutRunCompDF = tables.getInnerOuterLadderDetectorTables()
     #Getting Tables --> NOTE The (ordered)Dics have keys with layer_group_? etc.
     logging.debug("Getting perRun tables for full detector")
     fullPerRunDFs = makePerRunDFs(fullperRunDF, runlist, groups)
@@ -43,12 +57,6 @@ def makeFiles(titlestring, generaldescription, containerlist, runlist, foldernam
     InnerRunCompDFs =  makeRunCompDFs(InOutRunCompDF, layerNames, ["Pix/Lay"], ["inner"])
     #print InnerRunCompDFs
     OuterRunCompDFs = makeRunCompDFs(InOutRunCompDF, layerNames, ["Pix/Lay"], ["outer"])
-    # Style config
-    from ConfigParser import SafeConfigParser
-    styleconfig = SafeConfigParser()
-    logging.debug("Loading style config")
-    styleconfig.read("configs/style.cfg")
-
 
     #Copy cfg file to output directory:
     copy2(config, foldername)
@@ -57,65 +65,25 @@ def makeFiles(titlestring, generaldescription, containerlist, runlist, foldernam
 
     if makeIndex or makeTables or makePlotOverview:
         modules.htmlOutput.makeFiles(titlestring, generaldescription, containerlist, runlist, foldername,
-                                     makeIndex, makeTables, makePlotOverview, plottuples, fullperRunDF, fullRunCompDF,
+                                     makeIndex, makeTables, makePlotOverview, plots, fullperRunDF, fullRunCompDF,
                                      ZperRunDF, ZRunCompDF, InOutperRunDF, InOutRunCompDF,
-                                     cfgname = configname, linkTeX = exportLaTex, linkCSV = exportCSV, linkCFG = exportCFG)
-
-    if exportLaTex or exportCSV:
-        defaultprecision = pd.get_option('precision')
-        if exportLaTex:
-            pd.set_option('precision',styleconfig.getint("Tables","latexprecision"))
-            logging.info("LaTex export initialized")
-            if not os.path.exists("{0}/{1}".format(foldername, "tex")):
-                logging.info("Creating folder: {0}".format("{0}/{1}".format(foldername, "tex")))
-                os.makedirs("{0}/{1}".format(foldername, "tex"))
-            for key in fullPerRunDFs:
-                modules.pandasOutput.writeStringToFile(fullPerRunDFs[key].to_latex(), "{0}/tex/fullPerRun_{1}.txt".format(foldername, key.replace("/","per")))
-            for key in fullRunCompDFs:
-                modules.pandasOutput.writeStringToFile(fullRunCompDFs[key].to_latex(), "{0}/tex/fullRunComp_{1}.txt".format(foldername, key.replace("/","per")))
-            for key in zPerRunDFs:
-                modules.pandasOutput.writeStringToFile(zPerRunDFs[key].to_latex(), "{0}/tex/zPerRun_{1}.txt".format(foldername, key.replace("/","per")))
-            for key in InOutPerRunDFs:
-                modules.pandasOutput.writeStringToFile(InOutPerRunDFs[key].to_latex(), "{0}/tex/InOutPerRun_{1}.txt".format(foldername, key.replace("/","per")))
-            for key in InnerRunCompDFs:
-                modules.pandasOutput.writeStringToFile(InnerRunCompDFs[key].to_latex(), "{0}/tex/partialRunComp_{1}.txt".format(foldername, key.replace("/","per")))
-            for key in OuterRunCompDFs:
-                modules.pandasOutput.writeStringToFile(OuterRunCompDFs[key].to_latex(), "{0}/tex/partialRunComp_{1}.txt".format(foldername, key.replace("/","per")))
-            pd.set_option('precision',defaultprecision)
-        if exportCSV:
-            logging.info("CSV export initialized")
-            if not os.path.exists("{0}/{1}".format(foldername, "csv")):
-                logging.info("Creating folder: {0}".format("{0}/{1}".format(foldername, "csv")))
-                os.makedirs("{0}/{1}".format(foldername, "csv"))
-            for key in fullPerRunDFs:
-                modules.pandasOutput.writeStringToFile(fullPerRunDFs[key].to_csv(sep=";"), "{0}/csv/fullPerRun_{1}.csv".format(foldername, key.replace("/","per")))
-            for key in fullRunCompDFs:
-                modules.pandasOutput.writeStringToFile(fullRunCompDFs[key].to_csv(sep=";"), "{0}/csv/fullRunComp_{1}.csv".format(foldername, key.replace("/","per")))
-            for key in zPerRunDFs:
-                modules.pandasOutput.writeStringToFile(zPerRunDFs[key].to_csv(sep=";"), "{0}/csv/zPerRun_{1}.csv".format(foldername, key.replace("/","per")))
-            for key in InOutPerRunDFs:
-                modules.pandasOutput.writeStringToFile(InOutPerRunDFs[key].to_csv(sep=";"), "{0}/csv/InOutPerRun_{1}.csv".format(foldername, key.replace("/","per")))
-            for key in InnerRunCompDFs:
-                modules.pandasOutput.writeStringToFile(InnerRunCompDFs[key].to_csv(sep=";"), "{0}/csv/partialRunComp_{1}.csv".format(foldername, key.replace("/","per")))
-            for key in OuterRunCompDFs:
-                modules.pandasOutput.writeStringToFile(OuterRunCompDFs[key].to_csv(sep=";"), "{0}/csv/partialRunComp_{1}.csv".format(foldername, key.replace("/","per")))
-        if exportCFG:
-            logging.info("CFG export initialized (SaveConfigParser)")
-            if not os.path.exists("{0}/{1}".format(foldername, "cfg")):
-                logging.info("Creating folder: {0}".format("{0}/{1}".format(foldername, "cfg")))
-                os.makedirs("{0}/{1}".format(foldername, "cfg"))
-            for key in fullPerRunDFs:
-                converDFtoCFG(fullPerRunDFs[key], "{0}/cfg/fullPerRun_{1}.txt".format(foldername, key.replace("/","per")))
-            for key in fullRunCompDFs:
-                converDFtoCFG(fullRunCompDFs[key], "{0}/cfg/fullRunComp_{1}.txt".format(foldername, key.replace("/","per")))
-            for key in zPerRunDFs:
-                converDFtoCFG(zPerRunDFs[key], "{0}/cfg/zPerRun_{1}.txt".format(foldername, key.replace("/","per")))
-            for key in InOutPerRunDFs:
-                converDFtoCFG(InOutPerRunDFs[key], "{0}/cfg/InOutPerRun_{1}.txt".format(foldername, key.replace("/","per")))
-            for key in InnerRunCompDFs:
-                converDFtoCFG(InnerRunCompDFs[key], "{0}/cfg/partialRunComp_{1}.txt".format(foldername, key.replace("/","per")))
-            for key in OuterRunCompDFs:
-                converDFtoCFG(OuterRunCompDFs[key], "{0}/cfg/partialRunComp_{1}.txt".format(foldername, key.replace("/","per")))
+                                     cfgname = configname, linkTeX = exportLaTex, linkCSV = exportCSV, linkCFG = exportCFG,
+                                     interactive = interactive)
+
+    tablefamilies = [("fullPerRun", fullPerRunDFs), ("fullRunComp", fullRunCompDFs),
+                     ("zPerRun", zPerRunDFs), ("InOutPerRun", InOutPerRunDFs),
+                     ("partialRunComp", InnerRunCompDFs), ("partialRunComp", OuterRunCompDFs)]
+    exportTables(foldername, tablefamilies, exportLaTex, exportCSV, exportCFG,
+                 modules.settings.getSettings().latexprecision, nWriteThreads)
+
+    if exportColumnar is not None:
+        logging.info("Columnar export initialized ({0})".format(exportColumnar))
+        extensions = {"parquet" : "parquet", "feather" : "feather", "hdf5" : "h5"}
+        if exportColumnar not in extensions:
+            logging.error("Format {0} not supported for columnar export. Use parquet, feather or hdf5".format(exportColumnar))
+        else:
+            modules.pandasOutput.writeColumnarFile(tables.getLongDataFrame(),
+                                                   "{0}/tables.{1}".format(foldername, extensions[exportColumnar]), exportColumnar)
 
 def makePerRunDFs(inputdf, runs, groups, layers = None):
     retDFs = OrderedDict([])
@@ -139,15 +107,44 @@ def makeRunCompDFs(inputdf, layers, groups, ladders = None):
                     retDFs.update({"{0}_{1}_{2}".format(layer, group, ladder) : inputdf[group][ladder][layer]})
     return retDFs
 
-def converDFtoCFG(df, filename):
-    from ConfigParser import SafeConfigParser
-
-    cfgout = SafeConfigParser()
+def exportTables(foldername, tablefamilies, exportLaTex, exportCSV, exportCFG, latexprecision, nThreads = 8):
+    """
+    Export the tables in all enabled formats. tablefamilies is a list of tuples with the filename prefix
+    and the (ordered) dict with the tables. Every table is rendered once per format in the calling
+    thread (pandas options are not thread-safe) and the files are written by a pool of nThreads threads.
+    """
+    formats = []
+    if exportLaTex:
+        formats.append(("tex", "txt", lambda df: getLaTeXString(df, latexprecision)))
+    if exportCSV:
+        formats.append(("csv", "csv", lambda df: df.to_csv(sep=";")))
+    if exportCFG:
+        formats.append(("cfg", "txt", modules.cfgOutput.getCFGString))
+    if not formats:
+        return
+    for subfolder, extension, render in formats:
+        logging.info("{0} export initialized".format(subfolder))
+        if not os.path.exists("{0}/{1}".format(foldername, subfolder)):
+            logging.info("Creating folder: {0}".format("{0}/{1}".format(foldername, subfolder)))
+            os.makedirs("{0}/{1}".format(foldername, subfolder))
+
+    pool = ThreadPool(nThreads)
+    writes = []
+    for prefix, tables in tablefamilies:
+        for key in tables:
+            for subfolder, extension, render in formats:
+                filename = "{0}/{1}/{2}_{3}.{4}".format(foldername, subfolder, prefix, key.replace("/","per"), extension)
+                writes.append(pool.apply_async(modules.pandasOutput.writeStringToFile, (render(tables[key]), filename)))
+    pool.close()
+    pool.join()
+    # Raise errors of the writes
+    for write in writes:
+        write.get()
+    logging.debug("Exported {0} files".format(len(writes)))
+
+def getLaTeXString(df, precision):
+    with pd.option_context("display.precision", precision):
+        return df.to_latex()
 
-    for row in df.iterrows():
-        cfgout.add_section(row[0])
-        for key in row[1].keys():
-            cfgout.set(row[0], key, str(row[1][key]))
-
-    with open(filename, 'wb') as configfile:
-        cfgout.write(configfile)
+def converDFtoCFG(df, filename):
+    modules.cfgOutput.writeCFG(df, filename)
@@ -4,8 +4,7 @@ import numpy as np
 import os
 import logging
 from copy import copy
-
-import modules.plotting
+from collections import OrderedDict
 
 def writeStringToFile(string, filename):
     logging.debug("Writing string to file: {0}".format(filename))
@@ -19,220 +18,347 @@ def writeListToFile(stringlist, filename):
             f.write(string)
 
 
-def getDataFramesForRunComp(containerlist, runlist, datatype = "fullDetector"):
+def getLongDataFrame(containerlist, runlist):
+    """
+    Returns all values shown in the per run and run comparison tables of the runs in runlist as
+    long DataFrame with one value per row. The columns run, region, layer, group and metric are
+    categorical. The run information is added in the columns nModules (for region and layer),
+    nBunches, instLumi and fill.
+    """
+    logging.info("Getting long pandas DF for all runs")
+    if not runlist:
+        return pd.DataFrame(columns = ["run", "region", "layer", "group", "metric", "value",
+                                       "nModules", "nBunches", "instLumi", "fill"])
+    first = containerlist[runlist[0]]
+    # Table cells (region, group, metric): All groups for the full detector, Pix/Lay for the partial detector
+    cells = []
+    for iregion, region in enumerate(first.regionNames):
+        for group in (first.groupNames if region == "full" else ["Pix/Lay"]):
+            for imetric in range(first.tableMetrics[group]):
+                cells.append((iregion, first.groupNames.index(group), imetric))
+    regionindex, groupindex, metricindex = [np.array(index)[:, None] for index in zip(*cells)]
+    layerindex = np.arange(len(first.layerNames))[None, :]
+
+    values, nModules, nBunches, instLumi, fill = [], [], [], [], []
+    for run in runlist:
+        container = containerlist[run]
+        container.evaluate()
+        values.append(container.values[regionindex, layerindex, groupindex, metricindex].ravel())
+        nModules.append(container.nModules[regionindex, layerindex].ravel())
+        nBunches.append(container.collBunches)
+        instLumi.append(container.instLumi)
+        fill.append(container.fill)
+
+    nRuns, shape = len(runlist), (len(cells), len(first.layerNames))
+    nCells = shape[0]*shape[1]
+    def categorical(index, categories):
+        return pd.Categorical.from_codes(np.tile(np.broadcast_to(index, shape).ravel(), nRuns), categories = categories)
+    return pd.DataFrame(OrderedDict([("run", pd.Categorical.from_codes(np.repeat(np.arange(nRuns), nCells), categories = runlist)),
+                                     ("region", categorical(regionindex, first.regionNames)),
+                                     ("layer", categorical(layerindex, first.layerNames)),
+                                     ("group", categorical(groupindex, first.groupNames)),
+                                     ("metric", categorical(metricindex, first.metricNames)),
+                                     ("value", np.concatenate(values)),
+                                     ("nModules", np.concatenate(nModules)),
+                                     ("nBunches", np.repeat(np.array(nBunches, dtype = np.float64), nCells)),
+                                     ("instLumi", np.repeat(np.array(instLumi, dtype = np.float64), nCells)),
+                                     ("fill", np.repeat(np.array(fill, dtype = np.int64), nCells))]))
+
+def getTableFrames(containerlist, runlist, longDF = None):
+    """
+    Returns the values of all runs in wide format (index run, region, layer and columns group, metric)
+    and the run information (nModules, nBunches and instLumi as float) with the same index. Both are
+    derived from the long DataFrame (see getLongDataFrame). Returns None, None for an empty runlist.
+    """
+    if not runlist:
+        return None, None
+    if longDF is None:
+        longDF = getLongDataFrame(containerlist, runlist)
+    index = ["run", "region", "layer"]
+    wide = longDF.set_index(index+["group", "metric"])["value"].unstack(["group", "metric"])
+    info = longDF.drop_duplicates(index).set_index(index)[["nModules", "nBunches", "instLumi"]].astype(np.float64)
+    return wide, info
+
+class tablecache:
+    """
+    Tables of the runs in runlist shared by all consumers (plots, html files and exports) of one
+    invocation. Each table is calculated on first access. Call invalidate if the containers or
+    the runlist change.
+    """
+    def __init__(self, containerlist, runlist):
+        self.containerlist = containerlist
+        self.runlist = runlist
+        self._tables = {}
+
+    def get(self, key, function, *args):
+        """
+        Returns the result of function(containerlist, runlist, *args) saved with the (hashable) key.
+        Is only calculated on first call.
+        """
+        if key not in self._tables:
+            logging.debug("Calculating table {0}".format(key))
+            self._tables[key] = function(self.containerlist, self.runlist, *args)
+        return self._tables[key]
+
+    def invalidate(self):
+        logging.debug("Invalidating table cache")
+        self._tables = {}
+        for run in self.runlist:
+            self.containerlist[run].invalidateDataFrames()
+
+    def getLongDataFrame(self):
+        return self.get("long", getLongDataFrame)
+
+    def getTableFrames(self):
+        return self.get("frames", getTableFrames, self.getLongDataFrame())
+
+    def getFullDetectorTables(self, singlerun = False):
+        return self.get(("fullDetector", singlerun), makeFullDetectorTables, singlerun, self.getTableFrames())
+
+    def getZdepDetectorTables(self, singlerun = False):
+        return self.get(("partialDetectorZ", singlerun), makeZdepDetectorTables, singlerun, self.getTableFrames())
+
+    def getInnerOuterLadderDetectorTables(self, singlerun = False):
+        return self.get(("partialDetectorInnerOuterLadders", singlerun), makeInnerOuterLadderDetectorTables, singlerun, self.getTableFrames())
+
+def makeTable(wide, info, key, levels, rows, group, metrics, infocolumns):
+    """
+    Returns the table with rows (labels of the index level not in levels) and the columns
+    infocolumns + metrics of group for the index values key of levels in wide/info
+    """
+    if wide is None:
+        return pd.DataFrame(columns = infocolumns+metrics)
+    values = wide.xs(key, level = levels)[group].loc[rows, metrics].values
+    if infocolumns:
+        values = np.hstack([info.xs(key, level = levels).loc[rows, infocolumns].values, values])
+    return pd.DataFrame(values, index = list(rows), columns = infocolumns+metrics)
+
+def getTableMetrics(containerlist, runlist, group):
+    container = containerlist[runlist[0]]
+    return container.metricNames[:container.tableMetrics[group]]
+
+def getDataFramesForRunComp(containerlist, runlist, datatype = "fullDetector", tableframes = None):
+    """
+    Returns the run comparison tables ([layer][group]) with one (sorted) run per row. datatype
+    is only implemented for fullDetector.
+    """
     dataframes = {}
     layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
     groups = ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]
 
-    slices = {}
-    for name in layerNames:
-        slices[name] = {}
-        for group in groups:
-            slices[name][group] = {}
-    for run in runlist:
-        containerDF = containerlist[run].getpdDataFrame(datatype)
-        for name in layerNames:
-            for group in groups:
-                generalinfo = pd.Series([containerlist[run].nWorkingModules[name],
-                                         containerlist[run].collBunches,
-                                         containerlist[run].instLumi],
-                                        index = ["nModules", "nBunches", "instLumi"])
-                slices[name][group].update({ run : generalinfo.append(containerDF[group].loc[name])})
-
+    if tableframes is None:
+        tableframes = getTableFrames(containerlist, runlist)
+    wide, info = tableframes
     for name in layerNames:
         dataframes[name] = {}
         for group in groups:
-            dataframes[name][group] = pd.DataFrame(slices[name][group]).transpose()
+            metrics = getTableMetrics(containerlist, runlist, group) if runlist else []
+            dataframes[name][group] = makeTable(wide, info, ("full", name), ("region", "layer"), sorted(runlist),
+                                                group, metrics, ["nModules", "nBunches", "instLumi"])
 
     return dataframes
 
-def makeFullDetectorTables(containerlist, runlist, singlerun = False):
+def makeFullDetectorTables(containerlist, runlist, singlerun = False, tableframes = None):
     logging.info("Getting pandas DF for full detector")
     groups = ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]
 
+    if tableframes is None:
+        tableframes = getTableFrames(containerlist, runlist)
+    wide, info = tableframes
     runtables = {}
     for run in runlist:
         runtables[run] = {}
-        data = containerlist[run].getpdDataFrame("fullDetector")
         for group in groups:
-            runtables[run][group] = data[group]
+            runtables[run][group] = makeTable(wide, info, (run, "full"), ("run", "region"), containerlist[run].LayerNames,
+                                              group, getTableMetrics(containerlist, runlist, group), [])
     if not singlerun:
-        runcomparisonperLayer = getDataFramesForRunComp(containerlist, runlist, "fullDetector")
+        runcomparisonperLayer = getDataFramesForRunComp(containerlist, runlist, "fullDetector", tableframes)
     else:
         runcomparisonperLayer = None
 
     return runtables, runcomparisonperLayer
 
-def makeZdepDetectorTables(containerlist, runlist, singlerun = False):
+def makeZdepDetectorTables(containerlist, runlist, singlerun = False, tableframes = None):
     logging.info("Getting pandas DF for z-dependent detector parts")
     layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
     groups = ["Pix/Lay"] # necessary for current implementation of z-dependency
     #groups = ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]
 
+    if tableframes is None:
+        tableframes = getTableFrames(containerlist, runlist)
+    wide, info = tableframes
     runtables, runcomparisonperLayer = {}, None
     for run in runlist:
         runtables[run] = {}
-        datadict = containerlist[run].getpdDataFrame("partialDetectorZ")
         for group in groups:
             runtables[run][group] = {}
-            data = datadict[group]
             for layer in layerNames:
-                layerdata = data.loc[layer]
-                layerseries = {}
-                for z in containerlist[run].zpositions:
-                    positiondata = layerdata[z]
-                    series = pd.Series([containerlist[run].nWorkingModulesZ[layer][z]], index = ["nModules"])
-                    series = series.append(positiondata)
-                    layerseries[z] = series
-                currentDF = pd.DataFrame(layerseries)
-                currentDF = currentDF[containerlist[run].zpositions] #Sort z-positions
-                runtables[run][group][layer] = currentDF.transpose()
+                runtables[run][group][layer] = makeTable(wide, info, (run, layer), ("run", "layer"), containerlist[run].zpositions,
+                                                         group, getTableMetrics(containerlist, runlist, group), ["nModules"])
     #TODO: Implement run comparison per z position
     # if not singler:
     return runtables, runcomparisonperLayer
 
-def makeInnerOuterLadderDetectorTables(containerlist, runlist, singlerun = False):
+def makeInnerOuterLadderDetectorTables(containerlist, runlist, singlerun = False, tableframes = None):
     logging.info("Getting pandas DF for inner and outer ladder detector parts")
     layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
     groups = ["Pix/Lay"]
 
+    if tableframes is None:
+        tableframes = getTableFrames(containerlist, runlist)
+    wide, info = tableframes
     runtables, runcomparisonperLayer = {}, {}
     for run in runlist:
         runtables[run] = {}
-        datadict = containerlist[run].getpdDataFrame("partialDetectorInnerOuterLadders")
         for group in groups:
             runtables[run][group] = {}
-            data = datadict[group]
             for layer in layerNames:
-                layerdata = data.loc[layer]
-                layerseries = {}
-                for ladder in ["inner", "outer"]:
-                    positiondata = layerdata[ladder]
-                    series = pd.Series([containerlist[run].nWorkingModulesInOut[layer][ladder]], index = ["nModules"])
-                    series = series.append(positiondata)
-                    layerseries[ladder] = series
-                currentDF = pd.DataFrame(layerseries)
-                runtables[run][group][layer] = currentDF.transpose()
+                runtables[run][group][layer] = makeTable(wide, info, (run, layer), ("run", "layer"), ["inner", "outer"],
+                                                         group, getTableMetrics(containerlist, runlist, group), ["nModules"])
     if not singlerun:
         # RunComparison tables -> For inner/outer ladder -> for each layer -> for each group -> for each run on row
-        # ----> runcomparisonperLayer[ladder][layer][group]
-        slices = {}
-        for group in groups:
-            slices[group] = {}
-            for ladder in ["inner", "outer"]:
-                slices[group][ladder] = {}
-                for layer in layerNames:
-                    slices[group][ladder][layer] = {}
-
-        for run in runlist:
-            datadict = containerlist[run].getpdDataFrame("partialDetectorInnerOuterLadders")
-            for group in groups:
-                for ladder in ["inner", "outer"]:
-                    for layer in layerNames:
-                        layerdataforLadderLayer = datadict[group].transpose().loc[ladder].transpose().loc[layer]
-
-                        generalinfo = pd.Series([containerlist[run].nWorkingModulesInOut[layer][ladder],
-                                                 containerlist[run].collBunches,
-                                                 containerlist[run].instLumi],
-                                                index = ["nModules", "nBunches", "instLumi"])
-                        slices[group][ladder][layer][run] = generalinfo.append(layerdataforLadderLayer)
-
+        # ----> runcomparisonperLayer[group][ladder][layer]
         runcomparisonperLayer = {}
         for group in groups:
             runcomparisonperLayer[group] = {}
+            metrics = getTableMetrics(containerlist, runlist, group) if runlist else []
             for ladder in ["inner", "outer"]:
                 runcomparisonperLayer[group][ladder] = {}
                 for layer in layerNames:
-                    runcomparisonperLayer[group][ladder][layer] = pd.DataFrame(slices[group][ladder][layer]).transpose()
+                    runcomparisonperLayer[group][ladder][layer] = makeTable(wide, info, (ladder, layer), ("region", "layer"), sorted(runlist),
+                                                                            group, metrics, ["nModules", "nBunches", "instLumi"])
     else:
         runcomparisonperLayer = None
 
     return runtables, runcomparisonperLayer
 
-def makeRunComparisonPlots(containerlist, runlist, foldername, group, details = False):
+def writeColumnarFile(df, filename, fileformat):
+    """
+    Write the DataFrame df to filename in the fileformat parquet, feather or hdf5. The required
+    modules (pyarrow/fastparquet for parquet and feather, pytables for hdf5) are only imported by pandas
+    when the file is written.
+    """
+    logging.debug("Writing {0} file: {1}".format(fileformat, filename))
+    try:
+        if fileformat == "parquet":
+            df.to_parquet(filename)
+        elif fileformat == "feather":
+            df.reset_index(drop = True).to_feather(filename)
+        elif fileformat == "hdf5":
+            df.to_hdf(filename, "tables", mode = "w", format = "table")
+        else:
+            logging.error("Format {0} not supported for columnar export. Use parquet, feather or hdf5".format(fileformat))
+            return False
+    except ImportError as e:
+        logging.error("Module for {0} export not available: {1}".format(fileformat, e))
+        return False
+    return True
+
+def makeRunComparisonPlots(containerlist, runlist, foldername, group, details = False, tables = None, nJobs = 1):
+    """
+    Render the run comparison plots of group with nJobs processes (see getRunComparisonPlotJobs).
+    Returns the list of modules.plotting.plotrecord or None if the group is not supported.
+    """
+    import modules.plotting
+    plotjobs = getRunComparisonPlotJobs(containerlist, runlist, foldername, group, details, tables)
+    if plotjobs is None:
+        return None
+    return plotjobs.getRecords(modules.plotting.renderPlots(plotjobs, nJobs))
+
+def getRunComparisonPlotJobs(containerlist, runlist, foldername, group, details = False, tables = None):
+    """
+    Returns the run comparison plots of group as modules.plotting.plotjobs (not rendered yet) or
+    None if the group is not supported.
+    """
+    import modules.plotting
+
     if group not in ["Pix/Lay", "Pix/Det", "Clus/Lay", "Clus/Det"]:
         logging.error("Group *{0}* is not supported".format(group))
-        generatedplots = None
+        plotjobs = None
     else:
-        generatedplots = []
+        plotjobs = modules.plotting.plotjobs(group)
 
-        runcompperlayer = makeFullDetectorTables(containerlist, runlist)[1]
-        perRunTablesZDependent = makeZdepDetectorTables(containerlist, runlist)[0]
-        rumcompladders = modules.pandasOutput.makeInnerOuterLadderDetectorTables(containerlist, runlist)[1]
+        if tables is None:
+            tables = tablecache(containerlist, runlist)
+        runcompperlayer = tables.getFullDetectorTables()[1]
+        perRunTablesZDependent = tables.getZdepDetectorTables()[0]
+        rumcompladders = tables.getInnerOuterLadderDetectorTables()[1]
         prefix = "RunComp"
-        generatedplots.append(modules.plotting.makeDiYAxisplot(runcompperlayer["Layer1"][group]["instLumi"],
-                                                               r"average inst. Lumi [cm$^{-2}$s$^{-1}$]",
-                                                               runcompperlayer["Layer1"][group]["nBunches"],
-                                                               "Number of colliding bunches",
-                                                               "{0}LumiVsnBunches_allLayers".format(prefix),
-                                                               "", foldername))
-        generatedplots.append(modules.plotting.makeDiYAxisplot(runcompperlayer["Layer1"][group]["instLumi"],
-                                                               r"average inst. Lumi [cm$^{-2}$s$^{-1}$]",
-                                                               runcompperlayer["Layer1"][group]["instLumi"]/runcompperlayer["Layer1"][group]["nBunches"],
-                                                               r'Lumi/bx [cm$^{-2}$s$^{-1}$]',
-                                                               "{0}LumiVsLumiperBX_allLayers".format(prefix),
-                                                               "", foldername))
+        plotjobs.makeDiYAxisplot(runcompperlayer["Layer1"][group]["instLumi"],
+                                 r"average inst. Lumi [cm$^{-2}$s$^{-1}$]",
+                                 runcompperlayer["Layer1"][group]["nBunches"],
+                                 "Number of colliding bunches",
+                                 "{0}LumiVsnBunches_allLayers".format(prefix),
+                                 "", foldername, tags = {"metric" : "instLumi"})
+        plotjobs.makeDiYAxisplot(runcompperlayer["Layer1"][group]["instLumi"],
+                                 r"average inst. Lumi [cm$^{-2}$s$^{-1}$]",
+                                 runcompperlayer["Layer1"][group]["instLumi"]/runcompperlayer["Layer1"][group]["nBunches"],
+                                 r'Lumi/bx [cm$^{-2}$s$^{-1}$]',
+                                 "{0}LumiVsLumiperBX_allLayers".format(prefix),
+                                 "", foldername, tags = {"metric" : "instLumi"})
         if group.startswith("Pix"):
-            generatedplots.append(modules.plotting.makecomparionPlot([runcompperlayer["Layer1"][group]["occupancy"],
-                                                                      runcompperlayer["Layer2"][group]["occupancy"],
-                                                                      runcompperlayer["Layer3"][group]["occupancy"],
-                                                                      runcompperlayer["Layer4"][group]["occupancy"]],
-                                                                     ["Layer1","Layer2","Layer3","Layer4"],
-                                                                     "{0}_{1}_Occupancy_allLayers".format(prefix, group.replace("/","per")),
-                                                                     foldername = foldername, yTitle = r"Occupancy"))
-        generatedplots.append(modules.plotting.makecomparionPlot([runcompperlayer["Layer1"][group]["perAreaNorm"],
-                                                                  runcompperlayer["Layer2"][group]["perAreaNorm"],
-                                                                  runcompperlayer["Layer3"][group]["perAreaNorm"],
-                                                                  runcompperlayer["Layer4"][group]["perAreaNorm"]],
-                                                                 ["Layer1","Layer2","Layer3","Layer4"],
-                                                                 "{0}_{1}_perAreaNorm_allLayers".format(prefix, group.replace("/","per")),
-                                                                 foldername = foldername, yTitle = r"Hits per module area norm. to inst. luminosity per bunch"))
-        generatedplots.append(modules.plotting.makecomparionPlot([runcompperlayer["Layer1"][group]["perAreaSec"],
-                                                                  runcompperlayer["Layer2"][group]["perAreaSec"],
-                                                                  runcompperlayer["Layer3"][group]["perAreaSec"],
-                                                                  runcompperlayer["Layer4"][group]["perAreaSec"]],
-                                                                 ["Layer1","Layer2","Layer3","Layer4"],
-                                                                 "{0}_{1}_perAreaSec_allLayers".format(prefix, group.replace("/","per")),
-                                                                 foldername = foldername, yTitle = r"hit rate per active module area [cm$^{-2}$s$^{-1}$]"))
-        generatedplots.append(modules.plotting.makecomparionPlot([runcompperlayer["Layer1"][group]["perArea"],
-                                                                  runcompperlayer["Layer2"][group]["perArea"],
-                                                                  runcompperlayer["Layer3"][group]["perArea"],
-                                                                  runcompperlayer["Layer4"][group]["perArea"]],
-                                                                 ["Layer1","Layer2","Layer3","Layer4"],
-                                                                 "{0}_{1}_density_allLayers".format(prefix, group.replace("/","per")),
-                                                                 foldername = foldername, yTitle = r"Hits per module area [cm$^{-2}$]"))
+            plotjobs.makecomparionPlot([runcompperlayer["Layer1"][group]["occupancy"],
+                                        runcompperlayer["Layer2"][group]["occupancy"],
+                                        runcompperlayer["Layer3"][group]["occupancy"],
+                                        runcompperlayer["Layer4"][group]["occupancy"]],
+                                       ["Layer1","Layer2","Layer3","Layer4"],
+                                       "{0}_{1}_Occupancy_allLayers".format(prefix, group.replace("/","per")),
+                                       foldername = foldername, yTitle = r"Occupancy", tags = {"metric" : "occupancy"})
+        plotjobs.makecomparionPlot([runcompperlayer["Layer1"][group]["perAreaNorm"],
+                                    runcompperlayer["Layer2"][group]["perAreaNorm"],
+                                    runcompperlayer["Layer3"][group]["perAreaNorm"],
+                                    runcompperlayer["Layer4"][group]["perAreaNorm"]],
+                                   ["Layer1","Layer2","Layer3","Layer4"],
+                                   "{0}_{1}_perAreaNorm_allLayers".format(prefix, group.replace("/","per")),
+                                   foldername = foldername, yTitle = r"Hits per module area norm. to inst. luminosity per bunch",
+                                   tags = {"metric" : "perAreaNorm"})
+        plotjobs.makecomparionPlot([runcompperlayer["Layer1"][group]["perAreaSec"],
+                                    runcompperlayer["Layer2"][group]["perAreaSec"],
+                                    runcompperlayer["Layer3"][group]["perAreaSec"],
+                                    runcompperlayer["Layer4"][group]["perAreaSec"]],
+                                   ["Layer1","Layer2","Layer3","Layer4"],
+                                   "{0}_{1}_perAreaSec_allLayers".format(prefix, group.replace("/","per")),
+                                   foldername = foldername, yTitle = r"hit rate per active module area [cm$^{-2}$s$^{-1}$]",
+                                   tags = {"metric" : "perAreaSec"})
+        plotjobs.makecomparionPlot([runcompperlayer["Layer1"][group]["perArea"],
+                                    runcompperlayer["Layer2"][group]["perArea"],
+                                    runcompperlayer["Layer3"][group]["perArea"],
+                                    runcompperlayer["Layer4"][group]["perArea"]],
+                                   ["Layer1","Layer2","Layer3","Layer4"],
+                                   "{0}_{1}_density_allLayers".format(prefix, group.replace("/","per")),
+                                   foldername = foldername, yTitle = r"Hits per module area [cm$^{-2}$]", tags = {"metric" : "perArea"})
         #Run comparisons
         for layer in ["Layer1", "Layer2", "Layer3", "Layer4"]:
             normrate = runcompperlayer[layer][group]["perAreaNorm"]
             lumiperbx = runcompperlayer[layer][group]["instLumi"]/runcompperlayer["Layer1"][group]["nBunches"]
 
-            generatedplots.append(modules.plotting.makeDiYAxisplot(normrate, 'Hits per module area norm. to inst. luminosity per bunch',
-                                                                   lumiperbx, r'Lumi/bx [cm$^{-2}$s$^{-1}$]',
-                                                                   "{0}_{2}_perAreaNorm_{1}".format(prefix, layer, group.replace("/","per")),
-                                                                   layer, foldername))
-            generatedplots.append(modules.plotting.makeDiYAxisplot(normrate, 'Hits per module area norm. to inst. luminosity per bunch',
-                                                                   runcompperlayer[layer][group]["nBunches"], r"Number of colliding bunches",
-                                                                   "{0}_{2}_perAreaNorm_nBX_{1}".format(prefix, layer, group.replace("/","per")),
-                                                                   layer, foldername))
-            generatedplots.append(modules.plotting.makeDiYAxisplot(normrate, 'Hits per module area norm. to inst. luminosity per bunch',
-                                                                   runcompperlayer[layer][group]["instLumi"], r'average inst. lumi [cm$^{-2}$s$^{-1}$]',
-                                                                   "{0}_{2}_perAreaNorm_Lumi_{1}".format(prefix, layer, group.replace("/","per")),
-                                                                   layer, foldername))
-            generatedplots.append(modules.plotting.makeDiYAxisplot(runcompperlayer[layer][group]["perAreaSec"],
-                                                                   r'hit rate per active module area [cm$^{-2}$s$^{-1}$]',
-                                                                   lumiperbx, r'Lumi/bx [cm$^{-2}$s$^{-1}$]',
-                                                                   "{0}_{2}_perAreaSec_{1}".format(prefix, layer, group.replace("/","per")),
-                                                                   layer, foldername))
-            generatedplots.append(modules.plotting.makeDiYAxisplot(runcompperlayer[layer][group]["perAreaSec"],
-                                                                   r'hit rate per active module area [cm$^{-2}$s$^{-1}$]',
-                                                                   runcompperlayer[layer][group]["instLumi"], r'average inst. lumi [cm$^{-2}$s$^{-1}$]',
-                                                                   "{0}_{2}_perAreaSec_Lumi_{1}".format(prefix, layer, group.replace("/","per")),
-                                                                   layer, foldername))
-            generatedplots.append(modules.plotting.makeDiYAxisplot(runcompperlayer[layer][group]["perAreaSec"],
-                                                                   r'hit rate per active module area [cm$^{-2}$s$^{-1}$]',
-                                                                   runcompperlayer[layer][group]["nBunches"], r"Number of colliding bunches",
-                                                                   "{0}_{2}_perAreaSec_nBX_{1}".format(prefix, layer, group.replace("/","per")),
-                                                                   layer, foldername))
+            plotjobs.makeDiYAxisplot(normrate, 'Hits per module area norm. to inst. luminosity per bunch',
+                                     lumiperbx, r'Lumi/bx [cm$^{-2}$s$^{-1}$]',
+                                     "{0}_{2}_perAreaNorm_{1}".format(prefix, layer, group.replace("/","per")),
+                                     layer, foldername, tags = {"layer" : layer, "metric" : "perAreaNorm"})
+            plotjobs.makeDiYAxisplot(normrate, 'Hits per module area norm. to inst. luminosity per bunch',
+                                     runcompperlayer[layer][group]["nBunches"], r"Number of colliding bunches",
+                                     "{0}_{2}_perAreaNorm_nBX_{1}".format(prefix, layer, group.replace("/","per")),
+                                     layer, foldername, tags = {"layer" : layer, "metric" : "perAreaNorm"})
+            plotjobs.makeDiYAxisplot(normrate, 'Hits per module area norm. to inst. luminosity per bunch',
+                                     runcompperlayer[layer][group]["instLumi"], r'average inst. lumi [cm$^{-2}$s$^{-1}$]',
+                                     "{0}_{2}_perAreaNorm_Lumi_{1}".format(prefix, layer, group.replace("/","per")),
+                                     layer, foldername, tags = {"layer" : layer, "metric" : "perAreaNorm"})
+            plotjobs.makeDiYAxisplot(runcompperlayer[layer][group]["perAreaSec"],
+                                     r'hit rate per active module area [cm$^{-2}$s$^{-1}$]',
+                                     lumiperbx, r'Lumi/bx [cm$^{-2}$s$^{-1}$]',
+                                     "{0}_{2}_perAreaSec_{1}".format(prefix, layer, group.replace("/","per")),
+                                     layer, foldername, tags = {"layer" : layer, "metric" : "perAreaSec"})
+            plotjobs.makeDiYAxisplot(runcompperlayer[layer][group]["perAreaSec"],
+                                     r'hit rate per active module area [cm$^{-2}$s$^{-1}$]',
+                                     runcompperlayer[layer][group]["instLumi"], r'average inst. lumi [cm$^{-2}$s$^{-1}$]',
+                                     "{0}_{2}_perAreaSec_Lumi_{1}".format(prefix, layer, group.replace("/","per")),
+                                     layer, foldername, tags = {"layer" : layer, "metric" : "perAreaSec"})
+            plotjobs.makeDiYAxisplot(runcompperlayer[layer][group]["perAreaSec"],
+                                     r'hit rate per active module area [cm$^{-2}$s$^{-1}$]',
+                                     runcompperlayer[layer][group]["nBunches"], r"Number of colliding bunches",
+                                     "{0}_{2}_perAreaSec_nBX_{1}".format(prefix, layer, group.replace("/","per")),
+                                     layer, foldername, tags = {"layer" : layer, "metric" : "perAreaSec"})
             doplots = False
             if group == "Pix/Lay":
                 doplots = True
@@ -242,73 +368,77 @@ def makeRunComparisonPlots(containerlist, runlist, foldername, group, details =
                 othergroup = "Clus/Det"
             if doplots:
                 if group == "Pix/Lay":
-                    generatedplots.append(modules.plotting.makeDiYAxisplot(runcompperlayer[layer][group]["occupancy"], r"Occupancy",
-                                                                           lumiperbx, r'Inst. luminosity per coolliding bunch [cm$^{-2}$s$^{-1}$]',
-                                                                           "{0}_{2}_Occupancy{1}".format(prefix, layer, group.replace("/","per")),
-                                                                           layer, foldername))
-                    generatedplots.append(modules.plotting.makeDiYAxisplot(runcompperlayer[layer][group]["occupancy"], r"Occupancy",
-                                                                           runcompperlayer["Layer1"][group]["instLumi"], r"average inst. Lumi [cm$^{-2}$s$^{-1}$]",
-                                                                           "{0}_{2}_OccupancyVsLumi{1}".format(prefix, layer, group.replace("/","per")),
-                                                                           layer, foldername))
-                    generatedplots.append(modules.plotting.makeDiYAxisplot(runcompperlayer[layer][group]["occupancy"], r"Occupancy",
-                                                                            runcompperlayer["Layer1"][group]["nBunches"], "Number of colliding bunches",
-                                                                           "{0}_{2}_OccupancyVsnBx{1}".format(prefix, layer, group.replace("/","per")),
-                                                                           layer, foldername))
-                    generatedplots.append(modules.plotting.makecomparionPlot([runcompperlayer[layer][group]["occupancy"],
-                                                                              runcompperlayer[layer][othergroup]["occupancy"]],
-                                                                             [r"Calculated from layer", r"Calculated from dets"],
-                                                                             "{0}_{2}_LayerVsDet_Occupancy{1}".format(prefix, layer, group.replace("/","per")),
-                                                                             plottitle = layer, foldername = foldername,
-                                                                             yTitle = r"Occupancy"))
-                generatedplots.append(modules.plotting.makecomparionPlot([runcompperlayer[layer][group]["perAreaSec"],runcompperlayer[layer][othergroup]["perAreaSec"]],
-                                                                         [r"Calculated from layer", r"Calculated from dets"],
-                                                                         "{0}_{2}_LayerVsDet_rate{1}".format(prefix, layer, group.replace("/","per")),
-                                                                         plottitle = layer, foldername = foldername,
-                                                                         yTitle = r"hit rate per active module area [cm$^{-2}$s$^{-1}$]"))
-                generatedplots.append(modules.plotting.makecomparionPlot([runcompperlayer[layer][group]["perAreaNorm"],runcompperlayer[layer][othergroup]["perAreaNorm"]],
-                                                                         [r"Calculated from layer", r"Calculated from dets"],
-                                                                         "{0}_{2}_LayerVsDet_areaNorm{1}".format(prefix, layer, group.replace("/","per")),
-                                                                         plottitle = layer, foldername = foldername,
-                                                                         yTitle = r"Hits per module area norm. to inst. luminosity per bunch"))
+                    plotjobs.makeDiYAxisplot(runcompperlayer[layer][group]["occupancy"], r"Occupancy",
+                                             lumiperbx, r'Inst. luminosity per coolliding bunch [cm$^{-2}$s$^{-1}$]',
+                                             "{0}_{2}_Occupancy{1}".format(prefix, layer, group.replace("/","per")),
+                                             layer, foldername, tags = {"layer" : layer, "metric" : "occupancy"})
+                    plotjobs.makeDiYAxisplot(runcompperlayer[layer][group]["occupancy"], r"Occupancy",
+                                             runcompperlayer["Layer1"][group]["instLumi"], r"average inst. Lumi [cm$^{-2}$s$^{-1}$]",
+                                             "{0}_{2}_OccupancyVsLumi{1}".format(prefix, layer, group.replace("/","per")),
+                                             layer, foldername, tags = {"layer" : layer, "metric" : "occupancy"})
+                    plotjobs.makeDiYAxisplot(runcompperlayer[layer][group]["occupancy"], r"Occupancy",
+                                              runcompperlayer["Layer1"][group]["nBunches"], "Number of colliding bunches",
+                                             "{0}_{2}_OccupancyVsnBx{1}".format(prefix, layer, group.replace("/","per")),
+                                             layer, foldername, tags = {"layer" : layer, "metric" : "occupancy"})
+                    plotjobs.makecomparionPlot([runcompperlayer[layer][group]["occupancy"],
+                                                runcompperlayer[layer][othergroup]["occupancy"]],
+                                               [r"Calculated from layer", r"Calculated from dets"],
+                                               "{0}_{2}_LayerVsDet_Occupancy{1}".format(prefix, layer, group.replace("/","per")),
+                                               plottitle = layer, foldername = foldername,
+                                               yTitle = r"Occupancy", tags = {"layer" : layer, "metric" : "occupancy"})
+                plotjobs.makecomparionPlot([runcompperlayer[layer][group]["perAreaSec"],runcompperlayer[layer][othergroup]["perAreaSec"]],
+                                           [r"Calculated from layer", r"Calculated from dets"],
+                                           "{0}_{2}_LayerVsDet_rate{1}".format(prefix, layer, group.replace("/","per")),
+                                           plottitle = layer, foldername = foldername,
+                                           yTitle = r"hit rate per active module area [cm$^{-2}$s$^{-1}$]", tags = {"layer" : layer, "metric" : "perAreaSec"})
+                plotjobs.makecomparionPlot([runcompperlayer[layer][group]["perAreaNorm"],runcompperlayer[layer][othergroup]["perAreaNorm"]],
+                                           [r"Calculated from layer", r"Calculated from dets"],
+                                           "{0}_{2}_LayerVsDet_areaNorm{1}".format(prefix, layer, group.replace("/","per")),
+                                           plottitle = layer, foldername = foldername,
+                                           yTitle = r"Hits per module area norm. to inst. luminosity per bunch", tags = {"layer" : layer, "metric" : "perAreaNorm"})
         # Inner/Outer ladder dependency
         if group == "Pix/Lay":
             for layer in ["Layer1", "Layer2", "Layer3", "Layer4"]:
-                generatedplots.append(modules.plotting.makecomparionPlot([rumcompladders["Pix/Lay"]["inner"][layer]["occupancy"],
-                                                                          rumcompladders["Pix/Lay"]["outer"][layer]["occupancy"],
-                                                                          runcompperlayer[layer]["Pix/Lay"]["occupancy"]],
-                                                                         [r"Inner Ladder", r"Outer Ladder",r"Full layer"],
-                                                                         "InnerVsOuterRunComp_{0}_occupancy".format(layer), plottitle = layer,
-                                                                         foldername = foldername, yTitle = r"Occupancy"))
-                generatedplots.append(modules.plotting.makecomparionPlot([rumcompladders["Pix/Lay"]["inner"][layer]["perAreaSec"],
-                                                                          rumcompladders["Pix/Lay"]["outer"][layer]["perAreaSec"],
-                                                                          runcompperlayer[layer]["Pix/Lay"]["perAreaSec"]],
-                                                                         [r"Inner Ladder", r"Outer Ladder",r"Full layer"],
-                                                                         "InnerVsOuterRunComp_{0}_perAreaSec".format(layer), plottitle = layer,
-                                                                         foldername = foldername, yTitle = r"hit rate per active module area [cm$^{-2}$s$^{-1}$]"))
-                generatedplots.append(modules.plotting.makecomparionPlot([rumcompladders["Pix/Lay"]["inner"][layer]["perAreaNorm"],
-                                                                          rumcompladders["Pix/Lay"]["outer"][layer]["perAreaNorm"],
-                                                                          runcompperlayer[layer]["Pix/Lay"]["perAreaNorm"]],
-                                                                         [r"Inner Ladder", r"Outer Ladder",r"Full layer"],
-                                                                         "InnerVsOuterRunComp_{0}_perAreaNorm".format(layer), plottitle = layer,
-                                                                         foldername = foldername, yTitle = r"Hits per module area norm. to inst. luminosity per bunch"))
-                generatedplots.append(modules.plotting.makecomparionPlot([rumcompladders["Pix/Lay"]["inner"][layer]["nhit"],
-                                                                          rumcompladders["Pix/Lay"]["outer"][layer]["nhit"],
-                                                                          runcompperlayer[layer]["Pix/Lay"]["nhit"]],
-                                                                         [r"Inner Ladder", r"Outer Ladder",r"Full layer"],
-                                                                         "InnerVsOuterRunComp_{0}_nhit".format(layer), plottitle = layer,
-                                                                         foldername = foldername, yTitle = r"Number of pixels hit"))
+                plotjobs.makecomparionPlot([rumcompladders["Pix/Lay"]["inner"][layer]["occupancy"],
+                                            rumcompladders["Pix/Lay"]["outer"][layer]["occupancy"],
+                                            runcompperlayer[layer]["Pix/Lay"]["occupancy"]],
+                                           [r"Inner Ladder", r"Outer Ladder",r"Full layer"],
+                                           "InnerVsOuterRunComp_{0}_occupancy".format(layer), plottitle = layer,
+                                           foldername = foldername, yTitle = r"Occupancy",
+                                           tags = {"layer" : layer, "region" : "innerVsOuter", "metric" : "occupancy"})
+                plotjobs.makecomparionPlot([rumcompladders["Pix/Lay"]["inner"][layer]["perAreaSec"],
+                                            rumcompladders["Pix/Lay"]["outer"][layer]["perAreaSec"],
+                                            runcompperlayer[layer]["Pix/Lay"]["perAreaSec"]],
+                                           [r"Inner Ladder", r"Outer Ladder",r"Full layer"],
+                                           "InnerVsOuterRunComp_{0}_perAreaSec".format(layer), plottitle = layer,
+                                           foldername = foldername, yTitle = r"hit rate per active module area [cm$^{-2}$s$^{-1}$]",
+                                           tags = {"layer" : layer, "region" : "innerVsOuter", "metric" : "perAreaSec"})
+                plotjobs.makecomparionPlot([rumcompladders["Pix/Lay"]["inner"][layer]["perAreaNorm"],
+                                            rumcompladders["Pix/Lay"]["outer"][layer]["perAreaNorm"],
+                                            runcompperlayer[layer]["Pix/Lay"]["perAreaNorm"]],
+                                           [r"Inner Ladder", r"Outer Ladder",r"Full layer"],
+                                           "InnerVsOuterRunComp_{0}_perAreaNorm".format(layer), plottitle = layer,
+                                           foldername = foldername, yTitle = r"Hits per module area norm. to inst. luminosity per bunch",
+                                           tags = {"layer" : layer, "region" : "innerVsOuter", "metric" : "perAreaNorm"})
+                plotjobs.makecomparionPlot([rumcompladders["Pix/Lay"]["inner"][layer]["nhit"],
+                                            rumcompladders["Pix/Lay"]["outer"][layer]["nhit"],
+                                            runcompperlayer[layer]["Pix/Lay"]["nhit"]],
+                                           [r"Inner Ladder", r"Outer Ladder",r"Full layer"],
+                                           "InnerVsOuterRunComp_{0}_nhit".format(layer), plottitle = layer,
+                                           foldername = foldername, yTitle = r"Number of pixels hit",
+                                           tags = {"layer" : layer, "region" : "innerVsOuter", "metric" : "nhit"})
             for ladder in ["inner", "outer"]:
                 for plot, title in [("nhit", r"Number of pixels hit"),
                                     ("perAreaNorm", r"Hits per module area norm. to inst. luminosity per bunch"),
                                     ("occupancy", r"Occupancy"),
                                     ("perAreaSec", r"hit rate per active module area [cm$^{-2}$s$^{-1}$]")]:
-                    generatedplots.append(modules.plotting.makecomparionPlot([rumcompladders["Pix/Lay"][ladder]["Layer1"][plot],
-                                                                              rumcompladders["Pix/Lay"][ladder]["Layer2"][plot],
-                                                                              rumcompladders["Pix/Lay"][ladder]["Layer3"][plot],
-                                                                              rumcompladders["Pix/Lay"][ladder]["Layer4"][plot]],
-                                                                             [r"Layer1", r"Layer2", r"Layer3", r"Layer4"],
-                                                                             "{0}RunComp_{1}_allLayers".format(ladder, plot),
-                                                                             foldername = foldername, yTitle = title))
+                    plotjobs.makecomparionPlot([rumcompladders["Pix/Lay"][ladder]["Layer1"][plot],
+                                                rumcompladders["Pix/Lay"][ladder]["Layer2"][plot],
+                                                rumcompladders["Pix/Lay"][ladder]["Layer3"][plot],
+                                                rumcompladders["Pix/Lay"][ladder]["Layer4"][plot]],
+                                               [r"Layer1", r"Layer2", r"Layer3", r"Layer4"],
+                                               "{0}RunComp_{1}_allLayers".format(ladder, plot),
+                                               foldername = foldername, yTitle = title, tags = {"region" : ladder, "metric" : plot})
 
         # Z dependency
         if group == 'Pix/Lay':
@@ -320,12 +450,13 @@ def makeRunComparisonPlots(containerlist, runlist, foldername, group, details =
                     for layer in ["Layer1", "Layer2", "Layer3", "Layer4"]:
                         plotdict[layer] = perRunTablesZDependent[run]['Pix/Lay'][layer][values[0]]
                         runcompperLayer[layer][run] = perRunTablesZDependent[run]['Pix/Lay'][layer][values[0]]
-                    generatedplots.append(modules.plotting.plotDataFrame(pd.DataFrame(plotdict), "Zdep_{0}_{1}".format(run,values[0]), "Z position", values[1], foldername = foldername, plottitle = run))
+                    plotjobs.plotDataFrame(pd.DataFrame(plotdict), "Zdep_{0}_{1}".format(run,values[0]), "Z position", values[1], foldername = foldername, plottitle = run,
+                                           tags = {"run" : run, "metric" : values[0]})
                 #for layer in ["Layer1", "Layer2", "Layer3", "Layer4"]:
-                #    generatedplots.append(modules.plotting.plotDataFrame(pd.DataFrame(runcompperLayer[layer]), "ZdepRunComp_{0}_{1}".format(layer, values[0]),
-                #                                                         "Z position", values[1], foldername = foldername, plottitle = layer))
+                #    plotjobs.plotDataFrame(pd.DataFrame(runcompperLayer[layer]), "ZdepRunComp_{0}_{1}".format(layer, values[0]),
+                #                           "Z position", values[1], foldername = foldername, plottitle = layer)
 
-    return generatedplots
+    return plotjobs
 
 
 def getcommentDF(containerlist, runlist):
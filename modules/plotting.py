@@ -1,9 +1,14 @@
-from ConfigParser import SafeConfigParser
-
+import matplotlib
 import matplotlib.pyplot as plt
-from matplotlib import rc, rcParams
+from matplotlib import rc, rcParams, ticker
 import os
 import logging
+import hashlib
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+import modules.settings
 
 # activate latex text rendering
 rc('text', usetex=True)
@@ -20,54 +25,223 @@ plt.rc('ytick', labelsize=SMALL_SIZE)    # fontsize of the tick labels
 plt.rc('legend', fontsize=MEDIUM_SIZE)    # legend fontsize
 plt.rc('figure', titlesize=BIGGER_SIZE)  # fontsize of the figure title
 
-styleconfig = SafeConfigParser()
-logging.debug("Loading style config")
-styleconfig.read("configs/style.cfg")
-
-dpi = styleconfig.getint("Plotting","dpi")
+dpi = modules.settings.getSettings().dpi
 logging.debug("Setting DPI to {0}".format(dpi))
-savepdf = styleconfig.getboolean("Plotting","savepdf")
+savepdf = modules.settings.getSettings().savepdf
 logging.debug("Setting pdf output to: {0}".format(savepdf))
+plotmode = "publication"
+
+plotmodes = ["draft", "publication"]
+
+def setPlotMode(mode):
+    """
+    Set the plot mode for all following plots (also rendered in worker processes started afterwards):
+    * publication: Text rendered with LaTeX, dpi and savepdf from the settings. The LaTeX output
+      is cached in the folder texcache of the settings and reused in the next calls.
+    * draft: Text rendered with mathtext (no LaTeX), draftdpi from the settings and no pdf files.
+    """
+    global dpi, savepdf, plotmode
+    if mode not in plotmodes:
+        logging.error("Plot mode {0} not supported. Use one of {1}".format(mode, plotmodes))
+        return
+    logging.info("Setting plot mode to {0}".format(mode))
+    plotmode = mode
+    settings = modules.settings.getSettings()
+    if mode == "draft":
+        rc('text', usetex=False)
+        dpi = settings.draftdpi
+        savepdf = False
+    else:
+        rc('text', usetex=True)
+        dpi = settings.dpi
+        savepdf = settings.savepdf
+        setTeXCache(settings.texcache)
+    logging.debug("Setting DPI to {0} and pdf output to: {1}".format(dpi, savepdf))
+
+def setTeXCache(folder):
+    """
+    Use folder to save the files generated by LaTeX. Labels already rendered in previous calls are reused.
+    """
+    from matplotlib.texmanager import TexManager
+    folder = os.path.abspath(folder)
+    logging.debug("Using LaTeX cache in {0}".format(folder))
+    makedirs(folder)
+    TexManager.texcache = folder
+
+def drawCMSLabel(base, Preliminary = False):
+    """
+    Draw the CMS label (and Preliminary or Work in Progress) on the axes base
+    """
+    if plotmode == "draft":
+        if Preliminary is True:
+            base.text(0.125, 1.015, "CMS", fontsize = "xx-large", fontweight = "bold", transform=base.transAxes)
+            base.text(0.245, 1.015, "Preliminary", style = "italic", transform=base.transAxes)
+        else:
+            base.text(0.125, 1.005, "CMS", fontsize = "xx-large", fontweight = "bold", transform=base.transAxes)
+            base.text(0.125, 0.96, "Work in Progress", style = "italic", transform=base.transAxes)
+    elif Preliminary is True:
+        base.text(0.125, 1.015, r"{\huge\textbf{CMS}} {\textit{Preliminary}}", transform=base.transAxes)
+    else:
+        base.text(0.125, 1.005, r"{\huge\textbf{CMS}}", transform=base.transAxes)
+        base.text(0.125, 0.96, r"\textit{Work in Progress}", transform=base.transAxes)
+
+def makedirs(path):
+    # The folder can be created by another process rendering plots at the same time
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
 
 def makefolder(foldername):
     if foldername is not None:
         if not os.path.exists(foldername):
             logging.info("Creating folder: {0}".format(foldername))
-            os.makedirs(foldername)
+            makedirs(foldername)
         if not os.path.exists(foldername+"/plots"):
             logging.info("Creating folder: {0}/plots".format(foldername))
-            os.makedirs(foldername+"/plots")
+            makedirs(foldername+"/plots")
         path = foldername+"/plots/"
     else:
         if not os.path.exists("plots"):
             logging.info("Creating folder: plots")
-            os.makedirs("plots")
+            makedirs("plots")
         path = "plots/"
     return path
 
 def get_colors():
     return plt.rcParams['axes.prop_cycle'].by_key()['color']
 
+# Prepared figures (fig, base, second y axis) for each plot kind -> See getFigureTemplate
+figuretemplates = {}
+
+def getFigureTemplate(kind, isRunComp):
+    """
+    Returns the figure, axes and second y axes (only for kind DiYAxis, otherwise None) for plots of kind.
+    The figure (margins, CMS label, twin axes, axis formatters and colors) is build once per kind,
+    isRunComp, dpi and plot mode. On later calls only the data, legend, tick labels and titles of the
+    previous plot are removed.
+    """
+    key = (kind, isRunComp, dpi, plotmode)
+    if key not in figuretemplates:
+        fig, base = plt.subplots(dpi=dpi)
+        if isRunComp:
+            fig.subplots_adjust(bottom = 0.16, right = 0.88, left = 0.11, top = 0.92)
+        else:
+            fig.subplots_adjust(bottom = 0.1, right = 0.88, left = 0.11, top = 0.92)
+        second = None
+        if kind == "DiYAxis":
+            second = base.twinx()
+        drawCMSLabel(base)
+        base.get_yaxis().get_major_formatter().set_powerlimits((-3, 5))
+        if second is not None:
+            second.get_yaxis().get_major_formatter().set_powerlimits((-3, 5))
+            color1, color2 = get_colors()[0], get_colors()[2]
+            base.yaxis.label.set_color(color1)
+            second.yaxis.label.set_color(color2)
+            base.tick_params(axis='y', colors=color1)
+            second.tick_params(axis='y', colors=color2)
+        figuretemplates[key] = (fig, base, second)
+    else:
+        fig, base, second = figuretemplates[key]
+        for axes in [base, second]:
+            if axes is not None:
+                resetAxes(axes)
+    return figuretemplates[key]
+
+def resetAxes(axes):
+    """
+    Remove lines, legend, titles and the x tick labels of the last plot from the axes and restart the color cycle
+    """
+    for line in list(axes.lines):
+        line.remove()
+    axes.set_prop_cycle(None)
+    if axes.legend_ is not None:
+        axes.legend_.remove()
+    axes.set_title("")
+    axes.set_xlabel("")
+    axes.set_ylabel("")
+    axes.xaxis.set_major_locator(ticker.AutoLocator())
+    axes.xaxis.set_major_formatter(ticker.ScalarFormatter())
+    axes.xaxis.set_minor_locator(ticker.NullLocator())
+    axes.xaxis.set_minor_formatter(ticker.NullFormatter())
+    axes.relim()
+    axes.set_autoscale_on(True)
+
+def saveFigure(fig, filename, plothash = None):
+    """
+    Save the figure as png (and pdf). If plothash is passed, it is saved in filename.hash (see isPlotCached).
+    """
+    logging.info("Saving file: {0}".format(filename+".png"))
+    fig.savefig(filename+".png")
+    if savepdf:
+        logging.info("Saving file: {0}".format(filename+".pdf"))
+        fig.savefig(filename+".pdf")
+    if plothash is not None:
+        with open(filename+".hash", "w") as hashfile:
+            hashfile.write(plothash)
+
+# Increase if the plotting functions change, so all plots are rendered again
+plotversion = 1
+
+def updatePlotHash(plothash, item):
+    if isinstance(item, (list, tuple)):
+        plothash.update("[")
+        for element in item:
+            updatePlotHash(plothash, element)
+        plothash.update("]")
+    elif isinstance(item, dict):
+        for key in sorted(item):
+            updatePlotHash(plothash, key)
+            updatePlotHash(plothash, item[key])
+    elif hasattr(item, "index") and hasattr(item, "values"):
+        # pandas Series and DataFrames
+        plothash.update(type(item).__name__)
+        updatePlotHash(plothash, list(item.index))
+        updatePlotHash(plothash, list(item.columns) if hasattr(item, "columns") else item.name)
+        values = np.ascontiguousarray(item.values)
+        plothash.update("{0}{1}".format(values.dtype, values.shape))
+        plothash.update(repr(values.tolist()) if values.dtype.hasobject else values.tobytes())
+    else:
+        plothash.update(repr(item))
+
+def getPlotHash(*items):
+    """
+    Returns hash of the items (plotted data, titles and all other arguments of a plot) and the
+    current plot settings.
+    """
+    plothash = hashlib.sha1()
+    for item in (plotversion, matplotlib.__version__, plotmode, dpi, savepdf, rcParams["text.usetex"])+items:
+        updatePlotHash(plothash, item)
+    return plothash.hexdigest()
+
+def isPlotCached(filename, plothash):
+    """
+    True if the plot filename was saved with the same plothash and all files of the plot exist
+    """
+    files = [filename+".png", filename+".hash"]+([filename+".pdf"] if savepdf else [])
+    if not all(os.path.exists(name) for name in files):
+        return False
+    with open(filename+".hash") as hashfile:
+        if hashfile.read() != plothash:
+            return False
+    logging.info("Plot {0} unchanged. Skipping rendering".format(filename+".png"))
+    return True
+
 def makeDiYAxisplot(df1in, df1yTitle, df2in, df2yTitle, filename = None, plottitle = "", foldername = None, isRunComp = True, normalizeDFs = False):
     """
     This functions makes plots with two curves that share a x-axis but have different y-axes for pandas series.
 
     returns: file name with path.
     """
-    fig, base = plt.subplots(dpi=dpi)
-    if isRunComp:
-        fig.subplots_adjust(bottom = 0.16, right = 0.88, left = 0.11, top = 0.92)
-    else:
-        fig.subplots_adjust(bottom = 0.1, right = 0.88, left = 0.11, top = 0.92)
-    second = base.twinx()
+    path = makefolder(foldername)
+    if filename is None:
+        filename = "plot_{0}_{1}".format(df1yTitle, df2yTitle)
+    plothash = getPlotHash("makeDiYAxisplot", df1in, df1yTitle, df2in, df2yTitle, filename, plottitle, isRunComp, normalizeDFs)
+    if isPlotCached(path+filename, plothash):
+        return path+filename+".png"
 
-    Preliminary = False
-
-    if Preliminary is True:
-        base.text(0.125, 1.015, r"{\huge\textbf{CMS}} {\textit{Preliminary}}", transform=base.transAxes)
-    else:
-        base.text(0.125, 1.005, r"{\huge\textbf{CMS}}", transform=base.transAxes)
-        base.text(0.125, 0.96, r"\textit{Work in Progress}", transform=base.transAxes)
+    fig, base, second = getFigureTemplate("DiYAxis", isRunComp)
 
     color1 = get_colors()[0]
     color2 = get_colors()[2]
@@ -82,27 +256,13 @@ def makeDiYAxisplot(df1in, df1yTitle, df2in, df2yTitle, filename = None, plottit
 
     base.set_title(plottitle)
     base.set_ylabel(df1yTitle)
-    base.get_yaxis().get_major_formatter().set_powerlimits((-3, 5))
     second.set_ylabel(df2yTitle)
-    second.get_yaxis().get_major_formatter().set_powerlimits((-3, 5))
 
-    base.yaxis.label.set_color(color1)
-    second.yaxis.label.set_color(color2)
-    base.tick_params(axis='y', colors=color1)
-    second.tick_params(axis='y', colors=color2)
     if isRunComp:
         base.set_xticks(range(len(df1.index.values.tolist())))
         base.set_xticklabels(["{0}".format(item) for item in df1.index.values.tolist()], rotation=45)
 
-    path = makefolder(foldername)
-    if filename is None:
-        filename = "plot_{0}_{1}".format(df1yTitle, df2yTitle)
-    logging.info("Saving file: {0}".format(path+filename+".png"))
-    plt.savefig(path+filename+".png")
-    if savepdf:
-        logging.info("Saving file: {0}".format(path+filename+".pdf"))
-        plt.savefig(path+filename+".pdf")
-    plt.close(fig)
+    saveFigure(fig, path+filename, plothash)
 
     return path+filename+".png"
 
@@ -133,19 +293,12 @@ def makecomparionPlot(dfs, titles, filename, colors = ["Default"], plottitle = "
             colors = colors * (len(dfs)%len(colors) + 1)
             logging.warning("Default color palette has {0} colors -> More DF passed. Some lines will have the same color!".format(len(colors)))
 
-    fig, base = plt.subplots(dpi=dpi)
-    if isRunComp:
-        fig.subplots_adjust(bottom = 0.16, right = 0.88, left = 0.11, top = 0.92)
-    else:
-        fig.subplots_adjust(bottom = 0.1, right = 0.88, left = 0.11, top = 0.92)
+    path = makefolder(foldername)
+    plothash = getPlotHash("makecomparionPlot", dfs, titles, filename, colors, plottitle, yTitle, isRunComp)
+    if isPlotCached(path+filename, plothash):
+        return path+filename+".png"
 
-    Preliminary = False
-
-    if Preliminary is True:
-        base.text(0.125, 1.015, r"{\huge\textbf{CMS}} {\textit{Preliminary}}", transform=base.transAxes)
-    else:
-        base.text(0.125, 1.005, r"{\huge\textbf{CMS}}", transform=base.transAxes)
-        base.text(0.125, 0.96, r"\textit{Work in Progress}", transform=base.transAxes)
+    fig, base = getFigureTemplate("comparison", isRunComp)[:2]
 
     for dftuple in zip(dfs, titles, colors):
         dftuple[0].plot(ax = base, color = dftuple[2], label = dftuple[1])
@@ -154,21 +307,13 @@ def makecomparionPlot(dfs, titles, filename, colors = ["Default"], plottitle = "
         base.set_xticks(range(len(dfs[0].index.values.tolist())))
         base.set_xticklabels(["{0}".format(item) for item in dfs[0].index.values.tolist()], rotation=45)
 
-    base.get_yaxis().get_major_formatter().set_powerlimits((-3, 5))
-
     if yTitle is not None:
         base.set_ylabel(yTitle)
 
     base.set_title(plottitle)
 
-    plt.legend()
-    path = makefolder(foldername)
-    logging.info("Saving file: {0}".format(path+filename+".png"))
-    plt.savefig(path+filename+".png")
-    if savepdf:
-        logging.info("Saving file: {0}".format(path+filename+".pdf"))
-        plt.savefig(path+filename+".pdf")
-    plt.close(fig)
+    base.legend()
+    saveFigure(fig, path+filename, plothash)
 
     return path+filename+".png"
 
@@ -178,33 +323,120 @@ def plotDataFrame(df, filename, xtitle, ytitle, legendlabels = None, plottitle =
 
     returns: file name with path.
     """
-    fig, base = plt.subplots(dpi=dpi)
-    if isRunComp:
-        fig.subplots_adjust(bottom = 0.16, right = 0.88, left = 0.11, top = 0.92)
-    else:
-        fig.subplots_adjust(bottom = 0.1, right = 0.88, left = 0.11, top = 0.92)
-
-    Preliminary = False
+    path = makefolder(foldername)
+    plothash = getPlotHash("plotDataFrame", df, filename, xtitle, ytitle, legendlabels, plottitle, isRunComp)
+    if isPlotCached(path+filename, plothash):
+        return path+filename+".png"
 
-    if Preliminary is True:
-        base.text(0.125, 1.015, r"{\huge\textbf{CMS}} {\textit{Preliminary}}", transform=base.transAxes)
-    else:
-        base.text(0.125, 1.005, r"{\huge\textbf{CMS}}", transform=base.transAxes)
-        base.text(0.125, 0.96, r"\textit{Work in Progress}", transform=base.transAxes)
+    fig, base = getFigureTemplate("dataframe", isRunComp)[:2]
 
     base.set_ylabel(ytitle)
     base.set_xlabel(xtitle)
     base.set_title(plottitle)
-    base.get_yaxis().get_major_formatter().set_powerlimits((-3, 5))
 
     df.plot(ax = base)
 
-    path = makefolder(foldername)
-    logging.info("Saving file: {0}".format(path+filename+".png"))
-    plt.savefig(path+filename+".png")
-    if savepdf:
-        logging.info("Saving file: {0}".format(path+filename+".pdf"))
-        plt.savefig(path+filename+".pdf")
-    plt.close(fig)
+    saveFigure(fig, path+filename, plothash)
 
     return path+filename+".png"
+
+# Rendered plot with the tags used to find it on the overview pages (see plotregistry).
+# layer is Layer1-4 or allLayers, run is None for run comparisons and region is full, inner, outer or innerVsOuter
+plotrecord = namedtuple("plotrecord", ["filename", "group", "layer", "run", "region", "metric"])
+
+class plotregistry:
+    """
+    Plots (plotrecord) indexed by their tags. Lookups return the records in the order they were added.
+    """
+    tags = ["group", "layer", "run", "region", "metric"]
+
+    def __init__(self):
+        self.records = []
+        self._index = OrderedDict()
+
+    def add(self, records):
+        for record in records:
+            self.records.append(record)
+            for tag in self.tags:
+                self._index.setdefault((tag, getattr(record, tag)), []).append(record)
+
+    def get(self, **tags):
+        """
+        Returns the records with all given tags, e.g. get(group = "Pix/Lay", layer = "Layer1")
+        """
+        candidates = min([self._index.get(item, []) for item in tags.items()], key = len)
+        return [record for record in candidates if all(getattr(record, tag) == value for tag, value in tags.items())]
+
+    def getValues(self, tag):
+        """
+        Returns the values of tag in the order they were added
+        """
+        return [value for key, value in self._index if key == tag]
+
+class plotjobs(list):
+    """
+    List of plots to render. Calling makeDiYAxisplot, makecomparionPlot or plotDataFrame appends the
+    job (name of the plotting function, args, kwargs) instead of rendering the plot. The jobs are
+    rendered with renderPlots. The keyword tags (layer, run, region, metric) of these calls is
+    saved for getRecords.
+    """
+    def __init__(self, group = None):
+        list.__init__(self)
+        self.group = group
+        self.tags = []
+
+    def addJob(self, function, args, kwargs):
+        self.tags.append(kwargs.pop("tags", {}))
+        self.append((function, args, kwargs))
+
+    def makeDiYAxisplot(self, *args, **kwargs):
+        self.addJob("makeDiYAxisplot", args, kwargs)
+
+    def makecomparionPlot(self, *args, **kwargs):
+        self.addJob("makecomparionPlot", args, kwargs)
+
+    def plotDataFrame(self, *args, **kwargs):
+        self.addJob("plotDataFrame", args, kwargs)
+
+    def getRecords(self, filenames):
+        """
+        Returns a plotrecord for each job with the file names returned by renderPlots
+        """
+        return [plotrecord(filename, self.group, tags.get("layer", "allLayers"), tags.get("run"),
+                           tags.get("region", "full"), tags.get("metric"))
+                for filename, tags in zip(filenames, self.tags)]
+
+def initPlotWorker(settings):
+    """
+    Initializer for the processes rendering the plots. Only the non-interactive Agg backend is used
+    and the settings of the parent process are used instead of reading the config files again.
+    """
+    modules.settings.useSettings(settings)
+    plt.switch_backend("Agg")
+
+def renderPlot(plotjob):
+    function, args, kwargs = plotjob
+    return globals()[function](*args, **kwargs)
+
+def renderPlots(plotjobs, nJobs = 1):
+    """
+    Render the plotjobs with nJobs processes. Identical jobs are only rendered once. Returns the
+    file names in the order of the jobs.
+    """
+    jobhashes = [getPlotHash(*plotjob) for plotjob in plotjobs]
+    uniquejobs = OrderedDict()
+    for jobhash, plotjob in zip(jobhashes, plotjobs):
+        uniquejobs.setdefault(jobhash, plotjob)
+    if len(uniquejobs) < len(plotjobs):
+        logging.info("Skipping {0} duplicate plots".format(len(plotjobs)-len(uniquejobs)))
+    if nJobs > 1 and len(uniquejobs) > 1:
+        import multiprocessing
+        logging.info("Rendering {0} plots with {1} processes".format(len(uniquejobs), nJobs))
+        pool = multiprocessing.Pool(nJobs, initPlotWorker, (modules.settings.getSettings(),))
+        filenames = pool.map(renderPlot, uniquejobs.values(), chunksize = 1)
+        pool.close()
+        pool.join()
+    else:
+        filenames = map(renderPlot, uniquejobs.values())
+    filenames = dict(zip(uniquejobs.keys(), filenames))
+    return [filenames[jobhash] for jobhash in jobhashes]
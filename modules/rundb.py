@@ -0,0 +1,78 @@
+"""
+SQLite database with the values of already processed runs (sections of a config). Every run is
+saved with a fingerprint of the inputfile (path, size and modification time of all files) and
+the values collidingBunches, lumi, fill and nFiles of the section. If the fingerprint of a
+section did not change, the stored values are used and the inputfile is not read again.
+
+K. Schweiger, 2017
+"""
+import os
+import io
+import time
+import hashlib
+import logging
+import sqlite3
+
+import numpy as np
+
+from modules.histograms import getFileIdentity
+
+class rundb:
+    """
+    Run database in the file path. Is created if it does not exist.
+    """
+    # Increase if the calculation of the values changes, so all stored runs are processed again
+    version = 1
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        logging.debug("Opening run database {0}".format(self.path))
+        self._connection = sqlite3.connect(self.path)
+        with self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS runs (section TEXT PRIMARY KEY, fingerprint TEXT, "
+                                     "nFiles INTEGER, valuearray BLOB, modulearray BLOB, updated REAL)")
+
+    def getFingerprint(self, inputfile, collBunches, instLumi, fill, nFiles):
+        """
+        Returns the fingerprint for the passed values of a section or None if the inputfile does not exist
+        """
+        identity = getFileIdentity(inputfile)
+        if identity is None:
+            return None
+        fingerprint = "{0}|{1}|{2!r}|{3!r}|{4}|{5}".format(rundb.version, identity, collBunches, instLumi, fill, nFiles)
+        return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+    def get(self, section, fingerprint):
+        """
+        Returns tuple (values, nModules, nFiles) for section if the stored fingerprint matches.
+        Otherwise None is returned.
+        """
+        row = self._connection.execute("SELECT fingerprint, nFiles, valuearray, modulearray FROM runs WHERE section = ?",
+                                       (section,)).fetchone()
+        if row is None or row[0] != fingerprint:
+            logging.debug("Section {0} not in run database or changed".format(section))
+            return None
+        logging.info("Using values for section {0} from run database".format(section))
+        return loadArray(row[2]), loadArray(row[3]), row[1]
+
+    def store(self, section, fingerprint, container):
+        """
+        Save the values of the container for section
+        """
+        logging.debug("Saving section {0} in run database".format(section))
+        container.evaluate()
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                                     (section, fingerprint, container.nFiles, dumpArray(container.values),
+                                      dumpArray(container.nModules), time.time()))
+
+    def close(self):
+        self._connection.close()
+
+def dumpArray(array):
+    f = io.BytesIO()
+    np.save(f, array)
+    return sqlite3.Binary(f.getvalue())
+
+def loadArray(blob):
+    return np.load(io.BytesIO(bytes(blob)))
@@ -0,0 +1,74 @@
+"""
+Module for the settings in configs/style.cfg and configs/plotting.cfg. The files are found relative
+to the package (not the working directory) and read once per process on the first call of getSettings.
+
+K. Schweiger, 2017
+"""
+import os
+import logging
+from collections import namedtuple
+from ConfigParser import SafeConfigParser
+
+configfolder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "configs")
+
+_settings = None
+
+class settings(namedtuple("settings", ["bordersize", "padding", "latexprecision", "renaming",
+                                       "dpi", "savepdf", "draftdpi", "texcache", "axislabels"])):
+    """
+    Immutable settings. Can be pickled, e.g. to pass them to worker processes (see useSettings).
+    renaming and axislabels are tuples of (lowercase key, value) from the sections Renaming
+    (style.cfg) and General (plotting.cfg).
+    """
+    __slots__ = ()
+
+    def rename(self, name):
+        """
+        Returns the name set in the Renaming section or name if not set there
+        """
+        return dict(self.renaming).get(name.lower(), name)
+
+    def getAxisLabel(self, name):
+        """
+        Returns the axis label set in plotting.cfg or name if not set there
+        """
+        return dict(self.axislabels).get(name.lower(), name)
+
+def readConfig(filename):
+    config = SafeConfigParser()
+    logging.debug("Loading config: {0}".format(filename))
+    if not config.read(filename):
+        raise IOError("Config file {0} not found".format(filename))
+    return config
+
+def loadSettings(folder = configfolder):
+    """
+    Returns the settings read from style.cfg and plotting.cfg in folder
+    """
+    style = readConfig(os.path.join(folder, "style.cfg"))
+    plotting = readConfig(os.path.join(folder, "plotting.cfg"))
+    return settings(bordersize = style.get("Tables", "bordersize"),
+                    padding = style.get("Tables", "padding"),
+                    latexprecision = style.getint("Tables", "latexprecision"),
+                    renaming = tuple(style.items("Renaming")),
+                    dpi = style.getint("Plotting", "dpi"),
+                    savepdf = style.getboolean("Plotting", "savepdf"),
+                    draftdpi = style.getint("Plotting", "draftdpi"),
+                    texcache = os.path.join(os.path.dirname(folder), os.path.expanduser(style.get("Plotting", "texcache"))),
+                    axislabels = tuple(plotting.items("General")))
+
+def getSettings():
+    """
+    Returns the settings of this process. They are loaded on the first call.
+    """
+    global _settings
+    if _settings is None:
+        _settings = loadSettings()
+    return _settings
+
+def useSettings(processsettings):
+    """
+    Use processsettings (e.g. passed to a worker process) instead of reading the config files
+    """
+    global _settings
+    _settings = processsettings
@@ -0,0 +1,180 @@
+/*
+ * Draws the plots of the interactive report (see modules/interactiveOutput.py) as SVG.
+ * The data is loaded from reportdata.js (var reportData) and every <div class="plot" data-plot="name">
+ * is replaced by the plot reportData.plots[name]. Values are shown when hovering over a point.
+ *
+ * K. Schweiger, 2017
+ */
+(function () {
+    "use strict";
+
+    var svgNS = "http://www.w3.org/2000/svg";
+    // Colors of the seaborn style used by modules/plotting.py
+    var palette = ["#4C72B0", "#55A868", "#C44E52", "#8172B2", "#CCB974", "#64B5CD"];
+    var width = 800, height = 550;
+
+    function element(name, attributes, parent, text) {
+        var node = document.createElementNS(svgNS, name);
+        for (var key in attributes) {
+            node.setAttribute(key, attributes[key]);
+        }
+        if (text !== undefined) {
+            node.textContent = text;
+        }
+        if (parent) {
+            parent.appendChild(node);
+        }
+        return node;
+    }
+
+    function formatValue(value) {
+        if (value === null) {
+            return "NaN";
+        }
+        var magnitude = Math.abs(value);
+        // Same limits as set_powerlimits((-3, 5)) in modules/plotting.py
+        if (magnitude !== 0 && (magnitude < 1e-3 || magnitude >= 1e5)) {
+            return value.toExponential(2);
+        }
+        return String(parseFloat(value.toPrecision(4)));
+    }
+
+    function getTicks(low, high) {
+        if (low === high) {
+            low -= Math.abs(low) * 0.1 || 1;
+            high += Math.abs(high) * 0.1 || 1;
+        }
+        var rough = (high - low) / 6;
+        var power = Math.pow(10, Math.floor(Math.log(rough) / Math.LN10));
+        var step = power * (rough / power < 1.5 ? 1 : rough / power < 3.5 ? 2 : rough / power < 7.5 ? 5 : 10);
+        var ticks = [];
+        for (var tick = Math.floor(low / step) * step; tick <= high + step * 1e-9; tick += step) {
+            ticks.push(tick);
+        }
+        if (ticks[ticks.length - 1] < high) {
+            ticks.push(ticks[ticks.length - 1] + step);
+        }
+        return ticks;
+    }
+
+    function getRange(seriesList) {
+        var low = Infinity, high = -Infinity;
+        seriesList.forEach(function (series) {
+            series.y.forEach(function (value) {
+                if (value !== null) {
+                    low = Math.min(low, value);
+                    high = Math.max(high, value);
+                }
+            });
+        });
+        if (low === Infinity) {
+            return [0, 1];
+        }
+        return [low, high];
+    }
+
+    function drawYAxis(svg, ticks, scale, x, side, title, color) {
+        var anchor = side === "left" ? "end" : "start";
+        var offset = side === "left" ? -8 : 8;
+        ticks.forEach(function (tick) {
+            var y = scale(tick);
+            if (side === "left") {
+                element("line", {x1: x, x2: x + svg.plotWidth, y1: y, y2: y, stroke: "#ffffff"}, svg);
+            }
+            element("text", {x: x + offset, y: y + 4, "text-anchor": anchor, "font-size": 13, fill: color}, svg, formatValue(tick));
+        });
+        if (title) {
+            var titlex = side === "left" ? 18 : width - 12;
+            element("text", {x: titlex, y: svg.plotTop + svg.plotHeight / 2, "text-anchor": "middle", "font-size": 14, fill: color,
+                             transform: "rotate(-90 " + titlex + " " + (svg.plotTop + svg.plotHeight / 2) + ")"}, svg, title);
+        }
+    }
+
+    function drawLine(svg, series, xscale, yscale, color) {
+        var points = [];
+        series.y.forEach(function (value, index) {
+            if (value !== null) {
+                points.push(xscale(index) + "," + yscale(value));
+            }
+        });
+        element("polyline", {points: points.join(" "), fill: "none", stroke: color, "stroke-width": 2}, svg);
+        series.y.forEach(function (value, index) {
+            if (value !== null) {
+                var point = element("circle", {cx: xscale(index), cy: yscale(value), r: 4, fill: color}, svg);
+                element("title", {}, point, series.x[index] + ": " + formatValue(value));
+            }
+        });
+    }
+
+    function drawPlot(container, plot) {
+        var seriesList = plot.series.map(function (index) { return reportData.series[index]; });
+        var twoAxes = plot.kind === "diy";
+        var svg = element("svg", {width: width, height: height, viewBox: "0 0 " + width + " " + height});
+        var left = 90, right = twoAxes ? 90 : 30, top = 60, bottom = plot.rotateLabels ? 110 : 70;
+        svg.plotTop = top;
+        svg.plotWidth = width - left - right;
+        svg.plotHeight = height - top - bottom;
+        element("rect", {x: left, y: top, width: svg.plotWidth, height: svg.plotHeight, fill: "#EAEAF2"}, svg);
+
+        var labels = seriesList[0].x;
+        var xscale = function (index) {
+            return labels.length > 1 ? left + index * svg.plotWidth / (labels.length - 1) : left + svg.plotWidth / 2;
+        };
+        var makeScale = function (ticks) {
+            var low = ticks[0], high = ticks[ticks.length - 1];
+            return function (value) {
+                return top + svg.plotHeight * (1 - (value - low) / (high - low));
+            };
+        };
+
+        var colors = twoAxes ? [palette[0], palette[2]] : seriesList.map(function (series, index) {
+            return plot.colors ? plot.colors[index] : palette[index % palette.length];
+        });
+        var axesSeries = twoAxes ? [[seriesList[0]], [seriesList[1]]] : [seriesList];
+        var axesTitles = twoAxes ? plot.ytitles : [plot.ytitles[0]];
+        axesSeries.forEach(function (series, iaxis) {
+            var range = getRange(series);
+            var ticks = getTicks(range[0], range[1]);
+            var yscale = makeScale(ticks);
+            drawYAxis(svg, ticks, yscale, iaxis === 0 ? left : left + svg.plotWidth, iaxis === 0 ? "left" : "right",
+                      axesTitles[iaxis], twoAxes ? colors[iaxis] : "#262626");
+            series.forEach(function (oneSeries, index) {
+                drawLine(svg, oneSeries, xscale, yscale, colors[iaxis + index]);
+            });
+        });
+
+        labels.forEach(function (label, index) {
+            var x = xscale(index), y = top + svg.plotHeight + 18;
+            element("line", {x1: x, x2: x, y1: top, y2: top + svg.plotHeight, stroke: "#ffffff"}, svg);
+            element("text", plot.rotateLabels ? {x: x, y: y, "text-anchor": "end", "font-size": 13, transform: "rotate(-45 " + x + " " + y + ")"}
+                                              : {x: x, y: y, "text-anchor": "middle", "font-size": 13}, svg, label);
+        });
+        if (plot.xtitle) {
+            element("text", {x: left + svg.plotWidth / 2, y: height - 15, "text-anchor": "middle", "font-size": 14}, svg, plot.xtitle);
+        }
+        element("text", {x: left + svg.plotWidth / 2, y: top - 10, "text-anchor": "middle", "font-size": 13}, svg, plot.title);
+        element("text", {x: left + 0.125 * svg.plotWidth, y: top - 10, "font-size": 22, "font-weight": "bold"}, svg, "CMS");
+        element("text", {x: left + 0.125 * svg.plotWidth, y: top + 16, "font-size": 13, "font-style": "italic"}, svg, "Work in Progress");
+
+        if (plot.labels) {
+            var legend = element("g", {}, svg);
+            plot.labels.forEach(function (label, index) {
+                var y = top + 20 + index * 20;
+                var x = left + svg.plotWidth - 160;
+                element("line", {x1: x, x2: x + 25, y1: y, y2: y, stroke: colors[index], "stroke-width": 2}, legend);
+                element("text", {x: x + 32, y: y + 5, "font-size": 13}, legend, label);
+            });
+        }
+        container.appendChild(svg);
+    }
+
+    document.addEventListener("DOMContentLoaded", function () {
+        var containers = document.querySelectorAll("div.plot");
+        for (var i = 0; i < containers.length; i++) {
+            var plot = reportData.plots[containers[i].getAttribute("data-plot")];
+            if (plot) {
+                drawPlot(containers[i], plot);
+            }
+        }
+    });
+})();
@@ -3,63 +3,53 @@ Module for all function related to the z dependent values
 """
 import logging
 
-from modules.tests import isHistoinFile
+import numpy as np
 
-def npixZdependency(inputfile, nFiles = 1):
+facets = [12, 28, 44, 64]
+zpositions = ["-4", "-3", "-2", "-1", "1", "2", "3", "4"]
+layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
+
+# Bin indices of the z positions (x axis) and facets (y axis) in the detector maps.
+# The "0" lines for facets and z positions are skipped.
+zbinIndices = np.array([1, 2, 3, 4, 6, 7, 8, 9])
+facetIndices = [np.concatenate((np.arange(1, nfacets//2 + 1), np.arange(nfacets//2 + 2, nfacets + 2)))
+                for nfacets in facets]
+
+def npixZdependency(histos, nFiles = 1):
+    """
+    Get the number of hit pixels and working modules for each z position of each layer
+    from the detector maps in the histobundle histos.
+    """
     logging.debug("Getting pixel per event per zpositions and working modules")
 
-    facets = [12, 28, 44, 64]
-    zpositions = ["-4", "-3", "-2", "-1", "1", "2", "3", "4"]
-    layerNames = ["Layer1", "Layer2", "Layer3", "Layer4"]
     Histos2D = []
     for i in range(1,5):
-        if isHistoinFile(inputfile, "d/hpDetMap{0}".format(i)):
-            logging.debug("Using d/hpDetMap{0} for z dependent values".format(i))
-            Histos2D.append(inputfile.Get("d/hpDetMap{0}".format(i)))
-        elif isHistoinFile(inputfile, "d/hpixDets{0}".format(i)):
-            logging.debug("Using d/hpixDets{0} for z dependent values".format(i))
-            Histos2D.append(inputfile.Get("d/hpixDets{0}".format(i)))
-        else:
-            logging.error("Histo for Layer{0} d/hpDetMap{0} or d/hpixDets{0} not found. Final Fix not ready. Remove run from config!")
+        h2D = histos.getDetMap(i)
+        if h2D is None:
+            logging.error("Histo for Layer{0} d/hpDetMap{0} or d/hpixDets{0} not found. Final Fix not ready. Remove run from config!".format(i))
             exit()
+        Histos2D.append(h2D)
 
     phitperzpositions = {"Layer1": None, "Layer2": None, "Layer3": None, "Layer4": None}
     workingmodules = {"Layer1": None, "Layer2": None, "Layer3": None, "Layer4": None}
 
     for ih2D, h2D in enumerate(Histos2D):
-        zvalDict = {}
-        zmoduleDict = {}
-        for il, l in enumerate(zpositions):
-            pixelperL = 0
-            modulesworking = 0
-            for iface in range(facets[ih2D]):
-                # Ignore the "0" lines for facest and zpositions
-                if iface < facets[ih2D]/2 and il <= 3:
-                    x,y = 1,1
-                elif iface >= facets[ih2D]/2 and il <= 3:
-                    x,y = 1,2
-                elif iface < facets[ih2D]/2 and il > 3:
-                    x,y = 2,1
-                else:
-                    x,y = 2,2
-                pixelperL += h2D.GetBinContent(x+il, y+iface) #h2D.GetBinContent(1,1) is lower left corner
-                #print h2D.GetBinContent(x+il, y+iface)
-                if h2D.GetBinContent(x+il, y+iface) > 0:
-                    modulesworking += 1
-            #print l,pixelperL
-            zvalDict.update({l : pixelperL / nFiles})
-            zmoduleDict.update({l : modulesworking})
-        phitperzpositions[layerNames[ih2D]] = zvalDict
-        workingmodules[layerNames[ih2D]] = zmoduleDict
+        # Rows are facets, columns are z positions
+        values = h2D[np.ix_(facetIndices[ih2D], zbinIndices)].astype(np.float64)
+        # Reducing over the rows of the C-ordered array adds the facets one after another
+        pixelperZ = values.sum(axis = 0) / nFiles
+        modulesperZ = np.count_nonzero(values > 0, axis = 0)
+        phitperzpositions[layerNames[ih2D]] = dict((l, float(pixelperZ[il])) for il, l in enumerate(zpositions))
+        workingmodules[layerNames[ih2D]] = dict((l, int(modulesperZ[il])) for il, l in enumerate(zpositions))
     return phitperzpositions, workingmodules
 
 
 def main():
-    import ROOT
+    from modules.histograms import histobundle
 
-    tfile = ROOT.TFile.Open("~/Code/data/pixel/occupancy/v2/Run302742.root")
+    histos = histobundle("~/Code/data/pixel/occupancy/v2/Run302742.root")
 
-    hitpixelzdepDic, modules = npixZdependency(tfile)
+    hitpixelzdepDic, modules = npixZdependency(histos)
     print hitpixelzdepDic
     print modules
 